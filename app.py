@@ -1,14 +1,37 @@
 import streamlit as st
-import google.generativeai as genai
-import json
 import random
 import requests
 import time
-from gtts import gTTS
+import os
 import io
+import uuid
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import fake_backends
+import metrics
+# FAKE_BACKENDS=1 时换成本地假服务 (故障注入演练)，必须在 quiz_gen / tts_cache / image_library 读取端点之前
+fake_backends.install_from_env()
+from storage import open_storage
+from deck import Deck
+from distractors import CARD_FIELDS, GlossIndex
+from srs import SRSScheduler
+from tts_cache import AudioCache
+from image_library import ImageLibrary, generate_image_url
+from image_proxy import ImageProxy
+from prefetch import Prefetcher
+from word_import import import_words
+from async_engine import AsyncEngine
+from client_pool import default_pool as client_pool
+from quota import PRIORITY_PREFETCH, get_scheduler
+from quiz_pack import QuizPack
+from quiz_gen import QUIZ_MODEL, PROMPT_VERSION, router as model_router, generate_quiz, generate_quiz_batch, generate_quiz_stream, is_valid_quiz, quiz_metrics
 
 # --- 1. 页面配置 ---
 st.set_page_config(page_title="英语单词闪卡大师 (Gemma 稳定版)", page_icon="🎨")
+# 记录整页重跑的耗时；fragment 单独重跑时不会经过这里
+RUN_START = time.perf_counter()
+st.session_state['in_full_run'] = True
 
 # --- 2. 侧边栏 ---
 with st.sidebar:
@@ -20,90 +43,435 @@ with st.sidebar:
     )
     if not api_key:
         st.warning("👈 请先在左侧输入 Key")
+    # 没填 ID 的同学各用各的匿名 ID (记在地址栏里，刷新页面还能接着学)，不会再共用同一个 "guest" 的词库和记录
+    if 'anon_id' not in st.session_state:
+        st.session_state['anon_id'] = st.query_params.get("learner") or f"anon-{uuid.uuid4().hex[:12]}"
+        st.query_params["learner"] = st.session_state['anon_id']
+    user_id = st.text_input(
+        "👤 学习者 ID", value="", placeholder="留空则只在这个页面里学",
+        help="词库和答题记录按这个 ID 保存在服务器上，填同一个 ID 换设备也能接着学"
+    ).strip() or st.session_state['anon_id']
+    TTS_ACCENTS = {"美音": "com", "英音": "co.uk", "澳音": "com.au"}
+    tts_tld = TTS_ACCENTS[st.selectbox("🔊 发音口音", list(TTS_ACCENTS))]
+    use_image_proxy = st.checkbox(
+        "🖼️ 本地图片代理",
+        value=os.environ.get("IMAGE_PROXY", "0") == "1",
+        help="由服务器下载一次图片并缓存缩略图，所有同学共用，不再各自触发远端渲染"
+    )
+    use_streaming = st.checkbox(
+        "⚡ 流式出题", value=True,
+        help="边生成边显示：单词和音标先出来，选项稍后补齐"
+    )
+    use_srs = st.radio(
+        "📅 复习模式", ["随机轮换", "间隔重复 (SM-2)"],
+        help="间隔重复：答对的单词隔几天再考，答错的 10 分钟后再考，只给到期的单词出题"
+    ) != "随机轮换"
+    # build_pack.py 编译好的离线题包：打开后只从题包出题，不需要 Key，也不访问任何网络
+    QUIZ_PACK = os.environ.get("QUIZ_PACK", "quiz_pack.qpk")
+    use_pack = os.path.exists(QUIZ_PACK) and st.checkbox(
+        "📦 离线题包", value=True,
+        help=f"直接从 {QUIZ_PACK} 出题，词库里不在题包中的单词会被跳过"
+    )
+    use_local_options = st.checkbox(
+        "🎲 本地组装选项", value=os.environ.get("LOCAL_OPTIONS", "1") == "1",
+        help="学过的单词复习时只用记下的正确释义，干扰项从其他单词的释义里挑，不再调用 AI，每次选项都不一样"
+    )
+    show_metrics = st.checkbox(
+        "🩺 调试面板", value=os.environ.get("METRICS_PANEL", "0") == "1",
+        help="显示出题各阶段 (调模型、解析、插图、发音、重跑) 的耗时分布和缓存命中率"
+    )
 
 # --- 3. 状态初始化 ---
-if 'word_bank' not in st.session_state:
-    st.session_state['word_bank'] = []
-if 'current_question' not in st.session_state:
+# 所有会话共用的持久化存储：词库、题目、插图、答题记录 (默认 SQLite，可用 STORAGE_URL 换后端)
+@st.cache_resource
+def get_storage():
+    return open_storage(os.environ.get("STORAGE_URL", "sqlite://quiz_cache.db"))
+
+storage = get_storage()
+
+# 刚打开页面或换了学习者 ID 时，才从存储里加载这个人的词库，并按答题记录重放出复习进度
+if st.session_state.get('user_id') != user_id:
+    words = storage.load_words(user_id)
+    # 词库牌堆：抽词 / 移除 / 添加都是 O(1)，自动去重
+    st.session_state['deck'] = Deck(words)
+    # 间隔重复调度器：记录每次作答，按到期时间排队
+    srs = SRSScheduler()
+    srs.add_many(words)
+    for word, correct, answered_at in storage.load_answers(user_id):
+        srs.record(word, correct, answered_at)
+    st.session_state['srs'] = srs
+    st.session_state['user_id'] = user_id
     st.session_state['current_question'] = None
-if 'quiz_state' not in st.session_state:
     st.session_state['quiz_state'] = 'IDLE'
-if 'user_selection' not in st.session_state:
-    st.session_state['user_selection'] = None
-if 'generated_image_url' not in st.session_state:
-    st.session_state['generated_image_url'] = None
-if 'has_started' not in st.session_state:
-    st.session_state['has_started'] = False
-if 'remaining_words' not in st.session_state:
-    st.session_state['remaining_words'] = []
-if 'image_cache' not in st.session_state:
-    st.session_state['image_cache'] = {}
-if 'quiz_cache' not in st.session_state:
-    st.session_state['quiz_cache'] = {}
+# 其余状态的默认值 (current_audio：题包模式下发音直接来自题包；render_times：每次重跑的耗时)
+SESSION_DEFAULTS = {
+    'current_word': None,
+    'current_question': None,
+    'quiz_state': 'IDLE',
+    'user_selection': None,
+    'generated_image_url': None,
+    'current_audio': None,
+    'has_started': False,
+    'image_cache': dict,
+    'quiz_cache': dict,
+    'render_times': lambda: {'full': deque(maxlen=100), 'fragment': deque(maxlen=100)},
+}
+for state_key, default in SESSION_DEFAULTS.items():
+    if state_key not in st.session_state:
+        st.session_state[state_key] = default() if callable(default) else default
+
+# 跨会话共享的题库缓存：第二个同学点到同一个单词时直接读库，不再调用 Gemma
+quiz_store = storage.cards
+
+# 预加载配置：队列深度 / 线程数 / 词库变化时是否取消已排队的预加载
+PREFETCH_DEPTH = int(os.environ.get("PREFETCH_DEPTH", 3))
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", 4))
+PREFETCH_CANCEL_ON_CHANGE = os.environ.get("PREFETCH_CANCEL_ON_CHANGE", "1") == "1"
+# 批量出题时每次请求包含几个单词
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", 10))
+# 异步引擎：全进程共享的并发上限，以及每类请求的超时 (秒)
+ENGINE_CONCURRENCY = int(os.environ.get("ENGINE_CONCURRENCY", 16))
+QUIZ_TIMEOUT = float(os.environ.get("QUIZ_TIMEOUT", 60))
+TTS_TIMEOUT = float(os.environ.get("TTS_TIMEOUT", 15))
+IMAGE_TIMEOUT = float(os.environ.get("IMAGE_TIMEOUT", 60))
+
+# 线程池在所有会话之间共享，每个会话只持有自己的预加载队列
+@st.cache_resource
+def get_prefetch_pool():
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+if 'prefetcher' not in st.session_state:
+    st.session_state['prefetcher'] = Prefetcher(get_prefetch_pool(), depth=PREFETCH_DEPTH)
+
+# 整个词库的批量出题单独一个线程：一个一万词的词库按 BULK 优先级排配额要跑半个多小时，
+# 放进预加载线程池会把所有同学的预加载都堵住。各词库的任务在这里排队，一次只跑一个
+@st.cache_resource
+def get_bulk_pool():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk")
+
+# 学习者 ID -> 正在排队或运行的批量任务 (Future)，所有会话共用
+@st.cache_resource
+def get_bulk_jobs():
+    return {}
+# 当前这张卡还在后台跑的请求，离开时取消
+if 'inflight' not in st.session_state:
+    st.session_state['inflight'] = []
+
+@st.cache_resource
+def get_async_engine():
+    return AsyncEngine(max_concurrency=ENGINE_CONCURRENCY)
+
+async_engine = get_async_engine()
+
+# 发音缓存：内存 LRU + 磁盘目录，所有会话共用，同一个单词只合成一次
+@st.cache_resource
+def get_audio_cache():
+    return AudioCache("audio_cache")
+
+audio_cache = get_audio_cache()
+
+# 离线图库 (build_library.py 生成)：启动时读一次，之后查表不再解析 JSON
+@st.cache_resource
+def get_image_library():
+    return ImageLibrary("static_images.jsonl", "static_images.json")
+
+image_library = get_image_library()
+
+# 图片代理：下载一次、存缩略图，同一张图并发请求只会真正下载一次
+@st.cache_resource
+def get_image_proxy():
+    return ImageProxy("image_cache")
+
+image_proxy = get_image_proxy()
+
+# 离线题包：mmap 打开，所有会话共用一份
+@st.cache_resource
+def get_quiz_pack(path):
+    return QuizPack(path)
+
+quiz_pack = get_quiz_pack(QUIZ_PACK) if use_pack else None
+
+# 释义索引：每个出过题的单词记一张释义卡 (正确释义 + 音标等)，所有会话共用，启动时从存储加载
+@st.cache_resource
+def get_gloss_index():
+    index = GlossIndex()
+    for word, gloss, pos, fields in storage.load_glosses():
+        index.add(word, gloss, pos, **fields)
+    return index
+
+gloss_index = get_gloss_index()
+
+# 指标导出 (METRICS_PORT / METRICS_FILE)，进程里只启动一次；图库、图片代理、发音缓存的统计也挂进去
+@st.cache_resource
+def start_metrics():
+    metrics.register("image_library", image_library.stats)
+    metrics.register("image_proxy", image_proxy.stats)
+    metrics.register("image_store", image_proxy.store.stats)
+    metrics.register("audio_store", audio_cache.store.stats)
+    metrics.register("gloss_index", lambda: {"size": len(gloss_index)})
+    return metrics.start_exporters()
+
+start_metrics()
+
+# 侧边栏底部：出题 / 连接池 / 图库统计
+with st.sidebar:
+    qm = quiz_metrics()
+    if qm['calls']:
+        st.caption(f"🧪 出题 {qm['cards']} 张 / 调用 {qm['calls']} 次，本地修复 {qm['repaired']} 次，"
+                   f"每张浪费 {qm['wasted_per_card']:.2f} 次调用")
+    pool_stats = client_pool.stats()
+    if pool_stats['hits']:
+        st.caption(f"🔌 模型连接复用 {pool_stats['hits']} 次，"
+                   f"每次省去约 {pool_stats['avg_setup_ms']:.0f} ms 初始化，"
+                   f"累计 {pool_stats['saved_ms'] / 1000:.1f} s")
+    # 各出题模型的延迟 / 成功率，排名靠前的优先用
+    for name, ms in model_router.snapshot().items():
+        if ms['calls']:
+            st.caption(f"🧠 {name.split('/')[-1]}：{ms['calls']} 次，成功 {ms['success_rate']:.0%}，"
+                       f"p50 {ms['p50'] or 0:.1f}s / p95 {ms['p95'] or 0:.1f}s")
+    hedge_stats = model_router.hedge_stats()
+    if hedge_stats['hedges']:
+        st.caption(f"🏁 对冲请求 {hedge_stats['hedges']} 次，备用模型先到 {hedge_stats['wins']} 次")
+    # 重跑耗时：整页重跑 vs 只重跑选项区 (RENDER_FRAGMENTS=0 可以关掉 fragment 做对比)
+    render_times = st.session_state['render_times']
+    if render_times['full'] or render_times['fragment']:
+        with st.expander("⏱️ 重跑耗时"):
+            for kind, label in (('full', "整页重跑"), ('fragment', "只重跑选项区")):
+                times = sorted(render_times[kind])
+                if times:
+                    st.caption(f"{label} {len(times)} 次：p50 {times[len(times) // 2] * 1000:.0f} ms / "
+                               f"最慢 {times[-1] * 1000:.0f} ms")
+    lib_stats = image_library.stats()
+    if lib_stats['hits'] or lib_stats['misses']:
+        st.caption(f"🖼️ 离线图库 {lib_stats['size']} 张：命中 {lib_stats['hits']} / "
+                   f"未命中 {lib_stats['misses']} ({lib_stats['hit_rate']:.0%})")
+    if use_image_proxy:
+        proxy_stats = image_proxy.stats()
+        st.caption(f"📦 图片代理：本地命中 {proxy_stats['hits']} / 下载 {proxy_stats['fetches']} / "
+                   f"合并请求 {proxy_stats['joined']}")
+    # 当前 Key 的配额：本分钟剩余请求 / token，今日剩余请求；配额紧张时预加载和批量会先被放弃
+    if api_key:
+        budget = get_scheduler(api_key, model_router.ranking()[0]).budget()
+        st.caption(f"📊 配额：本分钟 {budget['rpm_left']}/{budget['rpm']} 次、"
+                   f"{budget['tpm_left']}/{budget['tpm']} tokens，今日剩余 {budget['rpd_left']}/{budget['rpd']} 次")
+        if budget['shed'] or budget['throttled']:
+            st.caption(f"⏳ 排队 {budget['queued']} / 已放弃 {budget['shed']} / 被限流 {budget['throttled']} 次")
+    # 调试面板：整个进程 (所有会话) 的各阶段耗时，看一张卡的时间花在哪
+    if show_metrics:
+        snap = metrics.snapshot()
+        with st.expander("🩺 各阶段耗时", expanded=True):
+            for name, stage in snap['stages'].items():
+                errors = f"，失败 {stage['errors']}" if stage['errors'] else ""
+                st.caption(f"{name}：{stage['count']} 次，p50 {stage['p50'] * 1000:.0f} ms / "
+                           f"p95 {stage['p95'] * 1000:.0f} ms / 平均 {stage['avg'] * 1000:.0f} ms{errors}")
+            for name, c in snap['caches'].items():
+                st.caption(f"缓存 {name}：命中 {c['hit']} / 未命中 {c['miss']} ({c['hit_rate']:.0%})")
+            if not snap['stages'] and not snap['caches']:
+                st.caption("还没有数据，先出几张卡")
 
 # --- 4. 核心逻辑函数 ---
 
-# 只生成 URL 字符串，不下载，速度极快
-def generate_image_url(image_prompt):
-    timestamp = int(time.time())
-    encoded_prompt = requests.utils.quote(image_prompt)
-    return f"https://image.pollinations.ai/prompt/{encoded_prompt}?nolog=true&t={timestamp}"
-
-def generate_quiz(word, key):
-    genai.configure(api_key=key)
-
-    # ✅ 继续使用 Gemma 3 (14.4K 配额)
-    model = genai.GenerativeModel('models/gemma-3-27b-it')
-
-    prompt = f"""
-    请针对单词 "{word}" 设计一道英语词汇测试题。
-
-    必须严格遵守以下规则：
-    1. 直接返回纯 JSON 格式，不要使用 Markdown 标记。
-    2. **核心要求：选项 (options) 中的 text 必须是该单词的【中文释义】，绝对不要使用英文解释！**
-    3. 干扰项 (错误选项) 也必须是其他不相关的【中文词汇】。
-
-    JSON 结构示例：
-    {{
-        "word": "{word}",
-        "ipa": "音标",
-        "image_gen_prompt": "Cartoon style illustration of...",
-        "visual_cue_cn": "中文场景描述",
-        "options": [
-            {{"label": "A", "text": "错误的中文意思"}},
-            {{"label": "B", "text": "正确的中文意思"}},
-            {{"label": "C", "text": "错误的中文意思"}},
-            {{"label": "D", "text": "错误的中文意思"}}
-        ],
-        "correct_label": "B"
-    }}
-    """
+# 先查离线图库，查不到再用 Gemma 的 Prompt 拼 URL (只拼字符串，不下载，速度极快)
+def pick_image_url(word, quiz_data):
+    with metrics.span("image_url"):
+        url = image_library.lookup(word)
+        if url:
+            return url
+        # 使用 Gemma 生成的详细 Prompt，效果更好
+        p = quiz_data.get("image_gen_prompt", f"illustration of {word}")
+        return generate_image_url(p)
+
+def synthesize_audio(word, tld='com'):
+    try:
+        return audio_cache.get_or_synthesize(word, lang='en', tld=tld)
+    except Exception as e:
+        print(f"gTTS Error: {e}")
+        return None
+
+# 记下一道合格题目的释义卡；已经记过的不重复写
+def learn_gloss(word, quiz_data):
+    if word in gloss_index:
+        return
+    card = gloss_index.add_quiz(quiz_data)
+    if card:
+        storage.put_gloss(word, card['gloss'], card['pos'], {k: card[k] for k in CARD_FIELDS if k in card})
 
+# 学过的单词：用释义卡在本地组装一道新题 (微秒级)；没学过或索引里单词太少时返回 None
+def local_quiz(word):
+    if not use_local_options:
+        return None
+    with metrics.span("local_options"):
+        quiz_data = gloss_index.make_quiz(word)
+    metrics.cache_hit("gloss", quiz_data is not None)
+    return quiz_data
+
+def get_or_generate_quiz(word, key, priority=PRIORITY_PREFETCH):
+    quiz_data = local_quiz(word)
+    if quiz_data:
+        return quiz_data
+    quiz_data = quiz_store.get(word, QUIZ_MODEL, PROMPT_VERSION)
+    if not quiz_data:
+        quiz_data = generate_quiz(word, key, priority=priority)
+        if quiz_data:
+            quiz_store.put(word, QUIZ_MODEL, PROMPT_VERSION, quiz_data)
+    if quiz_data:
+        learn_gloss(word, quiz_data)
+    return quiz_data
+
+def warm_image(word, quiz_data, use_proxy):
+    img_url = pick_image_url(word, quiz_data)
+    # 提前请求一次，让 Pollinations 先把图画好；代理模式下顺便存进本地缓存
+    if use_proxy:
+        image_proxy.get(img_url)
+    else:
+        requests.get(img_url, timeout=IMAGE_TIMEOUT)
+    return img_url
+
+# 在后台线程里准备一整张卡片：题目 + 预热图片 + 语音 (交给异步引擎并发跑)
+# 这里不能碰 st.session_state，结果由 generate_new_question 在主线程里取走
+def build_card(word, key, tld, use_proxy):
+    card = async_engine.run_card(
+        word,
+        lambda w: get_or_generate_quiz(w, key),
+        lambda w: synthesize_audio(w, tld),  # 语音合成后进共享缓存，渲染时直接取
+        lambda w, q: warm_image(w, q, use_proxy),
+        QUIZ_TIMEOUT, TTS_TIMEOUT, IMAGE_TIMEOUT,
+    ).result()
+    if card and not card['img_url']:
+        card['img_url'] = pick_image_url(word, card['quiz'])
+    return card
+
+# 在脚本线程里等后台结果：边等边刷新占位符，这样用户中途点了别的按钮时
+# Streamlit 能打断脚本，finally 里顺手把后台请求取消掉
+def wait_for_future(future, label):
+    status = st.empty()
+    start = time.time()
     try:
-        response = model.generate_content(prompt)
-        text = response.text
-        # 清洗 Markdown
-        if "```json" in text:
-            text = text.replace("```json", "").replace("```", "")
-        if "```" in text:
-            text = text.replace("```", "")
-        return json.loads(text)
+        while not future.done():
+            status.caption(f"{label} ({time.time() - start:.1f}s)")
+            time.sleep(0.1)
+        return future.result()
     except Exception as e:
-        print(f"Gemma Error: {e}")
+        print(f"Engine Error: {e!r}")
         return None
+    finally:
+        future.cancel()
+        status.empty()
+
+def cancel_inflight():
+    for future in st.session_state['inflight']:
+        future.cancel()
+    st.session_state['inflight'] = []
+
+def render_card_header(word, ipa):
+    st.markdown(f"<h1 style='text-align: center;'>{word}</h1>", unsafe_allow_html=True)
+    if ipa:
+        st.markdown(f"<p style='text-align: center; color: gray;'>/{ipa}/</p>", unsafe_allow_html=True)
+
+# 流式出题：单词和音标一完整就先画出来，选项和插图 Prompt 还在生成时显示进度
+# 流本身在异步引擎里消费 (和非流式一样有超时、并发上限、可取消)，中间结果通过队列交给脚本线程画
+def stream_quiz_with_preview(word):
+    header = st.empty()
+    status = st.empty()
+    status.caption(f"🤖 AI 正在构思 {word}...")
+    partials = queue.Queue()
+    future = async_engine.submit(
+        async_engine.stream(generate_quiz_stream, word, api_key, on_item=partials.put, timeout=QUIZ_TIMEOUT))
+    st.session_state['inflight'].append(future)
+    try:
+        while not (future.done() and partials.empty()):
+            try:
+                partial = partials.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if partial and ('word' in partial or 'ipa' in partial):
+                with header.container():
+                    render_card_header(partial.get('word', word), partial.get('ipa'))
+                if 'options' not in partial:
+                    status.caption("✍️ 正在生成选项...")
+        quiz_data = future.result()
+    except Exception as e:
+        print(f"Engine Error: {e!r}")
+        quiz_data = None
+    finally:
+        future.cancel()
+        header.empty()
+        status.empty()
+    return quiz_data if is_valid_quiz(quiz_data) else None
+
+def schedule_prefetch(exclude=None):
+    if not api_key:
+        return
+    # 多取一个，防止刚好抽到当前这张
+    if use_srs:
+        candidates = st.session_state['srs'].peek_due(PREFETCH_DEPTH + 1)
+    else:
+        candidates = st.session_state['deck'].peek(PREFETCH_DEPTH + 1)
+    candidates = [w for w in candidates if w != exclude]
+    st.session_state['prefetcher'].fill(candidates, build_card, api_key, tts_tld, use_image_proxy)
+
+# 导入的每一批新单词：进牌堆、进复习队列、写进存储
+def commit_words(words):
+    added = st.session_state['deck'].add_many(words)
+    st.session_state['srs'].add_many(added)
+    storage.add_words(user_id, added)
+
+def import_report_text(report):
+    text = f"✅ 已添加 {report.added} 个单词"
+    if report.duplicates:
+        text += f"，跳过 {report.duplicates} 个重复"
+    if report.invalid:
+        text += f"，{report.invalid} 行无法识别 (例如 {report.samples[0]})"
+    if report.plural_pairs:
+        a, b = report.plural_pairs[0]
+        text += f"，{report.plural_count} 个可能是单复数重复 (例如 {a} / {b})，都已保留"
+    return text
 
 def add_words():
     raw_text = st.session_state.new_words_input
     if raw_text.strip():
-        new_list = [w.strip() for w in raw_text.split('\n') if w.strip()]
-        st.session_state['word_bank'].extend(new_list)
-        st.session_state['remaining_words'].extend(new_list)
+        # 和文件导入走同一套规范化 / 去重 (apple 和 Apple 算同一个词)
+        report = import_words(io.StringIO(raw_text), st.session_state['deck'], commit_words)
+        if PREFETCH_CANCEL_ON_CHANGE:
+            st.session_state['prefetcher'].cancel()
         st.session_state.new_words_input = ""
-        st.toast(f"✅ 已添加 {len(new_list)} 个单词")
+        st.toast(import_report_text(report))
+
+# 上传的大词表边读边导入，每批提交一次并刷新进度，不会把页面卡住
+def import_file(uploaded):
+    bar = st.progress(0.0)
+    size = uploaded.size or 1
+
+    def progress(report):
+        bar.progress(min(1.0, uploaded.tell() / size),
+                     text=f"已读 {report.lines:,} 行，新增 {report.added:,} ({report.lines_per_sec:,.0f} 行/s)")
+
+    report = import_words(uploaded, st.session_state['deck'], commit_words,
+                          chunk_size=2000, name=uploaded.name, progress=progress)
+    bar.empty()
+    if PREFETCH_CANCEL_ON_CHANGE:
+        st.session_state['prefetcher'].cancel()
+    st.toast(import_report_text(report) + f" ({report.lines:,} 行，{report.seconds:.1f}s)")
+
+# 整个词库一次性批量出题，结果写进共享题库，之后抽到哪个词都是秒出
+def batch_generate_bank():
+    jobs = get_bulk_jobs()
+    job = jobs.get(user_id)
+    if job is not None and not job.done():
+        # 同一个词库的任务还没跑完，重复点击不再排一份
+        st.toast("📦 这个词库的批量生成还在进行中")
+        return
+    words = list(st.session_state['deck'])
+    jobs[user_id] = get_bulk_pool().submit(generate_quiz_batch, words, api_key, BATCH_SIZE, 1, quiz_store)
+    st.toast(f"📦 已在后台批量生成 {len(words)} 个单词的题目 (每批 {BATCH_SIZE} 个)")
 
 def check_answer(label):
     st.session_state['user_selection'] = label
     st.session_state['quiz_state'] = 'RESULT'
+    # 记下对错，间隔重复据此安排下次复习
+    correct = label == st.session_state['current_question']['correct_label']
+    st.session_state['srs'].record(st.session_state['current_word'], correct)
+    storage.record_answer(user_id, st.session_state['current_word'], correct)
 
 def next_question():
     st.session_state['quiz_state'] = 'IDLE'
@@ -112,81 +480,231 @@ def next_question():
     st.session_state['generated_image_url'] = None
     generate_new_question()
 
+# 离线题包模式：按同样的规则挑单词，题目 / 插图 / 发音全部从题包里读
+def serve_from_pack(deck, srs):
+    start = time.perf_counter()
+    if use_srs:
+        target_word = next((w for w in srs.peek_due(64) if w in quiz_pack), None)
+    else:
+        target_word = deck.pick()
+        # 题包里没有的单词本轮直接跳过
+        while target_word is not None and target_word not in quiz_pack:
+            deck.discard(target_word)
+            target_word = deck.pick()
+    if target_word is None:
+        st.toast("📦 题包里没有待复习的单词了")
+        return
+    card = quiz_pack.lookup(target_word)
+    deck.discard(target_word)
+    learn_gloss(target_word, card['quiz'])
+    st.session_state['current_word'] = target_word
+    st.session_state['current_question'] = local_quiz(target_word) or card['quiz']
+    st.session_state['generated_image_url'] = card['image']
+    st.session_state['current_audio'] = card['audio']
+    st.session_state['quiz_state'] = 'QUIZ'
+    metrics.observe("card", time.perf_counter() - start, source="pack")
+    st.rerun()
+
 def generate_new_question():
-    if not api_key:
+    if not api_key and not use_pack:
         st.toast("⚠️ 请先输入 API Key")
         return
 
-    if not st.session_state['remaining_words']:
-        if not st.session_state['word_bank']:
-            st.warning("词库空了！")
+    deck = st.session_state['deck']
+    srs = st.session_state['srs']
+    if not len(deck):
+        st.warning("词库空了！")
+        return
+    if use_srs:
+        if srs.next_due() is None:
+            due_at = time.strftime("%m-%d %H:%M", time.localtime(srs.next_due_time()))
+            st.toast(f"🎉 暂时没有到期的单词，下一个在 {due_at}")
             return
-        st.session_state['remaining_words'] = st.session_state['word_bank'].copy()
+    elif not deck.remaining:
+        deck.new_round()
         st.toast("🔄 开启新一轮复习！")
+    is_allowed = srs.is_due if use_srs else deck.is_remaining
 
     # 清空当前显示
     st.session_state['generated_image_url'] = None
-    target_word = random.choice(st.session_state['remaining_words'])
+    st.session_state['current_audio'] = None
+    if use_pack:
+        serve_from_pack(deck, srs)
+        return
 
-    # === 回归简单逻辑：串行处理 ===
-    # 这样最稳，不会出现并行导致的线程卡死或请求丢失
+    # 0. 预加载队列里有现成的卡片就直接用
+    # card 指标：从点按钮到这张卡准备好 (不含之后的渲染)，按来源分开统计
+    start = time.perf_counter()
+    prefetcher = st.session_state['prefetcher']
+    target_word, card = prefetcher.pop_ready(is_allowed)
+    metrics.cache_hit("prefetch", card is not None)
+    if card:
+        st.session_state['quiz_cache'][target_word] = card['quiz']
+        st.session_state['image_cache'][target_word] = card['img_url']
+        storage.put_media(target_word, 'image', card['img_url'])
+        deck.discard(target_word)
+        st.session_state['current_word'] = target_word
+        st.session_state['current_question'] = card['quiz']
+        st.session_state['generated_image_url'] = card['img_url']
+        st.session_state['quiz_state'] = 'QUIZ'
+        schedule_prefetch(exclude=target_word)
+        st.toast("⚡️ 命中预加载")
+        metrics.observe("card", time.perf_counter() - start, source="prefetch")
+        st.rerun()
+
+    target_word = srs.next_due() if use_srs else deck.pick()
+    # 当前这张同步生成，同时让后台先开始准备后面几张
+    prefetcher.discard(target_word)
+    schedule_prefetch(exclude=target_word)
 
     quiz_data = None
     img_url = None
 
-    # 1. 查缓存
-    if target_word in st.session_state['quiz_cache']:
-        quiz_data = st.session_state['quiz_cache'][target_word]
+    # 1. 学过的单词直接本地组装选项；否则查缓存 (先查本会话，再查所有会话共享的题库)
+    quiz_data = local_quiz(target_word)
+    source = "local"
+    if not quiz_data:
+        if target_word in st.session_state['quiz_cache']:
+            quiz_data = st.session_state['quiz_cache'][target_word]
+        else:
+            quiz_data = quiz_store.get(target_word, QUIZ_MODEL, PROMPT_VERSION)
+            if quiz_data:
+                st.session_state['quiz_cache'][target_word] = quiz_data
+        metrics.cache_hit("quiz", quiz_data is not None)
+        source = "cache" if quiz_data else "generated"
     if target_word in st.session_state['image_cache']:
         img_url = st.session_state['image_cache'][target_word]
         st.toast("⚡️ 命中缓存")
+    else:
+        img_url = storage.get_media(target_word, 'image')
 
-    # 2. 生成题目 (如果没缓存)
+    # 2. 语音不依赖题目，先交给异步引擎，和出题同时进行
+    cancel_inflight()
+    audio_future = async_engine.submit(
+        async_engine.optional(synthesize_audio, target_word, tts_tld, timeout=TTS_TIMEOUT))
+    st.session_state['inflight'].append(audio_future)
+
+    # 3. 生成题目 (如果没缓存)
     if not quiz_data:
-        with st.spinner(f"🤖 AI 正在构思 {target_word}..."):
-            quiz_data = generate_quiz(target_word, api_key)
-            if quiz_data:
-                st.session_state['quiz_cache'][target_word] = quiz_data
-            else:
-                st.error("题目生成失败，请重试")
-                return
+        if use_streaming:
+            quiz_data = stream_quiz_with_preview(target_word)
+        else:
+            quiz_future = async_engine.submit(
+                async_engine.call(generate_quiz, target_word, api_key, timeout=QUIZ_TIMEOUT))
+            st.session_state['inflight'].append(quiz_future)
+            quiz_data = wait_for_future(quiz_future, f"🤖 AI 正在构思 {target_word}...")
+        if quiz_data:
+            st.session_state['quiz_cache'][target_word] = quiz_data
+            quiz_store.put(target_word, QUIZ_MODEL, PROMPT_VERSION, quiz_data)
+        else:
+            st.error("题目生成失败，请重试")
+            return
+    learn_gloss(target_word, quiz_data)
 
-    # 3. 生成图片 URL (如果没缓存)
-    # 这一步非常快，只是拼接字符串，不涉及下载
+    # 4. 生成图片 URL (如果没缓存)；代理模式下马上开始下载，渲染时会直接接上这次下载
     if not img_url and quiz_data:
-        # 使用 Gemma 生成的详细 Prompt，效果更好
-        p = quiz_data.get("image_gen_prompt", f"illustration of {target_word}")
-        img_url = generate_image_url(p)
+        img_url = pick_image_url(target_word, quiz_data)
         st.session_state['image_cache'][target_word] = img_url
+        storage.put_media(target_word, 'image', img_url)
+    if use_image_proxy:
+        st.session_state['inflight'].append(async_engine.submit(
+            async_engine.optional(image_proxy.get, img_url, timeout=IMAGE_TIMEOUT)))
+
+    # 语音一般早就好了；没好就再等一下，免得渲染时又重新合成一遍
+    wait_for_future(audio_future, "🔊 准备发音...")
 
-    # 4. 更新界面
-    if target_word in st.session_state['remaining_words']:
-        st.session_state['remaining_words'].remove(target_word)
+    # 5. 更新界面
+    deck.discard(target_word)
 
+    st.session_state['current_word'] = target_word
     st.session_state['current_question'] = quiz_data
     st.session_state['generated_image_url'] = img_url
     st.session_state['quiz_state'] = 'QUIZ'
+    metrics.observe("card", time.perf_counter() - start, source=source)
 
     st.rerun()
 
 # --- 5. 界面渲染 ---
 
+# 选项区和结果区：点选项时只重跑这一块，单词、发音、插图、进度条都沿用上一次的渲染结果
+RENDER_FRAGMENTS = os.environ.get("RENDER_FRAGMENTS", "1") == "1"
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+def render_answer_panel():
+    start = time.perf_counter()
+    current_q = st.session_state['current_question']
+    if not current_q or st.session_state['quiz_state'] not in ['QUIZ', 'RESULT']:
+        return
+    # 重画按钮只在答题前显示，放在 fragment 里，答完题它跟着选项区一起消失
+    if st.session_state['quiz_state'] == 'QUIZ' and st.session_state['generated_image_url'] and not use_pack:
+        if st.button("🔄 图片不准？重画"):
+            with st.spinner("重绘中..."):
+                # 换一个随机 seed 就是一张新图
+                p = current_q.get("image_gen_prompt", f"illustration of {current_q['word']}")
+                new_url = generate_image_url(p, seed=random.randint(0, 2**31 - 1))
+                st.session_state['generated_image_url'] = new_url
+                st.session_state['image_cache'][current_q['word']] = new_url
+                storage.put_media(current_q['word'], 'image', new_url)
+                st.rerun()  # 图片在 fragment 外面，要整页重跑
+    st.write("### 👇 选择释义：")
+    dis = (st.session_state['quiz_state'] == 'RESULT')
+    options = current_q['options']
+
+    col1, col2 = st.columns(2)
+    def render_btn(idx):
+        if idx >= len(options): return
+        opt = options[idx]
+        b_type = "primary" if dis and opt['label'] == current_q['correct_label'] else "secondary"
+        st.button(f"{opt['label']}. {opt['text']}", key=opt['label'], disabled=dis, type=b_type,
+                  use_container_width=True, on_click=check_answer, args=(opt['label'],))
+
+    with col1: render_btn(0); render_btn(1)
+    with col2: render_btn(2); render_btn(3)
+
+    if st.session_state['quiz_state'] == 'RESULT':
+        if st.session_state['user_selection'] == current_q['correct_label']:
+            st.success("🎉 正确！")
+        else:
+            ans = next((o['text'] for o in options if o['label'] == current_q['correct_label']), "")
+            st.error(f"❌ 错误。答案是 {current_q['correct_label']}. {ans}")
+            st.info(f"💡 提示：{current_q.get('visual_cue_cn', '')}")
+        # 换下一张要整页重跑 (单词、图片都变了)；st.rerun() 默认就是整页
+        if st.button("➡️ 下一个", type="primary", use_container_width=True):
+            next_question()
+            st.rerun()  # 没出成新题 (比如暂时没有到期的单词) 时也要刷新整页
+
+    if not st.session_state['in_full_run']:
+        st.session_state['render_times']['fragment'].append(time.perf_counter() - start)
+        metrics.observe("rerun", time.perf_counter() - start, kind="fragment")
+
+if RENDER_FRAGMENTS and fragment:
+    render_answer_panel = fragment(render_answer_panel)
+
+
 st.title("🎨 英语单词闪卡大师 (Gemma 稳定版)")
 
-with st.expander("➕ 添加生词", expanded=not st.session_state['word_bank']):
+deck = st.session_state['deck']
+with st.expander("➕ 添加生词", expanded=not len(deck)):
     st.text_area("输入单词 (每行一个)", key="new_words_input", height=100)
     st.button("存入", on_click=add_words)
-
-if st.session_state['word_bank']:
-    left = len(st.session_state['remaining_words'])
-    st.caption(f"待复习: {left} / 总数: {len(st.session_state['word_bank'])}")
-    st.progress(1 - left/len(st.session_state['word_bank']))
+    uploaded = st.file_uploader("或者上传单词表 (TXT / CSV / Anki 导出)", type=["txt", "csv", "tsv"])
+    if uploaded and st.button("📥 导入文件"):
+        import_file(uploaded)
+    if len(deck):
+        st.button("📦 批量预生成题目", on_click=batch_generate_bank, disabled=not api_key)
+
+# 进度在 fragment 外面：答完一题后这里还是答题前的数字，点 "下一个" 整页重跑时才更新 (刻意的取舍，
+# 为了答题只重跑选项区)；fragment 不能往外面的容器里写
+if len(deck):
+    left = st.session_state['srs'].due_count() if use_srs else deck.remaining
+    st.caption(f"{'已到期' if use_srs else '待复习'}: {left} / 总数: {len(deck)}")
+    st.progress(1 - left/len(deck))
 
 st.divider()
 
-if st.session_state['quiz_state'] == 'IDLE' and st.session_state['word_bank']:
+if st.session_state['quiz_state'] == 'IDLE' and len(deck):
     btn_label = "🚀 开始测试" if not st.session_state['has_started'] else "🚀 下一张"
-    if st.button(btn_label, type="primary", use_container_width=True, disabled=not api_key):
+    if st.button(btn_label, type="primary", use_container_width=True, disabled=not (api_key or use_pack)):
         st.session_state['has_started'] = True
         generate_new_question()
 
@@ -194,58 +712,36 @@ current_q = st.session_state['current_question']
 img_url = st.session_state['generated_image_url']
 
 if current_q and st.session_state['quiz_state'] in ['QUIZ', 'RESULT']:
-    st.markdown(f"<h1 style='text-align: center;'>{current_q['word']}</h1>", unsafe_allow_html=True)
-    st.markdown(f"<p style='text-align: center; color: gray;'>/{current_q['ipa']}/</p>", unsafe_allow_html=True)
+    render_card_header(current_q['word'], current_q['ipa'])
 
     # 语音
     col_a, col_b, col_c = st.columns([1, 2, 1])
     with col_b:
-        try:
-            tts = gTTS(text=current_q['word'], lang='en')
-            sound_file = io.BytesIO()
-            tts.write_to_fp(sound_file)
-            st.audio(sound_file, format='audio/mp3')
-        except: pass
+        # 每次重跑都会走到这里，但只有第一次真正请求 gTTS，之后都是缓存命中
+        # 题包模式不访问网络：--no-audio 编译的题包没有发音，就不放
+        audio = st.session_state['current_audio']
+        if audio is None and not use_pack:
+            audio = synthesize_audio(current_q['word'], tts_tld)
+        if audio:
+            # 缓存里拿到的是 mmap 切片；st.audio 只收 bytes，这里临时转一下，用完即丢，不存进会话
+            st.audio(bytes(audio), format='audio/mp3')
 
     # 图片展示 (浏览器负责加载，速度取决于用户网速，不会卡死应用)
     if img_url:
-        st.image(img_url, caption="AI 联想记忆", use_container_width=True)
-
-        # 重新生成按钮
-        if st.session_state['quiz_state'] == 'QUIZ':
-            if st.button("🔄 图片不准？重画"):
-                with st.spinner("重绘中..."):
-                    # 重新生成一个带新时间戳的 URL
-                    p = current_q.get("image_gen_prompt", f"illustration of {current_q['word']}")
-                    new_url = generate_image_url(p)
-                    # 强制等待 1秒让时间戳生效
-                    time.sleep(0.5)
-                    st.session_state['generated_image_url'] = new_url
-                    st.session_state['image_cache'][current_q['word']] = new_url
-                    st.rerun()
-
-    # 选项区
-    st.write("### 👇 选择释义：")
-    dis = (st.session_state['quiz_state'] == 'RESULT')
-    options = current_q['options']
-
-    col1, col2 = st.columns(2)
-    def render_btn(idx):
-        if idx >= len(options): return
-        opt = options[idx]
-        b_type = "primary" if dis and opt['label'] == current_q['correct_label'] else "secondary"
-        if st.button(f"{opt['label']}. {opt['text']}", key=opt['label'], disabled=dis, type=b_type, use_container_width=True):
-            check_answer(opt['label'])
-            st.rerun()
-
-    with col1: render_btn(0); render_btn(1)
-    with col2: render_btn(2); render_btn(3)
-
-    if st.session_state['quiz_state'] == 'RESULT':
-        if st.session_state['user_selection'] == current_q['correct_label']:
-            st.success("🎉 正确！")
-        else:
-            ans = next((o['text'] for o in options if o['label'] == current_q['correct_label']), "")
-            st.error(f"❌ 错误。答案是 {current_q['correct_label']}. {ans}")
-            st.info(f"💡 提示：{current_q.get('visual_cue_cn', '')}")
-        st.button("➡️ 下一个", on_click=next_question, type="primary", use_container_width=True)
\ No newline at end of file
+        img_src = img_url
+        # 题包里打包的是图片字节，直接显示
+        if use_image_proxy and isinstance(img_url, str):
+            try:
+                with st.spinner("🎨 加载插图..."):
+                    img_src = image_proxy.get(img_url)
+            except Exception as e:
+                print(f"Image Proxy Error: {e}")  # 代理失败就退回让浏览器直接加载
+        if isinstance(img_src, memoryview):
+            img_src = bytes(img_src)
+        st.image(img_src, caption="AI 联想记忆", use_container_width=True)
+
+    render_answer_panel()
+
+st.session_state['in_full_run'] = False
+st.session_state['render_times']['full'].append(time.perf_counter() - RUN_START)
+metrics.observe("rerun", time.perf_counter() - RUN_START, kind="full")
\ No newline at end of file
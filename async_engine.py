@@ -0,0 +1,109 @@
+# async_engine.py - 出题 / 图片 / 语音的异步请求引擎
+# 一个后台事件循环线程供所有会话共用；同步的 SDK (Gemini、gTTS、requests) 通过线程桥接进来。
+# 每次调用都有超时，整个进程共享一个并发上限，防止一群同学同时点击把 API 打爆。
+# 返回的都是 concurrent.futures.Future，脚本线程可以等结果，也可以随时 cancel()。
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncEngine:
+    def __init__(self, max_concurrency=16):
+        self.max_concurrency = max_concurrency
+        self.loop = asyncio.new_event_loop()
+        # asyncio.to_thread 用的是事件循环的默认线程池，默认只有 min(32, CPU 数 + 4) 个线程：
+        # 1 核的机器上最多同时跑 5 个，并发上限形同虚设，排队的调用还在白白消耗自己的超时。
+        # 这里用自己的线程池，大小和并发上限一样 (名额在线程真正跑完时才归还，见 _run)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="engine")
+        self.loop.set_default_executor(self.executor)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.orphaned = 0  # 已经超时 / 取消、但线程里的请求还没跑完的调用数
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True, name="async-engine")
+        self.thread.start()
+
+    async def _run(self, fn, *args, timeout=None):
+        # 占一个并发名额在线程里跑同步函数。超时或被取消时调用方立刻返回，
+        # 但线程没法强行停下，请求还在打 API：名额要等线程真正跑完才归还，不然并发上限又被突破了
+        await self.semaphore.acquire()
+        self.active += 1
+        task = self.loop.run_in_executor(self.executor, fn, *args)
+
+        def release(_):
+            self.active -= 1
+            self.semaphore.release()
+
+        task.add_done_callback(release)
+        try:
+            # shield：超时只取消这边的等待，不把 task 标成已完成 (否则名额会被提前归还)
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if not task.done():
+                self.orphaned += 1
+                task.add_done_callback(self._orphan_done)
+            raise
+
+    def _orphan_done(self, task):
+        self.orphaned -= 1
+        if not task.cancelled():
+            task.exception()  # 取走异常，免得事件循环报 "exception was never retrieved"
+
+    async def call(self, fn, *args, timeout=None):
+        # 在线程里跑同步函数；超时或被取消时这边立刻返回 (线程里的请求会自己跑完后被丢弃)
+        return await self._run(fn, *args, timeout=timeout)
+
+    async def stream(self, gen_fn, *args, on_item, timeout=None):
+        # 在线程里消费一个同步生成器 (流式出题)，每个中间结果交给 on_item，返回最后一个。
+        # 和 call 一样占一个并发名额、受超时限制；超时或被取消后线程在下一个分片处停下并关掉生成器 (连同 HTTP 流)
+        stop = threading.Event()
+
+        def consume():
+            last = None
+            gen = gen_fn(*args)
+            try:
+                for item in gen:
+                    if stop.is_set():
+                        break
+                    last = item
+                    on_item(item)
+            finally:
+                gen.close()
+            return last
+
+        try:
+            return await self._run(consume, timeout=timeout)
+        finally:
+            stop.set()
+
+    async def optional(self, fn, *args, timeout=None):
+        # 图片、语音失败不影响出题，记一下日志返回 None
+        try:
+            return await self.call(fn, *args, timeout=timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Engine Error ({getattr(fn, '__name__', fn)}): {e!r}")
+            return None
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _card(self, word, quiz_fn, audio_fn, image_fn, quiz_timeout, audio_timeout, image_timeout):
+        # 语音只依赖单词，和出题同时开始；图片要用题目里的 Prompt，出完题立刻开始
+        audio_task = asyncio.ensure_future(self.optional(audio_fn, word, timeout=audio_timeout))
+        try:
+            quiz = await self.call(quiz_fn, word, timeout=quiz_timeout)
+            if not quiz:
+                return None
+            img_url = await self.optional(image_fn, word, quiz, timeout=image_timeout)
+            await audio_task
+            return {"quiz": quiz, "img_url": img_url}
+        finally:
+            audio_task.cancel()
+
+    def run_card(self, word, quiz_fn, audio_fn, image_fn, quiz_timeout=60, audio_timeout=15, image_timeout=60):
+        # 一张卡片的耗时约等于 max(出题 + 图片, 语音)，而不是三者相加
+        return self.submit(self._card(word, quiz_fn, audio_fn, image_fn, quiz_timeout, audio_timeout, image_timeout))
+
+    def stats(self):
+        return {"active": self.active, "limit": self.max_concurrency, "orphaned": self.orphaned}
@@ -0,0 +1,37 @@
+# bench_batch.py - 批量出题压测：比较 K=1/5/10/20 时的 words/s 和 tokens/word
+# 用法: python bench_batch.py [单词数]
+# 全程只访问本地假 Gemini 服务，不消耗真实配额。
+import os
+import sys
+import time
+
+from fake_backends import FakeGemini
+
+server = FakeGemini(base_latency=0.3, tokens_per_sec=400)
+os.environ["GEMINI_API_ENDPOINT"] = server.start()
+# 假服务不限流，放开本地配额调度，只测模型本身
+os.environ.setdefault("QUOTA_RPM", "100000")
+os.environ.setdefault("QUOTA_TPM", "100000000")
+
+from quiz_gen import generate_quiz, generate_quiz_batch  # noqa: E402  (需要先设置好 endpoint)
+
+n_words = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+words = [f"word{i:03d}" for i in range(n_words)]
+
+print(f"🚀 {n_words} 个单词，假服务: {server.url}")
+print(f"{'K':>4} {'calls':>6} {'seconds':>8} {'words/s':>8} {'tokens/word':>12}")
+
+for k in (1, 5, 10, 20):
+    usage = {}
+    start = time.perf_counter()
+    if k == 1:
+        # K=1 就是原来逐个调用 generate_quiz 的方式
+        results = {w: q for w in words if (q := generate_quiz(w, "fake-key", usage=usage))}
+    else:
+        results = generate_quiz_batch(words, "fake-key", batch_size=k, usage=usage)
+    elapsed = time.perf_counter() - start
+    tokens = usage.get('prompt_tokens', 0) + usage.get('output_tokens', 0)
+    print(f"{k:>4} {usage.get('calls', 0):>6} {elapsed:>8.2f} "
+          f"{len(results) / elapsed:>8.1f} {tokens / max(len(results), 1):>12.1f}")
+
+server.stop()
@@ -0,0 +1,61 @@
+# bench_deck.py - 对比旧的 list 抽词方式和 Deck 在 1k / 10k / 100k 词库下的耗时
+# 用法: python bench_deck.py
+import random
+import time
+
+from deck import Deck
+
+OPS = 500  # 每个规模下做多少次抽词 / 添加
+
+
+def bench_list(words, new_words):
+    # 旧写法：word_bank + remaining_words 两个 list
+    word_bank = list(words)
+    remaining = word_bank.copy()
+
+    start = time.perf_counter()
+    for _ in range(OPS):
+        w = random.choice(remaining)
+        remaining.remove(w)          # O(n)
+    draw = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for w in new_words:
+        if w not in word_bank:       # 想去重只能线性扫描
+            word_bank.append(w)
+            remaining.append(w)
+    add = time.perf_counter() - start
+
+    start = time.perf_counter()
+    remaining = word_bank.copy()     # 开新一轮要复制整个词库
+    refill = time.perf_counter() - start
+    return draw, add, refill
+
+
+def bench_deck(words, new_words):
+    deck = Deck(words)
+
+    start = time.perf_counter()
+    for _ in range(OPS):
+        deck.draw()
+    draw = time.perf_counter() - start
+
+    start = time.perf_counter()
+    deck.add_many(new_words)
+    add = time.perf_counter() - start
+
+    start = time.perf_counter()
+    deck.new_round()
+    refill = time.perf_counter() - start
+    return draw, add, refill
+
+
+print(f"每个规模做 {OPS} 次抽词 + {OPS} 次添加 + 1 次开新一轮 (单位: 微秒/次)")
+print(f"{'words':>8} {'impl':>6} {'draw':>10} {'add':>10} {'new_round':>10}")
+for n in (1_000, 10_000, 100_000):
+    words = [f"word{i}" for i in range(n)]
+    # 一半是重复词，一半是新词
+    new_words = [f"word{i}" for i in range(OPS // 2)] + [f"new{i}" for i in range(OPS // 2)]
+    for name, fn in (("list", bench_list), ("deck", bench_deck)):
+        draw, add, refill = fn(words, new_words)
+        print(f"{n:>8} {name:>6} {draw / OPS * 1e6:>10.2f} {add / OPS * 1e6:>10.2f} {refill * 1e6:>10.1f}")
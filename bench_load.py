@@ -0,0 +1,175 @@
+# bench_load.py - 多用户压测：N 个模拟同学同时刷 app.py，看同一套后端和共享缓存能扛多少人
+# 用法: python bench_load.py [--users 20] [--cards 5] [--gemini-latency 0.5] [--image-latency 1.0] [--tts-latency 0.2]
+#       python bench_load.py --faults faults.json   # 按配置注入延迟抖动 / 长尾 / 5xx / 429 (格式见 fake_backends.DEFAULT_CONFIG)
+# 用 Streamlit 的 AppTest 无界面地跑完整流程 (添加单词 -> 开始 -> 答题 -> 下一个)，
+# Gemini / 图片 / 发音全部换成本地假服务 (fake_backends.py)，不消耗真实配额，结果可复现。
+# 每个模拟同学一个独立进程：AppTest 会改进程全局的 Runtime 单例和全局配置，同一进程里的多个线程跑不起来。
+# 所以各进程的 st.cache_resource 不共享，但题库 (SQLite)、发音和图片缓存 (media_store) 都在同一个临时目录里共用。
+# 所有进程先各自把页面加载一遍，在屏障处等齐了再一起开始刷卡。
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from fake_backends import FakeGemini, FakeImages, FakeTTS, SERVICES, load_config, start_all
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(REPO_DIR, "app.py")
+WORDS = ["apple", "banana", "orange", "computer", "mountain", "ocean", "freedom", "ambitious",
+         "galaxy", "telescope", "negotiate", "consensus", "harvest", "journey", "lantern", "meadow"]
+
+parser = argparse.ArgumentParser(description="多用户并发压测 app.py")
+parser.add_argument("--users", type=int, default=20, help="同时在线的模拟同学数")
+parser.add_argument("--cards", type=int, default=5, help="每个同学刷几张卡")
+parser.add_argument("--words", type=int, default=10, help="每个同学的词库大小")
+parser.add_argument("--gemini-latency", type=float, default=0.5)
+parser.add_argument("--tokens-per-sec", type=float, default=200)
+parser.add_argument("--image-latency", type=float, default=1.0)
+parser.add_argument("--tts-latency", type=float, default=0.2)
+parser.add_argument("--faults", help="假服务的故障配置 (JSON)，给了就忽略上面几个延迟参数")
+parser.add_argument("--timeout", type=float, default=120, help="单次脚本运行的超时 (秒)")
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def find(elements, prefix):
+    return next((e for e in elements if str(e.label).startswith(prefix)), None)
+
+
+def simulate_user(i, args, barrier):
+    # 在子进程里跑一个同学，返回 {"latencies", "errors", "start", "end", "rss", "session_rss"}
+    # session_rss：页面加载完之后到刷完卡这段时间涨的内存，近似这个会话自己占的部分
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(i)
+    errors = []
+    latencies = []
+    at = AppTest.from_file(APP, default_timeout=args.timeout)
+    at.run()
+    base_rss = rss_mb()
+    barrier.wait()
+    session_start = time.time()
+    find(at.text_input, "请输入 Gemini").input("fake-key")
+    find(at.text_input, "👤").input(f"loadtest-{i}")
+    at.run()
+    at.text_area(key="new_words_input").input("\n".join(rng.sample(WORDS, min(args.words, len(WORDS)))))
+    find(at.button, "存入").click()
+    at.run()
+
+    next_button = find(at.button, "🚀")
+    for n in range(args.cards):
+        start = time.perf_counter()
+        next_button.click()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        if at.exception:
+            errors.append(str(at.exception[0].value))
+            break
+        option = find(at.button, "A. ")
+        if option is None:
+            errors.append("没有出题")
+            break
+        option.click()
+        at.run()
+        next_button = find(at.button, "➡️")
+        if next_button is None:
+            errors.append("没有下一个按钮")
+            break
+    return {"latencies": latencies, "errors": errors, "start": session_start, "end": time.time(),
+            "rss": rss_mb(), "session_rss": rss_mb() - base_rss}
+
+
+def run_user(i, args, barrier, results):
+    try:
+        results.put(simulate_user(i, args, barrier))
+    except Exception as e:
+        barrier.abort()
+        results.put({"latencies": [], "errors": [repr(e)], "start": None, "end": None, "rss": 0.0, "session_rss": 0.0})
+
+
+def main():
+    args = parser.parse_args()
+    if args.faults:
+        config = load_config(args.faults)
+        for name in SERVICES:
+            config[name]["port"] = 0
+        gemini, images, tts = start_all(config).values()
+    else:
+        gemini = FakeGemini(base_latency=args.gemini_latency, tokens_per_sec=args.tokens_per_sec)
+        images = FakeImages(base_latency=args.image_latency)
+        tts = FakeTTS(base_latency=args.tts_latency)
+        for server in (gemini, images, tts):
+            server.start()
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    os.environ.update({
+        "GEMINI_API_ENDPOINT": gemini.url,
+        "IMAGE_ENDPOINT": images.url,
+        "TTS_ENDPOINT": tts.url,
+        "IMAGE_PROXY": "1",
+        # 假服务不限流，放开本地配额调度
+        "QUOTA_RPM": "100000",
+        "QUOTA_TPM": "100000000",
+        "QUOTA_RPD": "10000000",
+        "STORAGE_URL": f"sqlite://{os.path.join(workdir, 'quiz_cache.db')}",
+        # AppTest 不支持只重跑 fragment，统一按整页重跑测
+        "RENDER_FRAGMENTS": "0",
+    })
+    # app 里的缓存目录都是相对路径，换到临时目录，每次压测都从冷缓存开始
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(args.users)
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=run_user, args=(i, args, barrier, queue)) for i in range(args.users)]
+    for proc in procs:
+        proc.start()
+    results = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    started = [r["start"] for r in results if r["start"] is not None]
+    ended = [r["end"] for r in results if r["end"] is not None]
+    elapsed = max(ended) - min(started) if started else 0.0
+    latencies = [t for r in results for t in r["latencies"]]
+    errors = [e for r in results for e in r["errors"]]
+    session_rss = sum(r["session_rss"] for r in results) / len(results)
+    process_rss = sum(r["rss"] for r in results) / len(results)
+    if args.faults:
+        print(f"🚀 {args.users} 个同学 x {args.cards} 张卡，故障配置 {args.faults}")
+    else:
+        print(f"🚀 {args.users} 个同学 x {args.cards} 张卡，Gemini {args.gemini_latency}s / 图片 {args.image_latency}s / "
+              f"发音 {args.tts_latency}s")
+    print(f"完成 {len(latencies)} 张卡，耗时 {elapsed:.1f}s，吞吐 {len(latencies) / elapsed if elapsed else 0:.2f} 张/s")
+    print(f"单张卡耗时  p50 {percentile(latencies, 50) * 1000:.0f} ms  p95 {percentile(latencies, 95) * 1000:.0f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:.0f} ms")
+    print(f"每个会话内存 {session_rss:.1f} MB (页面加载后的增量)，每个进程常驻 {process_rss:.0f} MB")
+    print(f"后端请求数  Gemini {gemini.request_count}  图片 {images.request_count}  发音 {tts.request_count}")
+    print(f"注入的故障  Gemini 5xx {gemini.faults.errors} / 429 {gemini.faults.throttled}  "
+          f"图片 5xx {images.faults.errors} / 429 {images.faults.throttled}  "
+          f"发音 5xx {tts.faults.errors} / 429 {tts.faults.throttled}")
+    if errors:
+        print(f"⚠️ {len(errors)} 个错误，例如: {errors[0]}")
+
+    for server in (gemini, images, tts):
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench_media.py - 媒体内存占用压测：每个会话各存一份 bytes vs 共用 MediaStore 的 mmap 切片
+# 用法: python bench_media.py [每个会话缓存的卡片数]
+# 模拟 1 / 50 / 200 个会话，每个会话手里拿着最近几张卡的发音和插图，测进程常驻内存 (RSS)。
+# 每组在单独的子进程里跑，互不影响。只在 Linux 上能读到 /proc/self/status。
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from media_store import MediaStore
+
+N_WORDS = 200
+AUDIO_BYTES = 20 * 1024   # 一个单词的 MP3 大约 10~30 KB
+IMAGE_BYTES = 60 * 1024   # 640 宽的 WebP 缩略图大约 40~80 KB
+SESSIONS = [1, 50, 200]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def build(path):
+    store = MediaStore(path)
+    rng = random.Random(0)
+    for i in range(N_WORDS):
+        store.put(f"audio:{i}", rng.randbytes(AUDIO_BYTES))
+        store.put(f"image:{i}", rng.randbytes(IMAGE_BYTES))
+
+
+def run(path, mode, n_sessions, per_session):
+    store = MediaStore(path)
+    rng = random.Random(n_sessions)
+    base = rss_mb()
+    sessions = []
+    for _ in range(n_sessions):
+        cards = []
+        for i in rng.sample(range(N_WORDS), per_session):
+            audio, image = store.get(f"audio:{i}"), store.get(f"image:{i}")
+            if mode == "bytes":
+                # 以前的做法：每个会话的 session_state 里各存一份
+                audio, image = bytes(audio), bytes(image)
+            else:
+                # 切片只是一个指针，但渲染时确实会读到这些页
+                audio[0], image[-1]
+            cards.append((audio, image))
+        sessions.append(cards)
+    print(f"{rss_mb() - base:.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        run(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]))
+        sys.exit()
+
+    per_session = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "media")
+        build(path)
+        total_mb = N_WORDS * (AUDIO_BYTES + IMAGE_BYTES) / 1024 / 1024
+        print(f"🚀 {N_WORDS} 个单词的媒体共 {total_mb:.1f} MB，每个会话缓存 {per_session} 张卡")
+        print(f"{'会话数':>6} {'bytes 副本 (MB)':>16} {'mmap 切片 (MB)':>16}")
+        for n in SESSIONS:
+            row = []
+            for mode in ("bytes", "mmap"):
+                out = subprocess.run([sys.executable, __file__, "--child", path, mode, str(n), str(per_session)],
+                                     capture_output=True, text=True, check=True)
+                row.append(float(out.stdout.strip()))
+            print(f"{n:>6} {row[0]:>16.1f} {row[1]:>16.1f}")
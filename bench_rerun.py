@@ -0,0 +1,163 @@
+# bench_rerun.py - 点选项后的重跑耗时：只重跑选项区 (RENDER_FRAGMENTS=1) vs 整页重跑 (RENDER_FRAGMENTS=0)
+# 用法: python bench_rerun.py [--cards 20] [--port 8599]
+# 真的起一个 streamlit run app.py (AppTest 不支持只重跑 fragment)，用 websocket 按浏览器的协议发点击，
+# 从发出点击到收到 script_finished 计时 (含 Streamlit 自己调度、收发消息的固定开销)；
+# 另外从 app 的 /metrics (METRICS_PORT) 读脚本本身的耗时 (flashcard_rerun_seconds，按整页 / fragment 分)。
+# Gemini / 图片 / 发音全部走 FAKE_BACKENDS 假服务。
+# 两种模式各起一次服务，各用一个新的临时目录，缓存都是冷的。
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(REPO_DIR, "app.py")
+WORDS = ["apple", "banana", "orange", "computer", "mountain", "ocean", "freedom", "ambitious",
+         "galaxy", "telescope", "negotiate", "consensus", "harvest", "journey", "lantern", "meadow"]
+
+parser = argparse.ArgumentParser(description="对比 fragment 重跑和整页重跑的耗时")
+parser.add_argument("--cards", type=int, default=20, help="每种模式答几张卡")
+parser.add_argument("--port", type=int, default=8599)
+parser.add_argument("--timeout", type=float, default=120, help="单次重跑的超时 (秒)")
+
+
+class Session:
+    # 一个 "浏览器标签页"：记住页面上的元素和输入框的值，每次重跑都把所有输入框的值带上 (前端就是这么做的)
+    def __init__(self, ws, timeout):
+        self.ws = ws
+        self.timeout = timeout
+        self.elements = {}   # delta_path -> (元素, 所在 fragment 的 id)
+        self.values = {}     # 控件 id -> (WidgetState 的字段名, 值)
+        self.page_hash = ""
+
+    async def rerun(self, click=None, fragment_id="", **values):
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.page_script_hash = self.page_hash
+        self.values.update(values)
+        for widget_id, (field, value) in self.values.items():
+            widget = state.widget_states.widgets.add()
+            widget.id = widget_id
+            setattr(widget, field, value)
+        if click:
+            widget = state.widget_states.widgets.add()
+            widget.id = click
+            widget.trigger_value = True
+        if fragment_id:
+            state.fragment_id = fragment_id
+        else:
+            self.elements = {}
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            fm = ForwardMsg()
+            fm.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+            kind = fm.WhichOneof("type")
+            if kind == "new_session":
+                self.page_hash = fm.new_session.main_script_hash
+            elif kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                self.elements[tuple(fm.metadata.delta_path)] = (fm.delta.new_element, fm.delta.fragment_id)
+            elif kind == "script_finished" and fm.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                # 中途 st.rerun() 的那一段不算结束，等最后一次跑完
+                return time.perf_counter() - start
+
+    def find(self, kind, prefix):
+        # 返回 (控件 id, fragment id)；找不到返回 (None, "")
+        for _, (element, fragment_id) in sorted(self.elements.items()):
+            if element.WhichOneof("type") == kind and getattr(element, kind).label.startswith(prefix):
+                return getattr(element, kind).id, fragment_id
+        return None, ""
+
+
+async def drive(port, cards, timeout):
+    # 返回 {"answer": [点选项的耗时], "next": [换下一张的耗时]}
+    times = {"answer": [], "next": []}
+    async with websockets.connect(f"ws://localhost:{port}/_stcore/stream", max_size=None) as ws:
+        s = Session(ws, timeout)
+        await s.rerun()
+        key, _ = s.find("text_input", "请输入 Gemini")
+        user, _ = s.find("text_input", "👤")
+        await s.rerun(**{key: ("string_value", "fake-key"), user: ("string_value", "bench-rerun")})
+        words, _ = s.find("text_area", "输入单词")
+        await s.rerun(**{words: ("string_value", "\n".join(WORDS))})
+        await s.rerun(click=s.find("button", "存入")[0])
+        await s.rerun(click=s.find("button", "🚀")[0])
+        for _ in range(cards):
+            option, fragment_id = s.find("button", "A. ")
+            if option is None:
+                raise RuntimeError("没有出题")
+            times["answer"].append(await s.rerun(click=option, fragment_id=fragment_id))
+            button, fragment_id = s.find("button", "➡️")
+            times["next"].append(await s.rerun(click=button, fragment_id=fragment_id))
+            if s.find("button", "A. ")[0] is None:
+                # 下一张没有直接出题时 (比如牌堆轮完一圈) 点一下开始
+                await s.rerun(click=s.find("button", "🚀")[0])
+    return times
+
+
+def scrape_reruns(port):
+    # {"full": (次数, 平均秒), "fragment": (次数, 平均秒)}
+    text = urllib.request.urlopen(f"http://localhost:{port}/metrics", timeout=5).read().decode("utf-8")
+    found = {}
+    for field, kind, value in re.findall(r'flashcard_rerun_seconds_(sum|count)\{kind="(\w+)"\} (\S+)', text):
+        found.setdefault(kind, {})[field] = float(value)
+    return {kind: (int(v["count"]), v["sum"] / v["count"]) for kind, v in found.items() if v.get("count")}
+
+
+def run_mode(fragments, args):
+    # 返回 (客户端计时, 服务端脚本耗时)
+    workdir = tempfile.mkdtemp(prefix="bench_rerun_")
+    env = dict(os.environ, FAKE_BACKENDS="1", RENDER_FRAGMENTS="1" if fragments else "0",
+               METRICS_PORT=str(args.port + 1),
+               QUOTA_RPM="100000", QUOTA_TPM="100000000", QUOTA_RPD="10000000",
+               STORAGE_URL=f"sqlite://{os.path.join(workdir, 'quiz_cache.db')}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP, "--server.headless", "true",
+         "--server.port", str(args.port), "--browser.gatherUsageStats", "false"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f"http://localhost:{args.port}/_stcore/health", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.2)
+        times = asyncio.run(drive(args.port, args.cards, args.timeout))
+        return times, scrape_reruns(args.port + 1)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else 0.0
+
+
+def main():
+    args = parser.parse_args()
+    print(f"🚀 每种模式 {args.cards} 张卡 (假服务)")
+    for fragments, title in ((True, "RENDER_FRAGMENTS=1 只重跑选项区"), (False, "RENDER_FRAGMENTS=0 整页重跑")):
+        times, reruns = run_mode(fragments, args)
+        print(title)
+        for kind, label in (("answer", "点选项"), ("next", "下一张")):
+            values = times[kind]
+            print(f"  {label} (客户端): p50 {percentile(values, 50) * 1000:.0f} ms  "
+                  f"p95 {percentile(values, 95) * 1000:.0f} ms  max {max(values) * 1000:.0f} ms")
+        for kind, label in (("full", "整页重跑"), ("fragment", "只重跑选项区")):
+            if kind in reruns:
+                count, avg = reruns[kind]
+                print(f"  脚本耗时 {label}: {count} 次，平均 {avg * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# bench_stream.py - 流式出题：首个字段 (单词 + 音标) 出现的时间 vs 整题完成的时间
+# 用法: python bench_stream.py [单词数]
+# 全程只访问本地假 Gemini 服务，不消耗真实配额。
+import os
+import statistics
+import sys
+import time
+
+from fake_backends import FakeGemini
+
+server = FakeGemini(base_latency=0.4, tokens_per_sec=60)
+os.environ["GEMINI_API_ENDPOINT"] = server.start()
+# 假服务不限流，放开本地配额调度，只测模型本身
+os.environ.setdefault("QUOTA_RPM", "100000")
+os.environ.setdefault("QUOTA_TPM", "100000000")
+
+from quiz_gen import generate_quiz, generate_quiz_stream, is_valid_quiz  # noqa: E402
+
+n_words = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+words = [f"word{i:03d}" for i in range(n_words)]
+
+first_field, stream_total, blocking_total = [], [], []
+for word in words:
+    start = time.perf_counter()
+    header_at = None
+    quiz = None
+    for partial in generate_quiz_stream(word, "fake-key"):
+        if header_at is None and partial and "word" in partial and "ipa" in partial:
+            header_at = time.perf_counter() - start
+        quiz = partial
+    stream_total.append(time.perf_counter() - start)
+    first_field.append(header_at if header_at is not None else stream_total[-1])
+    if not is_valid_quiz(quiz, word):
+        print(f"⚠️ {word} 解析失败")
+
+    start = time.perf_counter()
+    generate_quiz(word, "fake-key")
+    blocking_total.append(time.perf_counter() - start)
+
+
+def p50(xs):
+    return statistics.median(xs) * 1000
+
+
+print(f"🚀 {n_words} 个单词，假服务: {server.url}")
+print(f"非流式 整题完成   p50 {p50(blocking_total):8.0f} ms")
+print(f"流式   单词+音标  p50 {p50(first_field):8.0f} ms")
+print(f"流式   整题完成   p50 {p50(stream_total):8.0f} ms")
+print(f"首屏内容提前      {(1 - statistics.median(first_field) / statistics.median(blocking_total)):.0%}")
+
+server.stop()
@@ -0,0 +1,27 @@
+# bounded_pool.py - 批量工具脚本共用的并发执行：任务分批提交，Ctrl-C 能马上停下
+# 以前 build_* 脚本一次性把上万个单词全部 submit 进线程池，按 Ctrl-C 时 with 块退出会 shutdown(wait=True)，
+# 把队列里剩下的任务全部跑完才退出 (结果还不会写进断点文件)，"中断后重跑" 形同虚设。
+# 这里同一时间最多只有 window 个任务在排队，中断时取消所有还没开始的任务，只等正在跑的那几个。
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def imap_bounded(fn, items, workers=8, window=None):
+    # 按完成顺序 yield (item, future)；调用方用 future.result() 取结果或异常
+    window = window or workers * 2
+    items = iter(items)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending = {}
+    try:
+        for item in itertools.islice(items, window):
+            pending[pool.submit(fn, item)] = item
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                for nxt in itertools.islice(items, 1):
+                    pending[pool.submit(fn, nxt)] = nxt
+                yield item, future
+    finally:
+        # 正常结束时这里什么都不用等；KeyboardInterrupt 或调用方提前退出循环时，排队的任务直接取消
+        pool.shutdown(wait=True, cancel_futures=True)
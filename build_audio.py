@@ -0,0 +1,50 @@
+# build_audio.py - 独立的工具脚本：把整份单词表的发音提前合成到 audio_cache/
+# 用法: python build_audio.py words.txt [--workers 8] [--lang en] [--tld com] [--slow]
+# 已经合成过的单词会直接跳过，中断后重新运行即可继续。
+import argparse
+import time
+
+from bounded_pool import imap_bounded
+from tts_cache import AudioCache
+
+parser = argparse.ArgumentParser(description="批量预生成单词发音")
+parser.add_argument("word_files", nargs="+", help="单词表文件，每行一个单词")
+parser.add_argument("--cache-dir", default="audio_cache")
+parser.add_argument("--workers", type=int, default=8)
+parser.add_argument("--lang", default="en")
+parser.add_argument("--tld", default="com", help="口音：com 美音 / co.uk 英音 / com.au 澳音")
+parser.add_argument("--slow", action="store_true", help="慢速朗读")
+args = parser.parse_args()
+
+# 1. 读取单词表 (去重，保持顺序)
+words = {}
+for path in args.word_files:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            word = line.strip()
+            if word:
+                words.setdefault(word.lower(), word)
+
+cache = AudioCache(args.cache_dir)
+todo = [w for w in words.values() if not cache.contains(w, args.lang, args.tld, args.slow)]
+print(f"🚀 共 {len(words)} 个单词，已缓存 {len(words) - len(todo)} 个，待合成 {len(todo)} 个...")
+
+# 2. 并发合成
+start = time.time()
+failed = []
+try:
+    jobs = imap_bounded(lambda w: cache.get_or_synthesize(w, args.lang, args.tld, args.slow), todo, args.workers)
+    for i, (word, future) in enumerate(jobs, 1):
+        try:
+            future.result()
+            print(f"✅ [{i}/{len(todo)}] {word}")
+        except Exception as e:
+            failed.append(word)
+            print(f"❌ [{i}/{len(todo)}] {word}: {e}")
+except KeyboardInterrupt:
+    print("\n⏹️ 已中断，合成好的发音都已存进缓存，重新运行即可继续。")
+    raise SystemExit(130)
+
+print(f"\n🎉 完成！耗时 {time.time() - start:.1f}s，失败 {len(failed)} 个。")
+if failed:
+    print("失败的单词可以稍后重新运行本脚本补齐：" + ", ".join(failed))
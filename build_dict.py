@@ -0,0 +1,23 @@
+# build_dict.py - 独立的工具脚本：把词表编译成离线词典 (dictionary.py 的二进制格式)
+# 用法: python build_dict.py ecdict.csv [dict_seed.tsv ...] [--output dictionary.dic]
+# 输入可以是 ECDICT 的 CSV (按表头读 word / phonetic / translation)，也可以是 "单词<Tab>音标<Tab>释义" 的 TSV。
+# 多个文件里有同一个单词时，后面的覆盖前面的，所以自己校对过的小词表放在最后。
+import argparse
+import itertools
+import os
+import time
+
+from dictionary import Dictionary, SEED_PATH, read_entries, write_dictionary
+
+parser = argparse.ArgumentParser(description="把词表编译成离线词典")
+parser.add_argument("sources", nargs="*", default=[SEED_PATH], help="ECDICT CSV 或 TSV 词表，默认用自带的 dict_seed.tsv")
+parser.add_argument("--output", default="dictionary.dic")
+args = parser.parse_args()
+
+start = time.time()
+# 边读边把释义写进临时文件，内存里只留单词和偏移，不把整个词典 (ECDICT 有三百多万行) 攒在内存里再一次写出
+write_dictionary(itertools.chain.from_iterable(read_entries(path) for path in args.sources), args.output)
+
+dictionary = Dictionary(args.output)
+size_mb = os.path.getsize(args.output) / 1024 / 1024
+print(f"🎉 完成！{args.output}: {len(dictionary)} 个单词，{size_mb:.1f} MB，耗时 {time.time() - start:.1f}s")
@@ -6,41 +6,117 @@ LastEditors: Chengya
 LastEditTime: 2025-12-11 22:27:35
 '''
 # build_library.py - 这是一个独立的工具脚本，运行一次即可
+# 用法: python build_library.py [words.txt ...] [--workers 8] [--rate 5] [--warm]
+# 每生成一个单词就追加一行到 static_images.jsonl，中断后重新运行会自动跳过已完成的单词。
+import argparse
 import json
-import requests
+import os
 import time
+import requests
+
+from bounded_pool import imap_bounded
+from image_library import generate_image_url, stable_seed
+from rate_limit import TokenBucket
 
-# 1. 这里填入你想提前生成图片的单词列表
-# 比如你可以放几百个进去
+# 1. 没有传单词表文件时，用这份默认列表
 target_words = [
     "apple", "banana", "orange", "computer", "mountain",
     "ocean", "freedom", "ambitious", "galaxy", "telescope"
 ]
 
-# 2. 简单的生成 URL 函数 (Pollinations)
+parser = argparse.ArgumentParser(description="批量构建离线图库")
+parser.add_argument("word_files", nargs="*", help="单词表文件，每行一个单词")
+parser.add_argument("--output", default="static_images.jsonl", help="增量写入的图库文件 (也是断点记录)")
+parser.add_argument("--export-json", help="构建完成后额外导出一份旧格式的 JSON 字典")
+parser.add_argument("--workers", type=int, default=8, help="并发线程数")
+parser.add_argument("--rate", type=float, default=5, help="每秒最多请求 Pollinations 几次")
+parser.add_argument("--warm", action="store_true", help="真正请求一次图片，让服务器提前画好")
+args = parser.parse_args()
+
+
+# 2. 生成 URL：seed 用单词内容哈希，每次重建 URL 都不变，下游缓存不会失效
 def generate_static_url(word):
-    # 为了保证图片风格统一且固定，我们可以把时间戳定死，或者用单词本身的哈希
-    # 这样每次生成的 URL 都是一样的，浏览器也可以缓存
-    seed = hash(word)
     prompt = f"Cartoon illustration of {word}, vector art, white background, vivid colors"
-    encoded_prompt = requests.utils.quote(prompt)
-    return f"https://image.pollinations.ai/prompt/{encoded_prompt}?nolog=true&seed={seed}"
+    return generate_image_url(prompt, seed=stable_seed(word))
+
+
+def load_words():
+    if not args.word_files:
+        return list(target_words)
+    words = {}
+    for path in args.word_files:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                word = line.strip()
+                if word:
+                    words.setdefault(word.lower(), word)
+    return list(words.values())
+
+
+def load_done(path):
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["word"].lower())
+                except (ValueError, KeyError):
+                    pass  # 上次中断时写了半行，忽略
+    return done
 
-# 3. 开始批量生成
-library = {}
-print(f"🚀 开始构建图库，共 {len(target_words)} 个单词...")
 
-for word in target_words:
+bucket = TokenBucket(args.rate)
+
+
+def build_one(word):
     url = generate_static_url(word)
-    library[word] = url
-    print(f"✅ Generated: {word}")
-    # 稍微停顿一下，别把人家服务器刷崩了
-    time.sleep(0.1)
-
-# 4. 保存为 JSON 文件
-filename = "static_images.json"
-with open(filename, "w", encoding="utf-8") as f:
-    json.dump(library, f, indent=2, ensure_ascii=False)
-
-print(f"\n🎉 图库构建完成！已保存到 {filename}")
-print("请将此文件放在与 app.py 同一级目录下。")
\ No newline at end of file
+    if args.warm:
+        # 限流：别把人家服务器刷崩了
+        bucket.acquire()
+        requests.get(url, timeout=120).raise_for_status()
+    return url
+
+
+# 3. 开始批量生成 (跳过断点之前已完成的)
+words = load_words()
+done = load_done(args.output)
+todo = [w for w in words if w.lower() not in done]
+print(f"🚀 开始构建图库，共 {len(words)} 个单词，已完成 {len(words) - len(todo)} 个，待处理 {len(todo)} 个...")
+
+start = time.time()
+failed = []
+with open(args.output, "a", encoding="utf-8") as out:
+    try:
+        for i, (word, future) in enumerate(imap_bounded(build_one, todo, args.workers), 1):
+            try:
+                url = future.result()
+            except Exception as e:
+                failed.append(word)
+                print(f"❌ [{i}/{len(todo)}] {word}: {e}")
+                continue
+            # 4. 每完成一个就追加一行并 flush，中断也不会丢已完成的进度
+            out.write(json.dumps({"word": word, "url": url}, ensure_ascii=False) + "\n")
+            out.flush()
+            print(f"✅ [{i}/{len(todo)}] Generated: {word}")
+    except KeyboardInterrupt:
+        print("\n⏹️ 已中断，完成的单词都已写入断点文件，重新运行即可继续。")
+        raise SystemExit(130)
+
+print(f"\n🎉 图库构建完成！耗时 {time.time() - start:.1f}s，失败 {len(failed)} 个，已保存到 {args.output}")
+if failed:
+    print("失败的单词重新运行本脚本即可补齐。")
+
+if args.export_json:
+    library = {}
+    with open(args.output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            library[item["word"]] = item["url"]
+    with open(args.export_json, "w", encoding="utf-8") as f:
+        json.dump(library, f, indent=2, ensure_ascii=False)
+    print(f"📦 已导出 {len(library)} 条到 {args.export_json}")
+
+print("请将图库文件放在与 app.py 同一级目录下。")
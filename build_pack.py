@@ -0,0 +1,96 @@
+# build_pack.py - 独立的工具脚本：把整份词表编译成一个离线题包
+# 用法: python build_pack.py cet4.txt [--output cet4.qpk] [--images bytes] [--tld com] [--workers 8]
+# 题目走批量出题并存进和网页共用的题库 (STORAGE_URL，默认 quiz_cache.db)，中断后重新运行只会补齐没生成过的单词；
+# 插图和发音也都先进本地缓存，重跑时不会重复下载 / 合成。
+import argparse
+import os
+import time
+
+from bounded_pool import imap_bounded
+from image_library import ImageLibrary, generate_image_url
+from image_proxy import ImageProxy
+from quiz_gen import PROMPT_VERSION, QUIZ_MODEL, generate_quiz_batch
+from quiz_pack import QuizPack, QuizPackWriter
+from storage import open_storage
+from tts_cache import AudioCache
+from word_import import import_words
+
+parser = argparse.ArgumentParser(description="把词表预生成为离线题包")
+parser.add_argument("word_files", nargs="+", help="单词表 (TXT / CSV / Anki 导出)")
+parser.add_argument("--output", default="quiz_pack.qpk")
+parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"), help="默认读环境变量 GEMINI_API_KEY")
+parser.add_argument("--batch-size", type=int, default=10, help="每次请求出几道题")
+parser.add_argument("--images", choices=["bytes", "url", "none"], default="bytes",
+                    help="bytes: 把缩略图打进题包 (完全离线)；url: 只存链接，由浏览器加载")
+parser.add_argument("--no-audio", action="store_true", help="不打包发音")
+parser.add_argument("--tld", default="com", help="发音口音：com 美音 / co.uk 英音 / com.au 澳音")
+parser.add_argument("--workers", type=int, default=8, help="下载插图 / 合成发音的并发数")
+parser.add_argument("--storage", default=os.environ.get("STORAGE_URL", "sqlite://quiz_cache.db"))
+args = parser.parse_args()
+
+# 1. 读取单词表 (规范化 + 去重)
+words = []
+for path in args.word_files:
+    import_words(path, words, words.extend)
+print(f"🚀 共 {len(words)} 个单词")
+
+# 2. 出题：先查共享题库，缺的批量生成
+start = time.time()
+store = open_storage(args.storage).cards
+# 整份词表的题目都要留在题库里，不能刚生成就被 LRU 淘汰
+store.max_entries = max(store.max_entries, len(words) * 2)
+quizzes = {w: q for w in words if (q := store.get(w, QUIZ_MODEL, PROMPT_VERSION))}
+todo = [w for w in words if w not in quizzes]
+if todo and args.api_key:
+    print(f"🤖 已有 {len(quizzes)} 道题，待生成 {len(todo)} 道...")
+    quizzes.update(generate_quiz_batch(todo, args.api_key, args.batch_size, store=store))
+elif todo:
+    print(f"⚠️ 没有 API Key，跳过 {len(todo)} 个还没生成过题目的单词")
+print(f"📝 题目就绪 {len(quizzes)} 道 ({time.time() - start:.1f}s)")
+
+# 3. 插图和发音
+library = ImageLibrary("static_images.jsonl", "static_images.json")
+proxy = ImageProxy("image_cache")
+audio_cache = AudioCache("audio_cache")
+
+
+def build_media(word, quiz):
+    image = None
+    if args.images != "none":
+        image = library.lookup(word) or generate_image_url(quiz.get("image_gen_prompt", f"illustration of {word}"))
+        if args.images == "bytes":
+            image = proxy.get(image)
+    audio = None if args.no_audio else audio_cache.get_or_synthesize(word, lang="en", tld=args.tld)
+    return image, audio
+
+
+# 4. 写题包：媒体并发准备，按完成顺序写进去 (索引最后统一排序)
+start = time.time()
+writer = QuizPackWriter(args.output)
+failed = []
+try:
+    for i, (word, future) in enumerate(imap_bounded(lambda w: build_media(w, quizzes[w]), quizzes, args.workers), 1):
+        try:
+            image, audio = future.result()
+        except Exception as e:
+            # 媒体失败不影响出题，题目照样打包
+            print(f"❌ [{i}/{len(quizzes)}] {word}: {e}")
+            failed.append(word)
+            image, audio = None, None
+        writer.add(word, quizzes[word], image, audio)
+except KeyboardInterrupt:
+    # 题目、插图、发音都已经进了本地缓存，重跑很快；半成品题包不保留
+    writer.f.close()
+    os.remove(writer.tmp_path)
+    print("\n⏹️ 已中断，已生成的题目和媒体都在缓存里，重新运行即可继续。")
+    raise SystemExit(130)
+writer.close()
+
+pack = QuizPack(args.output)
+size_mb = os.path.getsize(args.output) / 1024 / 1024
+print(f"\n🎉 完成！{args.output}: {len(pack)} 个单词，{size_mb:.1f} MB，耗时 {time.time() - start:.1f}s")
+if failed:
+    print(f"{len(failed)} 个单词的插图或发音失败 (已打包题目)，稍后重新运行即可补齐：" + ", ".join(failed))
+missing = [w for w in words if w not in quizzes]
+if missing:
+    print(f"{len(missing)} 个单词没有题目，未打包：" + ", ".join(missing[:20]) + (" ..." if len(missing) > 20 else ""))
@@ -0,0 +1,90 @@
+# client_pool.py - 复用 GenerativeModel 和底层连接
+# 以前每出一道题都要 genai.configure() + 新建 GenerativeModel，REST 模式下还会新建 HTTP 会话。
+# 这里按 (api_key, 模型名, transport) 缓存，模块只导入一次，Streamlit 重跑和不同会话都共用。
+# 每个条目有自己的 client，所以不同同学用不同 Key 时也不会互相覆盖全局配置。
+import threading
+import time
+from collections import OrderedDict
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core import client_options as client_options_lib
+
+import metrics
+
+
+class ClientPool:
+    def __init__(self, max_size=16, idle_timeout=600):
+        self.max_size = max_size          # 最多保留多少个 (key, 模型, transport) 组合
+        self.idle_timeout = idle_timeout  # 秒，太久没用的连接大概率已被服务端断开，直接丢弃
+        self.entries = OrderedDict()      # key -> {"model", "client", "last_used"}
+        self.lock = threading.Lock()
+        # 统计：命中次数、新建次数、新建总耗时
+        self.hits = 0
+        self.misses = 0
+        self.setup_seconds = 0.0
+
+    def get_model(self, api_key, model_name, transport=None, endpoint=None):
+        key = (api_key, model_name, transport, endpoint)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and now - entry["last_used"] > self.idle_timeout:
+                # 只从池里摘掉，不主动关：预加载 / 对冲 / 批量线程可能还拿着这个 model 在发请求，
+                # 等最后一个引用释放后由垃圾回收关闭连接
+                del self.entries[key]
+                entry = None
+            if entry:
+                entry["last_used"] = now
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry["model"]
+
+        # 新建放在锁外面，避免一个慢的握手卡住其他会话
+        start = time.perf_counter()
+        options = client_options_lib.ClientOptions(api_key=api_key, api_endpoint=endpoint)
+        client = glm.GenerativeServiceClient(client_options=options, transport=transport)
+        model = genai.GenerativeModel(model_name)
+        model._client = client  # SDK 只有在 _client 为空时才去用全局 configure 的默认 client
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            self.misses += 1
+            self.setup_seconds += elapsed
+            if key in self.entries:
+                # 另一个线程抢先建好了，用它的；自己这个还没交给任何人，可以直接关掉
+                self._close({"client": client})
+                self.entries.move_to_end(key)
+                return self.entries[key]["model"]
+            self.entries[key] = {"model": model, "client": client, "last_used": now}
+            # 淘汰同样不关连接，理由同上
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return model
+
+    @staticmethod
+    def _close(entry):
+        try:
+            entry["client"].transport.close()
+        except Exception as e:
+            print(f"Client Close Error: {e}")
+
+    def stats(self):
+        with self.lock:
+            avg_setup = self.setup_seconds / self.misses if self.misses else 0.0
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "avg_setup_ms": avg_setup * 1000,
+                # 每次命中省下的就是一次新建的耗时
+                "saved_ms": self.hits * avg_setup * 1000,
+            }
+
+
+default_pool = ClientPool()
+metrics.register("client_pool", default_pool.stats)
+
+
+def get_model(api_key, model_name, transport=None, endpoint=None):
+    return default_pool.get_model(api_key, model_name, transport, endpoint)
@@ -0,0 +1,84 @@
+# deck.py - 词库牌堆：抽词 / 移除 / 添加都是 O(1)
+# 所有单词放在一个数组里，words[:remaining] 是本轮还没复习的部分。
+# 抽中一个就和"未复习区"的最后一个交换位置，再把 remaining - 1 (swap-remove)；
+# 开新一轮只需要把 remaining 拨回总数，不用再复制整个词库。
+import random
+
+
+class Deck:
+    def __init__(self, words=()):
+        self.words = []      # 所有单词 (已去重，保留用户输入的写法)
+        self.index = {}      # 小写单词 -> 在 words 里的位置，同时用来去重
+        self.remaining = 0   # words[:remaining] 是本轮待复习的
+        self.round = 0       # 第几轮，每开一轮 +1
+        self.add_many(words)
+
+    @staticmethod
+    def _key(word):
+        return word.strip().lower()
+
+    def _swap(self, i, j):
+        if i == j:
+            return
+        wi, wj = self.words[i], self.words[j]
+        self.words[i], self.words[j] = wj, wi
+        self.index[self._key(wi)] = j
+        self.index[self._key(wj)] = i
+
+    def add(self, word):
+        # 新词直接进入本轮待复习区；重复的单词返回 False
+        word = word.strip()
+        key = self._key(word)
+        if not word or key in self.index:
+            return False
+        self.words.append(word)
+        self.index[key] = len(self.words) - 1
+        self._swap(len(self.words) - 1, self.remaining)
+        self.remaining += 1
+        return True
+
+    def add_many(self, words):
+        return [w for w in words if self.add(w)]
+
+    def pick(self, rng=random):
+        # 随机看一个待复习的单词，但不移除 (出题成功后再 discard)
+        if not self.remaining:
+            return None
+        return self.words[rng.randrange(self.remaining)]
+
+    def discard(self, word):
+        # 本轮标记为已复习
+        i = self.index.get(self._key(word))
+        if i is None or i >= self.remaining:
+            return False
+        self._swap(i, self.remaining - 1)
+        self.remaining -= 1
+        return True
+
+    def draw(self, rng=random):
+        word = self.pick(rng)
+        if word is not None:
+            self.discard(word)
+        return word
+
+    def peek(self, n, rng=random):
+        # 随机取 n 个待复习的单词 (不移除)，给预加载用
+        n = min(n, self.remaining)
+        return [self.words[i] for i in rng.sample(range(self.remaining), n)]
+
+    def is_remaining(self, word):
+        i = self.index.get(self._key(word))
+        return i is not None and i < self.remaining
+
+    def new_round(self):
+        self.remaining = len(self.words)
+        self.round += 1
+
+    def __contains__(self, word):
+        return self._key(word) in self.index
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
@@ -0,0 +1,162 @@
+# dictionary.py - 离线词典：音标和中文释义查表，不再每张卡都问模型
+# 常用词的发音和意思是固定的，没必要每次花 token 让 Gemma 重新写一遍 (还可能写错)。
+# build_dict.py 把 ECDICT 的 CSV 或 dict_seed.tsv 这种 "单词<Tab>音标<Tab>释义" 的表编译成一个紧凑的二进制文件：
+# 按单词排好序的定长索引 + 数据区，用 mmap 打开、二分查找，几百万词也只在查到时读那几页。
+# 编译好的文件不存在时，直接在内存里编译仓库自带的 dict_seed.tsv (只有一百多个常用词)。
+#
+# 文件布局 (小端)：
+#   文件头  HEADER: magic "DIC1", 版本, 词条数
+#   索引    ENTRY x 词条数，按键的字节序排好，记录键和值的 (偏移, 长度)
+#   数据区  键 (规范化单词) 和值 ("音标<Tab>词性<Tab>释义")，都是 UTF-8
+import csv
+import io
+import mmap
+import os
+import re
+import struct
+import tempfile
+
+from distractors import split_pos
+from quiz_schema import CJK_RE
+from quiz_store import normalize_word
+
+MAGIC = b"DIC1"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")
+# 键偏移, 键长度, 值偏移, 值长度
+ENTRY = struct.Struct("<IHIH")
+SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dict_seed.tsv")
+# 选项里放不下太长的释义，编译时只保留前几个义项
+MAX_SENSES = 2
+SENSE_RE = re.compile(r"\s*[；;，,]\s*")
+
+
+def short_gloss(text):
+    # "n. 苹果, 苹果树, 苹果公司" -> "n. 苹果；苹果树"
+    pos, core = split_pos(text)
+    senses = [s for s in SENSE_RE.split(core) if s][:MAX_SENSES]
+    gloss = "；".join(senses)
+    return f"{pos}. {gloss}" if pos else gloss
+
+
+def read_tsv(path):
+    # 单词<Tab>音标<Tab>释义，# 开头是注释
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 3:
+                yield parts[0], parts[1], parts[2]
+
+
+def read_ecdict(path):
+    # ECDICT 的 CSV：word / phonetic / translation，translation 里多个词性用字面的 \n 分隔，只取第一行
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            translation = (row.get("translation") or "").replace("\\n", "\n").split("\n")[0]
+            # ECDICT 用 ' 表示重音，换成 IPA 的 ˈ
+            yield row.get("word") or "", (row.get("phonetic") or "").replace("'", "ˈ"), translation
+
+
+def read_entries(path):
+    reader = read_ecdict if path.lower().endswith(".csv") else read_tsv
+    for word, ipa, gloss in reader(path):
+        word, ipa, gloss = word.strip(), ipa.strip().strip("/"), short_gloss(gloss.strip())
+        # 没有中文释义的词条 (纯英文解释、缩写) 对出题没用
+        if word and CJK_RE.search(gloss):
+            yield word, ipa, gloss
+
+
+def write_entries(entries, out, spool):
+    # entries: [(单词, 音标, 释义)]，同一个单词后出现的覆盖前面的
+    # 值先按读入顺序写进 spool (临时文件)，内存里只留 键 -> (在 spool 里的偏移, 长度)；
+    # 排好序后依次写文件头、索引，再按键的顺序把值从 spool 搬进数据区
+    table = {}
+    for word, ipa, gloss in entries:
+        pos, core = split_pos(gloss)
+        value = f"{ipa}\t{pos or ''}\t{core}".encode("utf-8")
+        table[normalize_word(word).encode("utf-8")] = (spool.tell(), len(value))
+        spool.write(value)
+    keys = sorted(table)
+    out.write(HEADER.pack(MAGIC, VERSION, len(keys)))
+    offset = HEADER.size + ENTRY.size * len(keys)
+    for key in keys:
+        length = table[key][1]
+        out.write(ENTRY.pack(offset, len(key), offset + len(key), length))
+        offset += len(key) + length
+    for key in keys:
+        spool_off, length = table[key]
+        spool.seek(spool_off)
+        out.write(key)
+        out.write(spool.read(length))
+
+
+def compile_entries(entries):
+    # 小词表 (自带的种子) 直接在内存里编译，返回整个文件的字节
+    out = io.BytesIO()
+    write_entries(entries, out, io.BytesIO())
+    return out.getvalue()
+
+
+def write_dictionary(entries, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f, tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as spool:
+        write_entries(entries, f, spool)
+    os.replace(tmp_path, path)
+
+
+class Dictionary:
+    def __init__(self, path=None, data=None):
+        # 传 path 时用 mmap 打开编译好的文件；传 data 时直接用内存里的字节 (compile_entries 的结果)
+        self.path = path
+        if data is None:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data = data
+        magic, version, self.count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是可识别的词典文件 (版本 {version})")
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self.data, HEADER.size + i * ENTRY.size)
+
+    def _find(self, word):
+        target = normalize_word(word).encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_off, key_len, _, _ = self._entry(mid)
+            if self.data[key_off:key_off + key_len] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            entry = self._entry(lo)
+            if self.data[entry[0]:entry[0] + entry[1]] == target:
+                return entry
+        return None
+
+    def __contains__(self, word):
+        return self._find(word) is not None
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, word):
+        # 返回 {"word", "ipa", "pos", "gloss"}；gloss 不带词性前缀，可以直接当选项；查不到返回 None
+        entry = self._find(word)
+        if entry is None:
+            return None
+        _, _, value_off, value_len = entry
+        ipa, pos, gloss = bytes(self.data[value_off:value_off + value_len]).decode("utf-8").split("\t")
+        return {"word": word.strip(), "ipa": ipa, "pos": pos or None, "gloss": gloss}
+
+
+def load_dictionary(path="dictionary.dic"):
+    # 编译好的文件优先；没有就用自带的种子词表；都没有返回 None (出题全部走模型)
+    if path and os.path.exists(path):
+        return Dictionary(path)
+    if os.path.exists(SEED_PATH):
+        return Dictionary(data=compile_entries(read_entries(SEED_PATH)))
+    return None
@@ -0,0 +1,209 @@
+# distractors.py - 本地组装选项：干扰项从已知单词的释义里挑，不再每张卡都让模型现编
+# 一道题真正需要模型的只有这个单词本身的信息 (正确释义、音标、插图 Prompt、联想提示)，
+# 三个干扰项是一次性的。所以每个单词只记一份"释义卡" (GlossIndex)，复习时：
+#   正确释义 + 从索引里挑 3 个看起来像的别人的释义 -> 打乱 -> 重新分配 A~D
+# 整个过程是一两百微秒的纯内存操作 (和索引大小无关)，同一个单词再复习多少次都不用调模型，而且每次干扰项都不一样，
+# 不会出现"记住了选项位置"的情况。
+#
+# 怎样算"看起来像"：词性相同、释义长度相近 (按词性 + 长度分桶)，同一档里随机挑，不按字面重合度排序
+# (重合越多越可能是近义词，优先挑它们等于专门找第二个正确答案)。
+# 释义按 "；" 等拆成几个义项逐个比：去掉 "…的"、"…地"、"…者" 这种人人都有的词尾之后，
+# 还共用一个汉字二元组 (bigram) 的就当近义词排除，比如 "快乐的" 和 "欢乐的"、"谈判" 和 "谈判；协商"。
+# 只有两三个字的短释义按单字比。同义不同字的 ("快乐的" 和 "高兴的") 看不出来。
+import random
+import re
+import threading
+
+from quiz_schema import LABELS
+from quiz_store import normalize_word
+
+# 释义开头常见的词性标注，比如 "n. 苹果"、"adj.雄心勃勃的"
+POS_RE = re.compile(r"^\s*(n|v|vt|vi|adj|adv|prep|conj|pron|num|art|int|interj|aux)\.\s*", re.I)
+POS_ALIASES = {"vt": "v", "vi": "v", "aux": "v", "interj": "int"}
+# 没有标注时按英文后缀猜
+SUFFIX_POS = [
+    (("tion", "sion", "ness", "ment", "ity", "ship", "ism", "ance", "ence", "er", "or"), "n"),
+    (("ly",), "adv"),
+    (("ous", "ful", "ive", "able", "ible", "al", "ic", "less", "ish"), "adj"),
+    (("ize", "ise", "ate", "ify", "en"), "v"),
+]
+# 释义按字数分桶的上界："苹果" 和 "雄心勃勃的" 放在一起太容易看出来
+LENGTH_BUCKETS = [2, 4, 7]
+SENSE_SPLIT_RE = re.compile(r"[；;，,、/]")
+# 释义里的通用词尾：以它们结尾的二元组不算内容上的重合
+SUFFIX_CHARS = "的地者"
+# 释义卡里除了正确释义外还保留的字段，本地组装题目时原样带上
+CARD_FIELDS = ("ipa", "image_gen_prompt", "visual_cue_cn")
+
+
+def split_pos(gloss):
+    # "adj. 雄心勃勃的" -> ("adj", "雄心勃勃的")
+    m = POS_RE.match(gloss)
+    if not m:
+        return None, gloss.strip()
+    pos = m.group(1).lower()
+    return POS_ALIASES.get(pos, pos), gloss[m.end():].strip()
+
+
+def guess_pos(word, gloss):
+    pos, core = split_pos(gloss)
+    if pos:
+        return pos
+    if core.endswith("的"):
+        return "adj"
+    if core.endswith("地"):
+        return "adv"
+    word = word.lower()
+    if " " in word:
+        return "phrase"
+    for suffixes, suffix_pos in SUFFIX_POS:
+        if word.endswith(suffixes) and len(word) > max(map(len, suffixes)) + 2:
+            return suffix_pos
+    return "?"
+
+
+def length_bucket(core):
+    first = SENSE_SPLIT_RE.split(core, 1)[0]
+    for i, bound in enumerate(LENGTH_BUCKETS):
+        if len(first) <= bound:
+            return i
+    return len(LENGTH_BUCKETS)
+
+
+def char_ngrams(text):
+    # 一个义项的内容二元组：去掉以通用词尾结尾的；去掉词尾后只剩一两个字的，单字也算进去
+    chars = [c for c in text if not c.isspace() and c not in "()（）"]
+    grams = {a + b for a, b in zip(chars, chars[1:]) if b not in SUFFIX_CHARS}
+    content = [c for c in chars if c not in SUFFIX_CHARS]
+    if len(content) <= 2:
+        grams.update(content)
+    return frozenset(grams)
+
+
+def sense_ngrams(core):
+    # 每个义项一组二元组
+    return tuple(char_ngrams(sense) for sense in SENSE_SPLIT_RE.split(core) if sense.strip())
+
+
+def overlaps(a, b):
+    # 两个释义有没有哪一对义项共用内容二元组
+    return any(x & y for x in a for y in b)
+
+
+def correct_gloss(quiz):
+    return next((o["text"] for o in quiz.get("options", [])
+                 if isinstance(o, dict) and o.get("label") == quiz.get("correct_label")), None)
+
+
+class GlossIndex:
+    def __init__(self, n_options=4, max_candidates=24):
+        self.n_options = n_options
+        self.max_candidates = max_candidates  # 每次最多看多少个候选，索引再大耗时也不变
+        self.lock = threading.Lock()
+        self.cards = {}    # 规范化单词 -> {"word", "gloss", "pos", "bucket", "ngrams", 以及 CARD_FIELDS}
+        self.buckets = {}  # (词性, 长度桶) -> [规范化单词]
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __contains__(self, word):
+        return normalize_word(word) in self.cards
+
+    def add(self, word, gloss, pos=None, **fields):
+        # 同一个单词再加一次会覆盖 (比如换了更好的释义)；返回这张释义卡
+        gloss = gloss.strip()
+        pos = pos or guess_pos(word, gloss)
+        core = split_pos(gloss)[1]
+        key = normalize_word(word)
+        card = {"word": word.strip(), "gloss": gloss, "pos": pos,
+                "bucket": (pos, length_bucket(core)), "ngrams": sense_ngrams(core)}
+        card.update((k, fields[k]) for k in CARD_FIELDS if fields.get(k))
+        with self.lock:
+            old = self.cards.get(key)
+            if old and old["bucket"] != card["bucket"]:
+                self.buckets[old["bucket"]].remove(key)
+            if not old or old["bucket"] != card["bucket"]:
+                self.buckets.setdefault(card["bucket"], []).append(key)
+            self.cards[key] = card
+        return card
+
+    def add_quiz(self, quiz):
+        # 从一道合格的题里记下这个单词的释义卡；找不到正确选项时返回 None
+        gloss = correct_gloss(quiz)
+        if not gloss:
+            return None
+        return self.add(quiz["word"], gloss, **{k: quiz.get(k) for k in CARD_FIELDS})
+
+    def _candidates(self, key, bucket, rng):
+        # 由近到远：同词性同长度 -> 同词性相邻长度 -> 同词性 -> 词性不明的 -> 全部
+        pos, length = bucket
+        tiers = [[bucket], [(pos, length - 1), (pos, length + 1)],
+                 [b for b in self.buckets if b[0] == pos], [b for b in self.buckets if b[0] == "?"],
+                 list(self.buckets)]
+        seen = {key}
+        for tier in tiers:
+            lists = [self.buckets[b] for b in dict.fromkeys(tier) if b in self.buckets]
+            total = sum(map(len, lists))
+            if total <= self.max_candidates * 2:
+                pool = [w for words in lists for w in words if w not in seen]
+            else:
+                # 桶很大时按下标随机抽，不遍历整个桶，耗时和索引大小无关
+                pool = []
+                for _ in range(self.max_candidates):
+                    i = rng.randrange(total)
+                    for words in lists:
+                        if i < len(words):
+                            break
+                        i -= len(words)
+                    if words[i] not in seen:
+                        pool.append(words[i])
+            seen.update(pool)
+            yield pool
+
+    def distractors(self, word, k=None, rng=None):
+        # 返回 k 个干扰项释义；索引里的单词不够时返回的会少于 k 个
+        k = self.n_options - 1 if k is None else k
+        rng = rng or random
+        key = normalize_word(word)
+        with self.lock:
+            card = self.cards.get(key)
+            if card is None:
+                return []
+            picked = []
+            taken = [card["ngrams"]]
+            texts = {card["gloss"]}
+            for pool in self._candidates(key, card["bucket"], rng):
+                # 档次 (词性、长度) 已经由 _candidates 分好，同一档里随机，每次复习挑的不一样
+                rng.shuffle(pool)
+                for w in pool:
+                    other = self.cards[w]
+                    if other["gloss"] in texts:
+                        continue
+                    # 和正确释义或已经选中的干扰项共用内容二元组的，可能是近义词
+                    if any(overlaps(other["ngrams"], t) for t in taken):
+                        continue
+                    picked.append(other["gloss"])
+                    taken.append(other["ngrams"])
+                    texts.add(other["gloss"])
+                    if len(picked) == k:
+                        return picked
+        return picked
+
+    def make_quiz(self, word, rng=None):
+        # 只用释义卡组装一道完整的题；单词不在索引里或凑不够干扰项时返回 None
+        rng = rng or random
+        card = self.cards.get(normalize_word(word))
+        if card is None:
+            return None
+        wrong = self.distractors(word, rng=rng)
+        if len(wrong) < self.n_options - 1:
+            return None
+        texts = [card["gloss"]] + wrong
+        rng.shuffle(texts)
+        labels = LABELS[:self.n_options]
+        quiz = {"word": card["word"], "ipa": card.get("ipa", ""),
+                "image_gen_prompt": card.get("image_gen_prompt", f"illustration of {card['word']}"),
+                "visual_cue_cn": card.get("visual_cue_cn", ""),
+                "options": [{"label": label, "text": text} for label, text in zip(labels, texts)],
+                "correct_label": labels[texts.index(card["gloss"])]}
+        return quiz
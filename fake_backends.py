@@ -0,0 +1,382 @@
+# fake_backends.py - 本地假 Gemini / 图片 / 发音服务，离线压测用
+# Gemini 说的是 REST 的 generateContent / streamGenerateContent 格式，quiz_gen 设置 GEMINI_API_ENDPOINT 后
+# 会直接打到这里。延迟 = 固定延迟 + 输出 token 数 / 生成速度，用来模拟真实模型。
+# 图片服务模仿 Pollinations 的 /prompt/<描述> (IMAGE_ENDPOINT)，发音服务提供 /tts?text= (TTS_ENDPOINT)。
+# 每个服务都可以注入故障：对数正态的延迟抖动、偶发的长尾慢请求、随机 5xx、周期性的 429 限流窗口。
+# 配置见 DEFAULT_CONFIG；app.py 设置 FAKE_BACKENDS=1 (或指向一个 JSON 配置文件) 时会在进程内启动它们。
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FAKE_GLOSSES = ["苹果", "谈判", "雄心勃勃的", "共识", "望远镜", "银河", "自由", "海洋", "山脉", "电脑"]
+
+
+def estimate_tokens(text):
+    # 粗略估算：英文约 4 字节一个 token，中文一个字约 3 字节
+    return max(1, len(text.encode("utf-8")) // 4)
+
+
+def extract_words(prompt):
+    # 批量 Prompt 里有 "单词列表：[...]"，单个 Prompt 里是 单词 "xxx"
+    m = re.search(r"单词列表：(\[.*?\])", prompt)
+    if m:
+        return json.loads(m.group(1)), True
+    m = re.search(r'单词 "(.+?)"', prompt)
+    return [m.group(1) if m else "word"], False
+
+
+def fake_quiz(word):
+    i = sum(map(ord, word))
+    glosses = [FAKE_GLOSSES[(i + k) % len(FAKE_GLOSSES)] for k in range(4)]
+    correct = "ABCD"[i % 4]
+    return {
+        "word": word,
+        "ipa": word,
+        "image_gen_prompt": f"Cartoon style illustration of {word}",
+        "visual_cue_cn": f"{word} 的场景",
+        "options": [{"label": l, "text": g} for l, g in zip("ABCD", glosses)],
+        "correct_label": correct,
+    }
+
+
+def fake_creative(word):
+    # 词典模式的短 Prompt 只要创意字段和三个干扰项 (quiz_gen.build_creative_prompt)
+    i = sum(map(ord, word))
+    return {
+        "image_gen_prompt": f"Cartoon style illustration of {word}",
+        "visual_cue_cn": f"{word} 的场景",
+        "distractors": [FAKE_GLOSSES[(i + k) % len(FAKE_GLOSSES)] for k in range(1, 4)],
+    }
+
+
+def make_response(text, prompt, full_text=None):
+    data = {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+    }
+    # 流式时只有最后一块带 usageMetadata
+    if full_text is not None:
+        prompt_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(full_text)
+        data["usageMetadata"] = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        }
+    return data
+
+
+def fake_png(seed, size=64):
+    # 按 seed 生成一张纯色 PNG，不同的 URL 得到不同的字节，缓存 / 去重逻辑才测得出来
+    r, g, b = hashlib.sha1(seed.encode("utf-8")).digest()[:3]
+    row = b"\x00" + bytes([r, g, b]) * size
+    raw = zlib.compress(row * size)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", raw) + chunk(b"IEND", b"")
+
+
+def fake_mp3(text, bytes_per_char=800):
+    # 不是真的 MP3，只是大小和真实发音差不多的字节 (ID3 开头，浏览器会当成音频)
+    body = hashlib.sha1(text.encode("utf-8")).digest()
+    n = max(1, len(text)) * bytes_per_char
+    return b"ID3" + (body * (n // len(body) + 1))[:n]
+
+
+class FaultModel:
+    # 延迟 = base_latency * 对数正态抖动 (jitter 是 sigma，0 表示固定)；
+    # 以 tail_prob 的概率额外慢 tail_latency 秒；以 error_rate 的概率返回 500；
+    # 每 burst_every 秒里的前 burst_duration 秒所有请求都返回 429
+    def __init__(self, base_latency=0.3, jitter=0.0, tail_prob=0.0, tail_latency=0.0,
+                 error_rate=0.0, burst_every=0.0, burst_duration=0.0, seed=None):
+        self.base_latency = base_latency
+        self.jitter = jitter
+        self.tail_prob = tail_prob
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_duration = burst_duration
+        self.rng = random.Random(seed)  # 固定 seed 时每次压测的延迟序列都一样
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.errors = 0
+        self.throttled = 0
+
+    def latency(self):
+        with self.lock:
+            delay = self.base_latency
+            if self.jitter:
+                # 以 base_latency 为中位数
+                delay *= math.exp(self.rng.gauss(0, self.jitter))
+            if self.tail_prob and self.rng.random() < self.tail_prob:
+                delay += self.tail_latency
+        return delay
+
+    def fault(self):
+        # 返回要注入的 HTTP 状态码，正常请求返回 None
+        with self.lock:
+            if self.burst_every and (time.monotonic() - self.started) % self.burst_every < self.burst_duration:
+                self.throttled += 1
+                return 429
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.errors += 1
+                return 500
+        return None
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def count_request(self):
+        with self.server.lock:
+            self.server.request_count += 1
+
+    def inject_fault(self):
+        # 命中故障时直接回错误 (Gemini 风格的 JSON)，返回 True
+        status = self.server.faults.fault()
+        if status is None:
+            return False
+        names = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL"}
+        error = {"error": {"code": status, "message": "injected by fake_backends", "status": names[status]}}
+        raw = json.dumps(error).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(raw)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(raw)
+        return True
+
+    def _send_bytes(self, data, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, data, status=200):
+        self._send_bytes(json.dumps(data, ensure_ascii=False).encode("utf-8"),
+                         "application/json; charset=utf-8", status)
+
+
+class FakeGeminiHandler(FakeHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+        words, batch = extract_words(prompt)
+        if batch:
+            payload = [fake_quiz(w) for w in words]
+        elif '"distractors"' in prompt:
+            payload = fake_creative(words[0])
+        else:
+            payload = fake_quiz(words[0])
+        text = json.dumps(payload, ensure_ascii=False, indent=2)
+        self.count_request()
+        if self.inject_fault():
+            return
+
+        if ":streamGenerateContent" in self.path:
+            self._stream(prompt, text)
+            return
+
+        server = self.server
+        output_tokens = estimate_tokens(text)
+        time.sleep(server.faults.latency() + output_tokens / server.tokens_per_sec)
+        self._send_json(make_response(text, prompt, text))
+
+    def _stream(self, prompt, text):
+        # 先等固定延迟 (首 token)，然后每 chunk_chars 个字符发一块，按生成速度 sleep
+        # ?alt=sse 时按 SSE 发，否则按 REST 传输默认的 JSON 数组逐块发
+        server = self.server
+        sse = "alt=sse" in self.path
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json; charset=utf-8")
+        self.end_headers()
+        time.sleep(server.faults.latency())
+        if not sse:
+            self.wfile.write(b"[")
+        step = server.chunk_chars
+        for i in range(0, len(text), step):
+            piece = text[i:i + step]
+            time.sleep(estimate_tokens(piece) / server.tokens_per_sec)
+            last = i + step >= len(text)
+            data = make_response(piece, prompt, text if last else None)
+            raw = json.dumps(data, ensure_ascii=False)
+            if sse:
+                self.wfile.write(f"data: {raw}\r\n\r\n".encode("utf-8"))
+            else:
+                self.wfile.write(((", " if i else "") + raw).encode("utf-8"))
+            self.wfile.flush()
+        if not sse:
+            self.wfile.write(b"]")
+        self.wfile.flush()
+
+
+class FakeImageHandler(FakeHandler):
+    def do_GET(self):
+        # /prompt/<描述>?seed=...，和 Pollinations 一样；服务端"画图"的时间用 base_latency 模拟
+        self.count_request()
+        if self.inject_fault():
+            return
+        time.sleep(self.server.faults.latency())
+        self._send_bytes(fake_png(self.path), "image/png")
+
+
+class FakeTTSHandler(FakeHandler):
+    def do_GET(self):
+        # /tts?text=...&lang=...&tld=...
+        self.count_request()
+        if self.inject_fault():
+            return
+        text = parse_qs(urlparse(self.path).query).get("text", [""])[0]
+        time.sleep(self.server.faults.latency())
+        self._send_bytes(fake_mp3(text), "audio/mpeg")
+
+
+class FakeServer:
+    handler = FakeHandler
+
+    def __init__(self, host="127.0.0.1", port=0, base_latency=0.3, **faults):
+        # faults: FaultModel 的其余参数 (jitter / tail_prob / error_rate / burst_every ...)
+        self.httpd = ThreadingHTTPServer((host, port), self.handler)
+        self.httpd.daemon_threads = True
+        # base_latency: 秒，每个请求的中位开销 (网络 + 排队 / 渲染)
+        self.httpd.faults = FaultModel(base_latency, **faults)
+        self.httpd.request_count = 0
+        self.httpd.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    @property
+    def faults(self):
+        return self.httpd.faults
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeGemini(FakeServer):
+    handler = FakeGeminiHandler
+
+    def __init__(self, host="127.0.0.1", port=0, base_latency=0.3, tokens_per_sec=200, chunk_chars=24, **faults):
+        super().__init__(host, port, base_latency, **faults)
+        self.httpd.tokens_per_sec = tokens_per_sec  # 输出速度
+        self.httpd.chunk_chars = chunk_chars        # 流式时每块多少字符
+
+
+class FakeImages(FakeServer):
+    handler = FakeImageHandler
+
+    def __init__(self, host="127.0.0.1", port=0, base_latency=1.0, **faults):
+        super().__init__(host, port, base_latency, **faults)
+
+
+class FakeTTS(FakeServer):
+    handler = FakeTTSHandler
+
+    def __init__(self, host="127.0.0.1", port=0, base_latency=0.2, **faults):
+        super().__init__(host, port, base_latency, **faults)
+
+
+# 每个服务的默认参数；配置文件里只写想改的字段即可，port 为 0 表示随机端口
+DEFAULT_CONFIG = {
+    "seed": 42,
+    "gemini": {"port": 8765, "base_latency": 0.5, "jitter": 0.3, "tail_prob": 0.02, "tail_latency": 5.0,
+               "error_rate": 0.01, "burst_every": 0, "burst_duration": 0, "tokens_per_sec": 200},
+    "images": {"port": 8766, "base_latency": 1.0, "jitter": 0.5, "error_rate": 0.02},
+    "tts": {"port": 8767, "base_latency": 0.2, "jitter": 0.3, "error_rate": 0.01},
+}
+SERVICES = {
+    "gemini": ("GEMINI_API_ENDPOINT", FakeGemini),
+    "images": ("IMAGE_ENDPOINT", FakeImages),
+    "tts": ("TTS_ENDPOINT", FakeTTS),
+}
+
+
+def load_config(path=None):
+    config = {name: dict(value) if isinstance(value, dict) else value for name, value in DEFAULT_CONFIG.items()}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for name, value in json.load(f).items():
+                if isinstance(value, dict):
+                    config.setdefault(name, {}).update(value)
+                else:
+                    config[name] = value
+    return config
+
+
+def start_all(config=None):
+    # 按配置启动三个假服务，返回 {环境变量名: 服务}
+    config = config or load_config()
+    servers = {}
+    for i, (name, (env_name, cls)) in enumerate(SERVICES.items()):
+        seed = None if config.get("seed") is None else config["seed"] + i
+        server = cls(seed=seed, **config[name])
+        server.start()
+        servers[env_name] = server
+    return servers
+
+
+running = {}
+
+
+def install_from_env():
+    # FAKE_BACKENDS=1 用默认配置，FAKE_BACKENDS=xxx.json 用配置文件；在 import quiz_gen 等模块之前调用，
+    # 把 GEMINI_API_ENDPOINT / IMAGE_ENDPOINT / TTS_ENDPOINT 指向进程内的假服务 (已经设置的不覆盖)
+    spec = os.environ.get("FAKE_BACKENDS")
+    if not spec or spec == "0" or running:
+        return running
+    config = load_config(None if spec == "1" else spec)
+    for name in SERVICES:
+        config[name]["port"] = 0  # Streamlit 多次加载也不会端口冲突
+    running.update(start_all(config))
+    for env_name, server in running.items():
+        os.environ.setdefault(env_name, server.url)
+    return running
+
+
+if __name__ == "__main__":
+    import sys
+
+    servers = start_all(load_config(sys.argv[1] if len(sys.argv) > 1 else None))
+    print("🧪 假服务已启动，运行 app 前设置:")
+    for name, server in servers.items():
+        print(f"  {name}={server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.stop()
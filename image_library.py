@@ -0,0 +1,75 @@
+# image_library.py - 离线图库 + Pollinations URL 生成
+# build_library.py 预先生成的图片 URL 在启动时读一次进内存，之后每次查表都是 O(1)，
+# 查不到的单词才回退到按 Prompt 动态生成。
+import hashlib
+import json
+import os
+import threading
+
+import requests
+
+# 离线压测时指向本地假图片服务 (fake_backends.py)，路径格式和 Pollinations 一样
+IMAGE_ENDPOINT = os.environ.get("IMAGE_ENDPOINT", "https://image.pollinations.ai").rstrip("/")
+
+
+def stable_seed(text):
+    # Python 自带的 hash() 每个进程都不一样 (PYTHONHASHSEED)，这里用内容哈希保证每次都相同
+    return int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def generate_image_url(image_prompt, seed=None):
+    # 同一个 Prompt 默认得到同一个 URL，浏览器和 CDN 缓存才能生效；想换一张就传新的 seed
+    if seed is None:
+        seed = stable_seed(image_prompt)
+    encoded_prompt = requests.utils.quote(image_prompt)
+    return f"{IMAGE_ENDPOINT}/prompt/{encoded_prompt}?nolog=true&seed={seed}"
+
+
+class ImageLibrary:
+    def __init__(self, *paths):
+        # 支持 build_library.py 增量写出的 .jsonl 和旧版的 .json 字典，排在前面的文件优先
+        self.urls = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        for path in reversed(paths or ("static_images.json",)):
+            if os.path.exists(path):
+                self.urls.update(self._read(path))
+
+    @staticmethod
+    def _read(path):
+        urls = {}
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue  # 构建中断时可能留下半行
+                    urls[item["word"].strip().lower()] = item["url"]
+            else:
+                for w, url in json.load(f).items():
+                    urls[w.strip().lower()] = url
+        return urls
+
+    def lookup(self, word):
+        url = self.urls.get(word.strip().lower())
+        with self.lock:
+            if url:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return url
+
+    def __len__(self):
+        return len(self.urls)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.urls),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
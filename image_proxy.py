@@ -0,0 +1,105 @@
+# image_proxy.py - 本地图片代理 + 缩略图缓存
+# 以前是把 Pollinations 的 URL 直接交给浏览器，30 个同学就会触发 30 次远端渲染。
+# 代理模式下由服务器取一次、存到磁盘 (再缩成闪卡宽度的缩略图)，所有会话都从本地读。
+# 缩略图存在内存映射文件里 (media_store)，返回的是零拷贝切片，会话再多也只占一份内存。
+# 同一张图正在下载时，其他请求会等这一次的结果，而不是各自再发一遍。
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import Future
+
+import requests
+
+import metrics
+from media_store import MediaStore
+
+try:
+    from PIL import Image
+except ImportError:  # 没装 Pillow 就不做缩略图，直接存原图
+    Image = None
+
+
+class ImageProxy:
+    def __init__(self, cache_dir="image_cache", thumb_width=640, timeout=120):
+        self.cache_dir = cache_dir
+        self.thumb_width = thumb_width  # 闪卡在页面上大约这么宽，更大的图浏览器也用不上
+        self.timeout = timeout
+        self.inflight = {}              # key -> Future，正在下载的图片
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+        self.joined = 0                 # 搭了别人顺风车的请求数
+        self.store = MediaStore(os.path.join(cache_dir, "images"))
+
+    def path_for(self, url):
+        # 旧版本一张图一个文件，读到时搬进 MediaStore
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.img")
+
+    def _cached(self, url):
+        data = self.store.get(url)
+        if data is None and os.path.exists(self.path_for(url)):
+            with open(self.path_for(url), 'rb') as f:
+                data = self.store.put(url, f.read())
+        return data
+
+    def get(self, url):
+        # 返回 memoryview (只读、零拷贝)
+        data = self._cached(url)
+        if data is not None:
+            with self.lock:
+                self.hits += 1
+            return data
+
+        with self.lock:
+            future = self.inflight.get(url)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[url] = future
+                self.fetches += 1
+            else:
+                self.joined += 1
+        if not owner:
+            return future.result()
+
+        try:
+            # 检查和登记之间刚好有别人下载完了
+            data = self._cached(url)
+            if data is None:
+                with metrics.span("image_fetch"):
+                    data = self.store.put(url, self._fetch(url))
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(url, None)
+
+    def _fetch(self, url):
+        response = requests.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return self.make_thumbnail(response.content)
+
+    def make_thumbnail(self, data):
+        if Image is None:
+            return data
+        img = Image.open(io.BytesIO(data))
+        if img.width > self.thumb_width:
+            height = round(img.height * self.thumb_width / img.width)
+            img = img.resize((self.thumb_width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        try:
+            img.save(out, format="WEBP", quality=80)
+        except (OSError, KeyError):
+            # Pillow 没编译 WebP 支持时退回 JPEG
+            out = io.BytesIO()
+            img.convert("RGB").save(out, format="JPEG", quality=85)
+        return out.getvalue()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "fetches": self.fetches, "joined": self.joined}
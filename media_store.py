@@ -0,0 +1,136 @@
+# media_store.py - 发音 / 插图共用的内存映射存储
+# 所有媒体首尾相接写进一个 .dat 文件，另有一个只追加的 .idx 记录每段的 (偏移, 长度)。
+# 读取时返回 mmap 上的 memoryview 切片：不复制，不进 Python 堆，多少个会话同时看同一张卡，
+# 用的都是操作系统页缓存里的同一份数据，进程常驻内存不会随会话数增长。
+# 网页和 build_audio.py / build_pack.py 这些脚本可能同时往同一个缓存里写：
+# 写入时对 .idx 加文件锁，先把别的进程追加的索引读进来，再从真正的数据末尾接着写；
+# 读取时没命中也会看一眼 .idx 有没有新记录，别的进程刚写进去的媒体马上就能用。
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 flock，只能保证单进程内安全
+    fcntl = None
+
+# sha1(键), 偏移, 长度
+RECORD = struct.Struct("<20sQI")
+
+
+def media_key(key):
+    return hashlib.sha1(key.encode('utf-8')).digest()
+
+
+class MediaStore:
+    def __init__(self, path, grow_bytes=16 << 20):
+        self.data_path = path + ".dat"
+        self.index_path = path + ".idx"
+        self.grow_bytes = grow_bytes  # 数据文件每次至少扩这么多 (稀疏文件，不占实际磁盘)，减少重新映射
+        self.lock = threading.Lock()
+        self.index = {}               # sha1 -> (偏移, 长度)
+        self.end = 0                  # 已写数据的末尾；文件本身会预留得更长
+        self.index_pos = 0            # .idx 已经读到哪里 (只算完整的记录)
+        self.mm = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(self.data_path):
+            open(self.data_path, "wb").close()
+        self.data = open(self.data_path, "r+b")
+        # 追加模式：不管读到哪里，写入总是落在文件末尾
+        self.idx = open(self.index_path, "a+b")
+        self._load_index()
+        self._remap()
+
+    def _load_index(self):
+        # 从上次读到的位置接着读 .idx (第一次就是整个文件)；调用方持有 self.lock
+        if os.fstat(self.idx.fileno()).st_size - self.index_pos < RECORD.size:
+            return
+        self.idx.seek(self.index_pos)
+        raw = self.idx.read()
+        # 末尾不完整的记录 (写到一半崩溃，或者别的进程正在写) 先不读
+        usable = len(raw) - len(raw) % RECORD.size
+        fresh = {}
+        for i in range(0, usable, RECORD.size):
+            digest, offset, length = RECORD.unpack_from(raw, i)
+            fresh[digest] = (offset, length)
+            self.end = max(self.end, offset + length)
+        # 先把映射扩到能覆盖新记录，再让新记录对读者可见
+        self._ensure_mapped(self.end)
+        self.index.update(fresh)
+        self.index_pos += usable
+
+    def _remap(self):
+        size = os.fstat(self.data.fileno()).st_size
+        # 旧的映射不手动 close：还有会话拿着它的切片，等切片都释放了自然回收
+        self.mm = mmap.mmap(self.data.fileno(), size, access=mmap.ACCESS_READ) if size else None
+
+    def _ensure_mapped(self, end):
+        # 调用方持有 self.lock
+        if end and (self.mm is None or end > len(self.mm)):
+            self._remap()
+
+    def get(self, key):
+        # 返回 memoryview (只读、零拷贝)；没有返回 None
+        digest = media_key(key)
+        entry = self.index.get(digest)
+        if entry is None:
+            # 可能是别的进程刚写进去的
+            with self.lock:
+                self._load_index()
+                entry = self.index.get(digest)
+                if entry is None:
+                    return None
+        offset, length = entry
+        if not length:
+            return memoryview(b"")
+        # 命中时不加锁；映射先取到局部变量，不够长 (别的线程正在扩容) 再加锁补一次
+        mm = self.mm
+        if mm is None or offset + length > len(mm):
+            with self.lock:
+                self._ensure_mapped(offset + length)
+                mm = self.mm
+        return memoryview(mm)[offset:offset + length]
+
+    def put(self, key, data):
+        digest = media_key(key)
+        with self.lock:
+            if fcntl:
+                fcntl.flock(self.idx.fileno(), fcntl.LOCK_EX)
+            try:
+                # 拿到锁之后再看一次索引：别的进程可能已经写过这一条，也可能把数据末尾往后推了
+                self._load_index()
+                if digest not in self.index:
+                    offset = self.end
+                    self.end = offset + len(data)
+                    size = os.fstat(self.data.fileno()).st_size
+                    if self.end > size:
+                        self.data.truncate(max(self.end, size + self.grow_bytes))
+                    self.data.seek(offset)
+                    self.data.write(data)
+                    self.data.flush()
+                    # 先写数据再写索引，崩溃时最多丢掉这一条
+                    self.idx.write(RECORD.pack(digest, offset, len(data)))
+                    self.idx.flush()
+                    self.index_pos += RECORD.size
+                    # 映射先扩好再登记索引：不加锁读的 get 一看到这条，映射就一定够长
+                    self._ensure_mapped(self.end)
+                    self.index[digest] = (offset, len(data))
+            finally:
+                if fcntl:
+                    fcntl.flock(self.idx.fileno(), fcntl.LOCK_UN)
+        return self.get(key)
+
+    def __contains__(self, key):
+        digest = media_key(key)
+        if digest not in self.index:
+            with self.lock:
+                self._load_index()
+        return digest in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def stats(self):
+        return {"items": len(self.index), "bytes": self.end, "mapped": len(self.mm) if self.mm else 0}
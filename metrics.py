@@ -0,0 +1,244 @@
+# metrics.py - 各阶段耗时 / 计数 / 缓存命中率，统一导出
+# 出一张卡要经过：调模型、解析 JSON、拼图片 URL / 下载插图、合成发音、整页重跑，
+# 以前只有 st.spinner，看不出时间花在哪。这里用 with span("llm_call"): ... 包住每个阶段，
+# 耗时进直方图，抛异常记一次错误；cache_hit() 记命中 / 未命中。
+# 各模块原来各自的 stats() (出题、连接池、模型排名、配额、图库、图片代理) 用 register() 挂进来，
+# 导出时一起采集，不用再到处翻。
+#
+# 导出方式 (都是 Prometheus 文本格式，可以同时开)：
+#   METRICS_PORT=9108      起一个 HTTP 服务，GET /metrics
+#   METRICS_FILE=xxx.prom  每 METRICS_FLUSH_INTERVAL 秒 (默认 15) 覆盖写一次，给 node_exporter 的 textfile 收集器
+import bisect
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "flashcard"
+# 直方图桶的上界 (秒)：1ms 起每档 x2，最后一档约 65s；JSON 解析这种毫秒级的阶段也分得开
+BUCKET_BOUNDS = [0.001 * 2 ** i for i in range(17)]
+
+
+class Histogram:
+    # 固定桶的耗时直方图；model_router 按自己的桶 (秒级) 也用这一个
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+
+    def percentile(self, p):
+        # 返回所在桶的上界，偏保守；没有样本时返回 None
+        if not self.total:
+            return None
+        rank = p * self.total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[min(i, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+
+def label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+def metric_name(*parts):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(p for p in parts if p))
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}   # (名字, 标签) -> Histogram
+        self.counters = {}     # (名字, 标签) -> 数值
+        self.collectors = {}   # 名字 -> (返回 dict 的函数, 嵌套一层时用的标签名)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.add(seconds)
+
+    def inc(self, name, n=1, **labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    @contextmanager
+    def span(self, name, **labels):
+        # 成功和失败的耗时都记 (超时的失败往往正是最慢的那些)，失败另外计一次错误
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def cache_hit(self, cache, hit):
+        self.inc("cache_requests", cache=cache, result="hit" if hit else "miss")
+
+    def register(self, name, collect, label=None):
+        # collect() 返回 {指标: 数值}；值也是 dict 时 (比如每个模型一份)，外层的键作为 label 标签
+        # 同名重复注册会覆盖 (Streamlit 重跑时会再走一遍注册代码)
+        with self.lock:
+            self.collectors[name] = (collect, label)
+
+    def collect(self):
+        # 采集所有注册的统计，返回 [(指标名, 标签, 数值)]；采集失败的跳过，不影响其他
+        with self.lock:
+            collectors = list(self.collectors.items())
+        samples = []
+        for name, (collect, label) in collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"Metrics Collect Error ({name}): {e}")
+                continue
+            for field, value in values.items():
+                if isinstance(value, dict) and label:
+                    for sub, v in value.items():
+                        if isinstance(v, (int, float)) and not isinstance(v, bool):
+                            samples.append((metric_name(name, sub), ((label, str(field)),), v))
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    samples.append((metric_name(name, field), (), value))
+        return samples
+
+    def snapshot(self):
+        # 给侧边栏调试面板用：每个阶段的次数、p50 / p95、平均、错误数，以及各缓存的命中率
+        with self.lock:
+            histograms = {key: (h.total, h.percentile(0.5), h.percentile(0.95), h.sum)
+                          for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+        stages = {}
+        for (name, labels), (total, p50, p95, seconds) in sorted(histograms.items()):
+            errors = counters.get((f"{name}_errors", labels), 0)
+            title = name + (format_labels(labels) if labels else "")
+            stages[title] = {"count": total, "p50": p50, "p95": p95,
+                             "avg": seconds / total if total else 0.0, "errors": errors}
+        caches = {}
+        for (name, labels), n in counters.items():
+            if name == "cache_requests":
+                tags = dict(labels)
+                caches.setdefault(tags["cache"], {"hit": 0, "miss": 0})[tags["result"]] += n
+        for c in caches.values():
+            total = c["hit"] + c["miss"]
+            c["hit_rate"] = c["hit"] / total if total else 0.0
+        return {"stages": stages, "caches": caches}
+
+    def render(self):
+        # Prometheus 文本格式 (0.0.4)
+        with self.lock:
+            histograms = {key: (h.bounds, list(h.counts), h.total, h.sum) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+        lines = []
+        typed = set()
+        for (name, labels), (bounds, counts, total, seconds) in sorted(histograms.items()):
+            full = metric_name(PREFIX, name, "seconds")
+            if full not in typed:
+                typed.add(full)
+                lines.append(f"# TYPE {full} histogram")
+            cumulative = 0
+            for bound, n in zip(bounds + [float("inf")], counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{full}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{full}_sum{format_labels(labels)} {seconds:.6f}")
+            lines.append(f"{full}_count{format_labels(labels)} {total}")
+        for (name, labels), n in sorted(counters.items()):
+            full = metric_name(PREFIX, name, "total")
+            if full not in typed:
+                typed.add(full)
+                lines.append(f"# TYPE {full} counter")
+            lines.append(f"{full}{format_labels(labels)} {n}")
+        for name, labels, value in self.collect():
+            full = metric_name(PREFIX, name)
+            if full not in typed:
+                typed.add(full)
+                lines.append(f"# TYPE {full} gauge")
+            lines.append(f"{full}{format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+observe = registry.observe
+inc = registry.inc
+span = registry.span
+cache_hit = registry.cache_hit
+register = registry.register
+snapshot = registry.snapshot
+render = registry.render
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        raw = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def write_file(path):
+    # 先写临时文件再替换，采集方不会读到写了一半的内容
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+exporters = {}
+exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    # 按环境变量启动导出，进程里只会启动一次；返回已启动的导出方式
+    with exporters_lock:
+        if exporters:
+            return exporters
+        port = os.environ.get("METRICS_PORT")
+        if port:
+            httpd = ThreadingHTTPServer(("0.0.0.0", int(port)), MetricsHandler)
+            httpd.daemon_threads = True
+            threading.Thread(target=httpd.serve_forever, daemon=True, name="metrics-http").start()
+            exporters["http"] = httpd
+        path = os.environ.get("METRICS_FILE")
+        if path:
+            interval = float(os.environ.get("METRICS_FLUSH_INTERVAL", 15))
+
+            def flush_loop():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        write_file(path)
+                    except OSError as e:
+                        print(f"Metrics Flush Error: {e}")
+
+            threading.Thread(target=flush_loop, daemon=True, name="metrics-file").start()
+            exporters["file"] = path
+        return exporters
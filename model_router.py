@@ -0,0 +1,100 @@
+# model_router.py - 多个出题模型的排名 (延迟直方图 + 成功率)
+# app1~app5 里先后写死过 gemini-2.5-flash、gemini-2.0-flash、gemma-3-27b-it，
+# 现在改成一个可配置的模型列表，每次调用都记下耗时和是否出了合格的题，
+# 据此自动排序，并给对冲请求 (hedged request) 算出等待期限。
+import threading
+
+from metrics import Histogram
+
+# 直方图桶的上界 (秒)：0.1s 起每档 x1.5，最后一档约 220s
+BUCKET_BOUNDS = [0.1 * 1.5 ** i for i in range(20)]
+# 样本数到这个数之前不参与自动排序，保持配置里的顺序
+MIN_SAMPLES = 5
+
+
+class ModelStats:
+    def __init__(self):
+        self.latency = Histogram(BUCKET_BOUNDS)  # 只统计成功的调用
+        self.successes = 0
+        self.failures = 0
+
+    @property
+    def samples(self):
+        return self.successes + self.failures
+
+    def success_rate(self):
+        # 加一个先验 (1 成 1 败)，样本少时不至于一次失败就掉到 0
+        return (self.successes + 1) / (self.samples + 2)
+
+    def cost(self):
+        # 期望耗时：一次成功平均要等多久
+        return (self.latency.percentile(0.5) or BUCKET_BOUNDS[-1]) / self.success_rate()
+
+
+class ModelRouter:
+    def __init__(self, models, hedge_min=2.0, hedge_max=20.0, hedge_default=8.0):
+        self.models = list(dict.fromkeys(models))
+        self.stats = {m: ModelStats() for m in self.models}
+        self.hedge_min = hedge_min          # 秒，对冲等待期限的上下限
+        self.hedge_max = hedge_max
+        self.hedge_default = hedge_default  # 还没有 p95 数据时用这个
+        self.hedges = 0                     # 发出的对冲请求数
+        self.hedge_wins = 0                 # 对冲请求先拿到合格结果的次数
+        self.lock = threading.Lock()
+
+    def record(self, model, seconds, ok):
+        with self.lock:
+            stats = self.stats.setdefault(model, ModelStats())
+            if ok:
+                stats.successes += 1
+                stats.latency.add(seconds)
+            else:
+                stats.failures += 1
+
+    def count_hedge(self, won):
+        # 每发出一个对冲请求调用一次，won 表示最后用的是它的结果
+        with self.lock:
+            self.hedges += 1
+            self.hedge_wins += bool(won)
+
+    def ranking(self):
+        # 样本够的模型按期望耗时重新排，占着它们原来在配置里的位置；
+        # 样本不够的模型留在原位，所以一开始完全按配置顺序来
+        with self.lock:
+            ranked = [m for m in self.models if self.stats[m].samples >= MIN_SAMPLES]
+            ranked.sort(key=lambda m: self.stats[m].cost())
+            ranked = iter(ranked)
+            return [next(ranked) if self.stats[m].samples >= MIN_SAMPLES else m for m in self.models]
+
+    def hedge_delay(self, model):
+        # 主请求超过自己的 p95 还没回来，就认为它落在长尾里了
+        with self.lock:
+            p95 = self.stats[model].latency.percentile(0.95)
+        if p95 is None:
+            return self.hedge_default
+        return min(self.hedge_max, max(self.hedge_min, p95))
+
+    def hedge_target(self, candidates):
+        # 对冲选最快的那个 (p50 最小)；都没数据时按排名取下一个
+        with self.lock:
+            timed = [(self.stats[m].latency.percentile(0.5), i, m) for i, m in enumerate(candidates)]
+        timed = [t for t in timed if t[0] is not None]
+        if timed:
+            return min(timed)[2]
+        return candidates[0] if candidates else None
+
+    def hedge_stats(self):
+        with self.lock:
+            return {"hedges": self.hedges, "wins": self.hedge_wins}
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                m: {
+                    "calls": s.samples,
+                    "success_rate": s.successes / s.samples if s.samples else None,
+                    "p50": s.latency.percentile(0.5),
+                    "p95": s.latency.percentile(0.95),
+                }
+                for m, s in self.stats.items()
+            }
@@ -0,0 +1,72 @@
+# prefetch.py - 后台预加载接下来的几张闪卡
+# 用户在答当前这张时，线程池已经在准备下一批单词的题目 JSON、语音和图片，
+# 点 "下一张" 时直接从就绪队列里取，不用再等 AI。
+# 注意：build_card 跑在工作线程里，不能访问 st.session_state / st.* 组件。
+import threading
+
+
+class Prefetcher:
+    def __init__(self, executor, depth=3):
+        self.executor = executor  # 所有会话共享同一个线程池
+        self.depth = depth        # 最多同时预加载几张
+        self.generation = 0       # 每次 cancel() 都 +1，旧任务的结果直接作废
+        self.pending = {}         # word -> Future
+        self.lock = threading.Lock()
+
+    def fill(self, candidates, build_card, *args):
+        # candidates 按优先级排列，已经在队列里的单词不会重复提交
+        with self.lock:
+            for word in candidates:
+                if len(self.pending) >= self.depth:
+                    break
+                if word in self.pending:
+                    continue
+                self.pending[word] = self.executor.submit(
+                    self._run, self.generation, build_card, word, *args
+                )
+
+    def _run(self, generation, build_card, word, *args):
+        # 排队期间被取消了就不再浪费 API 配额
+        if generation != self.generation:
+            return None
+        return build_card(word, *args)
+
+    def pop_ready(self, is_allowed):
+        # 取出一张已经完成、且 is_allowed(word) 为真 (仍待复习) 的卡片；没有就返回 (None, None)
+        with self.lock:
+            for word, future in list(self.pending.items()):
+                if not future.done():
+                    continue
+                del self.pending[word]
+                if future.cancelled() or not is_allowed(word):
+                    continue
+                try:
+                    card = future.result()
+                except Exception as e:
+                    print(f"Prefetch Error ({word}): {e}")
+                    continue
+                if card:
+                    return word, card
+        return None, None
+
+    def discard(self, word):
+        # 当前单词已经走了同步生成，不需要再等它的预加载
+        with self.lock:
+            future = self.pending.pop(word, None)
+        if future:
+            future.cancel()
+
+    def cancel(self):
+        # 词库变化时调用：没开始的任务直接取消，已经在跑的结果会被丢弃
+        with self.lock:
+            self.generation += 1
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def ready_count(self):
+        with self.lock:
+            return sum(1 for f in self.pending.values() if f.done())
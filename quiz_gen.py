@@ -0,0 +1,513 @@
+# quiz_gen.py - 调用 Gemma 出题 (单个 / 批量)
+# 从 app.py 里拆出来，这样后台线程、批量工具和压测脚本都能直接 import，
+# 不会触发 Streamlit 页面代码。
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import client_pool
+import metrics
+import quota
+from dictionary import load_dictionary
+from distractors import overlaps, sense_ngrams
+from model_router import ModelRouter
+from quota import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from quiz_schema import CJK_RE, LABELS, is_valid_quiz, normalize_quiz, parse_llm_json, validate_quiz
+
+# ✅ 继续使用 Gemma 3 (14.4K 配额)
+# 共享题库按这个名字分区，备用模型出的题也存在这里
+QUIZ_MODEL = 'models/gemma-3-27b-it'
+# 修改下面的 Prompt 时记得把版本号 +1，共享题库里的旧题会自动失效
+PROMPT_VERSION = 'v1'
+# 指向本地假服务 (例如 http://127.0.0.1:8765) 时走 REST，方便离线压测
+GEMINI_API_ENDPOINT = os.environ.get("GEMINI_API_ENDPOINT")
+# Mac 上遇到 SSL/TLS 握手问题时可以设成 rest (见 test.py)
+GEMINI_TRANSPORT = os.environ.get("GEMINI_TRANSPORT") or ('rest' if GEMINI_API_ENDPOINT else None)
+# 出题模型按顺序依次尝试 (逗号分隔)；跑起来之后会按实际延迟和成功率自动调整顺序
+QUIZ_MODELS = [m.strip() for m in os.environ.get(
+    "QUIZ_MODELS", f"{QUIZ_MODEL},models/gemma-3-12b-it,models/gemini-2.0-flash").split(",") if m.strip()]
+# 答题时主模型超过自己的 p95 还没回来，就向最快的备用模型再发一份，谁先出合格的题用谁
+HEDGE_REQUESTS = os.environ.get("HEDGE_REQUESTS", "1") == "1"
+# 排队拿 TPM 配额时预估的每道题输出 token 数，调用结束后按实际用量多退少补
+OUTPUT_TOKENS_PER_QUIZ = 250
+# 离线词典 (build_dict.py 编译，没有就用自带的种子词表)：查得到的单词音标和正确释义直接用词典的，
+# 模型只写插图 Prompt、联想提示和三个干扰项；USE_DICTIONARY=0 时全部走模型
+dictionary = (load_dictionary(os.environ.get("DICTIONARY", "dictionary.dic"))
+              if os.environ.get("USE_DICTIONARY", "1") == "1" else None)
+
+QUIZ_SCHEMA_EXAMPLE = """
+    {{
+        "word": "{word}",
+        "ipa": "音标",
+        "image_gen_prompt": "Cartoon style illustration of...",
+        "visual_cue_cn": "中文场景描述",
+        "options": [
+            {{"label": "A", "text": "错误的中文意思"}},
+            {{"label": "B", "text": "正确的中文意思"}},
+            {{"label": "C", "text": "错误的中文意思"}},
+            {{"label": "D", "text": "错误的中文意思"}}
+        ],
+        "correct_label": "B"
+    }}"""
+
+
+def build_quiz_prompt(word):
+    return f"""
+    请针对单词 "{word}" 设计一道英语词汇测试题。
+
+    必须严格遵守以下规则：
+    1. 直接返回纯 JSON 格式，不要使用 Markdown 标记。
+    2. **核心要求：选项 (options) 中的 text 必须是该单词的【中文释义】，绝对不要使用英文解释！**
+    3. 干扰项 (错误选项) 也必须是其他不相关的【中文词汇】。
+
+    JSON 结构示例：
+    {QUIZ_SCHEMA_EXAMPLE.format(word=word)}
+    """
+
+
+def build_creative_prompt(word, entry):
+    # 词典里有的单词：音标和释义不用模型写，Prompt 和输出都短得多
+    return f"""
+    单词 "{word}" 的中文释义是 "{entry['gloss']}"，请为它补充以下内容，直接返回纯 JSON，不要使用 Markdown 标记：
+    1. image_gen_prompt：用于 AI 画图的英文描述，卡通风格，体现单词含义。
+    2. visual_cue_cn：帮助记忆的中文场景描述，一句话。
+    3. distractors：3 个错误的【中文释义】作为干扰项，词性和字数与 "{entry['gloss']}" 相近，但意思明显不同。
+
+    {{"image_gen_prompt": "Cartoon style illustration of...", "visual_cue_cn": "中文场景描述", "distractors": ["干扰项1", "干扰项2", "干扰项3"]}}
+    """
+
+
+def build_batch_prompt(words):
+    word_list = json.dumps(words, ensure_ascii=False)
+    return f"""
+    请针对以下 {len(words)} 个单词，分别设计一道英语词汇测试题。
+    单词列表：{word_list}
+
+    必须严格遵守以下规则：
+    1. 直接返回一个纯 JSON 数组，数组里每个元素对应一个单词，顺序与单词列表一致，不要使用 Markdown 标记。
+    2. **核心要求：选项 (options) 中的 text 必须是该单词的【中文释义】，绝对不要使用英文解释！**
+    3. 干扰项 (错误选项) 也必须是其他不相关的【中文词汇】。
+
+    数组中每个元素的 JSON 结构示例：
+    {QUIZ_SCHEMA_EXAMPLE.format(word="单词")}
+    """
+
+
+def build_fix_prompt(word, bad_output, errors):
+    # 只在本地修不好时才用：把具体问题告诉模型，让它改这一道题
+    problems = "\n".join(f"    - {e}" for e in errors)
+    return f"""
+    你上次为单词 "{word}" 生成的测试题不符合要求，问题如下：
+{problems}
+
+    上次的输出：
+    {bad_output}
+
+    请修正以上问题，只返回修正后的纯 JSON，不要使用 Markdown 标记，结构如下：
+    {QUIZ_SCHEMA_EXAMPLE.format(word=word)}
+    """
+
+
+# 全局统计：调用次数、成功出题数、本地修好的次数、不合格需要重新生成的次数
+QUIZ_METRICS = {"calls": 0, "cards": 0, "repaired": 0, "bad_outputs": 0.0, "failed": 0}
+metrics_lock = threading.Lock()
+
+
+def count(name, n=1):
+    with metrics_lock:
+        QUIZ_METRICS[name] += n
+
+
+def quiz_metrics():
+    with metrics_lock:
+        m = dict(QUIZ_METRICS)
+    # 每张成功的卡片平均浪费了几次调用 (输出不合格只能重新生成的那些)
+    m["wasted_per_card"] = m["bad_outputs"] / m["cards"] if m["cards"] else 0.0
+    return m
+
+
+router = ModelRouter(
+    QUIZ_MODELS,
+    hedge_min=float(os.environ.get("HEDGE_MIN_DELAY", 2)),
+    hedge_max=float(os.environ.get("HEDGE_MAX_DELAY", 20)),
+)
+# 对冲请求要同时跑两个模型，单独一个线程池。每个在跑的出题请求 (最多 ENGINE_CONCURRENCY 个) 都可能同时带着
+# 主、备两条腿，线程数至少是它的两倍，否则负载一高主请求就在这里排队，备用请求又排在它后面
+ENGINE_CONCURRENCY = int(os.environ.get("ENGINE_CONCURRENCY", 16))
+hedge_pool = ThreadPoolExecutor(max_workers=ENGINE_CONCURRENCY * 2, thread_name_prefix="hedge")
+metrics.register("quiz", quiz_metrics)
+metrics.register("model", router.snapshot, label="model")
+metrics.register("hedge", router.hedge_stats)
+
+
+def get_model(key, model_name=QUIZ_MODEL):
+    # 从连接池取，不再每道题都 configure + 新建 client
+    return client_pool.get_model(key, model_name, GEMINI_TRANSPORT, GEMINI_API_ENDPOINT)
+
+
+def call_model(model, key, prompt, priority, outputs=1, **kwargs):
+    # 所有 generate_content 都从这里走：先按优先级排队拿配额，429 / 5xx 自动退避重试
+    # 返回 (response, 预估 token 数)，调用方拿到 usage_metadata 后用 settle_tokens 结算
+    scheduler = quota.get_scheduler(key, model.model_name)
+    estimate = len(prompt.encode("utf-8")) // 4 + OUTPUT_TOKENS_PER_QUIZ * outputs
+    # 含排队和退避重试的总耗时；流式调用只算到连接建立 (拿到第一个响应)
+    with metrics.span("llm_call", model=model.model_name.split("/")[-1]):
+        response = quota.call_with_quota(
+            scheduler, lambda: model.generate_content(prompt, **kwargs), priority, estimate)
+    return response, estimate
+
+
+def settle_tokens(model, key, estimate, response):
+    meta = getattr(response, 'usage_metadata', None)
+    if meta:
+        used = meta.prompt_token_count + meta.candidates_token_count
+        quota.get_scheduler(key, model.model_name).adjust_tokens(used - estimate)
+
+
+def check_output(word, text):
+    # 抠 JSON -> 本地修复 -> 统一格式 -> 校验，返回 (题目, 问题列表)
+    with metrics.span("json_parse"):
+        quiz, repaired = parse_llm_json(text)
+        if repaired:
+            count("repaired")
+        quiz = normalize_quiz(quiz)
+        return quiz, validate_quiz(quiz, word)
+
+
+def check_creative_output(word, entry, text):
+    # 词典 + 模型补充的字段拼成一道完整的题，正确答案的位置本地随机；返回 (题目, 问题列表)
+    with metrics.span("json_parse", kind="dictionary"):
+        data, repaired = parse_llm_json(text)
+        if repaired:
+            count("repaired")
+        if not isinstance(data, dict):
+            return None, ["输出不是 JSON 对象"]
+        wrong = [d.strip() for d in data.get("distractors") or [] if isinstance(d, str) and CJK_RE.search(d)]
+        # 和正确释义有义项重合的 (比如 "谈判" 之于 "谈判；协商") 会变成两个正确答案，丢掉
+        correct = sense_ngrams(entry['gloss'])
+        wrong = [d for d in dict.fromkeys(wrong) if not overlaps(sense_ngrams(d), correct)][:len(LABELS) - 1]
+        if len(wrong) < len(LABELS) - 1:
+            return None, ["distractors 必须是 3 个互不相同、且和正确释义意思不同的中文释义"]
+        texts = [entry['gloss']] + wrong
+        random.shuffle(texts)
+        quiz = {
+            "word": word,
+            "ipa": entry['ipa'],
+            "image_gen_prompt": str(data.get("image_gen_prompt") or f"illustration of {word}"),
+            "visual_cue_cn": str(data.get("visual_cue_cn") or ""),
+            "options": [{"label": label, "text": text} for label, text in zip(LABELS, texts)],
+            "correct_label": LABELS[texts.index(entry['gloss'])],
+        }
+        return quiz, validate_quiz(quiz, word)
+
+
+def lookup_word(word):
+    entry = dictionary.lookup(word) if dictionary else None
+    # 词典里没有音标的词条 (有的词表只有释义) 还是整题交给模型
+    return entry if entry and entry['ipa'] else None
+
+
+def record_usage(usage, response):
+    # usage 是调用方传进来的统计字典，压测时用来算 tokens/word
+    count("calls")
+    if usage is None:
+        return
+    usage['calls'] = usage.get('calls', 0) + 1
+    meta = getattr(response, 'usage_metadata', None)
+    if meta:
+        usage['prompt_tokens'] = usage.get('prompt_tokens', 0) + meta.prompt_token_count
+        usage['output_tokens'] = usage.get('output_tokens', 0) + meta.candidates_token_count
+
+
+def fix_quiz(model, key, word, text, errors, usage=None, max_fixes=1, priority=PRIORITY_INTERACTIVE):
+    # 本地修不好的输出：带着问题列表让模型定向修正，最多 max_fixes 次
+    for _ in range(max_fixes):
+        count("bad_outputs")
+        print(f"Gemma Invalid ({word}): {errors}")
+        try:
+            response, estimate = call_model(model, key, build_fix_prompt(word, text, errors), priority)
+            settle_tokens(model, key, estimate, response)
+            record_usage(usage, response)
+            text = response.text
+        except Exception as e:
+            print(f"Gemma Error: {e}")
+            break
+        quiz, errors = check_output(word, text)
+        if not errors:
+            return quiz
+    count("failed")
+    return None
+
+
+def complete_from_dictionary(model, key, word, entry, usage=None, priority=PRIORITY_INTERACTIVE):
+    # 只让模型写创意字段；输出不合格返回 None，由调用方退回整题生成 (调用异常照常抛出)
+    response, estimate = call_model(model, key, build_creative_prompt(word, entry), priority)
+    settle_tokens(model, key, estimate, response)
+    record_usage(usage, response)
+    quiz, errors = check_creative_output(word, entry, response.text)
+    if errors:
+        print(f"Gemma Invalid ({word}, 词典模式): {errors}")
+        count("bad_outputs")
+        return None
+    return quiz
+
+
+def generate_quiz_with(model_name, word, key, usage=None, max_fixes=1, priority=PRIORITY_INTERACTIVE):
+    # 用指定的模型出一道题，顺便把耗时和成败记进 router
+    # 不计 cards：对冲时两条腿都可能出题，只有 generate_quiz 知道最终交出去的是哪一张
+    # 词典里有的单词先走短 Prompt，只让模型补创意字段
+    model = get_model(key, model_name)
+    entry = lookup_word(word)
+    start = time.perf_counter()
+    try:
+        if entry:
+            quiz = complete_from_dictionary(model, key, word, entry, usage, priority)
+            if quiz:
+                router.record(model_name, time.perf_counter() - start, True)
+                return quiz
+        response, estimate = call_model(model, key, build_quiz_prompt(word), priority)
+        settle_tokens(model, key, estimate, response)
+        record_usage(usage, response)
+        text = response.text
+    except quota.QuotaExceeded as e:
+        # 配额不够不算模型的错，不计入成功率
+        print(f"Gemma Skipped ({model_name}): {e}")
+        count("failed")
+        return None
+    except Exception as e:
+        print(f"Gemma Error ({model_name}): {e}")
+        count("failed")
+        router.record(model_name, time.perf_counter() - start, False)
+        return None
+    quiz, errors = check_output(word, text)
+    if errors:
+        quiz = fix_quiz(model, key, word, text, errors, usage, max_fixes, priority)
+    router.record(model_name, time.perf_counter() - start, quiz is not None)
+    return quiz
+
+
+def generate_quiz_hedged(primary, backups, word, key, usage=None, max_fixes=1, priority=PRIORITY_INTERACTIVE):
+    # 先只发主模型；过了对冲期限还没结果，再向最快的备用模型发一份，取先出合格题的那个
+    # 返回 (题目, 用过的模型)。输掉的那个请求不取消，跑完照样记进统计
+    args = (word, key, usage, max_fixes, priority)
+    started = threading.Event()
+
+    def run_primary():
+        started.set()
+        return generate_quiz_with(primary, *args)
+
+    futures = {hedge_pool.submit(run_primary): primary}
+    backup = router.hedge_target(backups)
+    # 对冲期限从主请求真正开始跑算起，在线程池里排队的时间不算
+    started.wait()
+    done, _ = wait(futures, timeout=router.hedge_delay(primary))
+    if not done and backup:
+        futures[hedge_pool.submit(generate_quiz_with, backup, *args)] = backup
+    pending = set(futures)
+    winner, quiz = None, None
+    while pending and quiz is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if quiz is None and future.result():
+                winner, quiz = futures[future], future.result()
+    if len(futures) > 1:
+        router.count_hedge(winner == backup)
+    return quiz, list(futures.values())
+
+
+def generate_quiz(word, key, usage=None, max_fixes=1, priority=PRIORITY_INTERACTIVE, exclude=()):
+    # 按 router 的排名依次尝试各个模型，直到出一道合格的题
+    # 只有答题中的卡片才发对冲请求，预加载和批量不值得多花一份配额
+    models = [m for m in router.ranking() if m not in exclude]
+    hedge = HEDGE_REQUESTS and priority == PRIORITY_INTERACTIVE
+    metrics.cache_hit("dictionary", lookup_word(word) is not None)
+    while models:
+        primary = models.pop(0)
+        if hedge and models:
+            hedge = False
+            quiz, used = generate_quiz_hedged(primary, models, word, key, usage, max_fixes, priority)
+            models = [m for m in models if m not in used]
+        else:
+            quiz = generate_quiz_with(primary, word, key, usage, max_fixes, priority)
+        if quiz:
+            count("cards")
+            return quiz
+    return None
+
+
+def generate_quiz_batch(words, key, batch_size=10, max_retries=1, store=None, usage=None,
+                        priority=PRIORITY_BULK):
+    # 一次请求生成 batch_size 个单词的题目，返回 {word: quiz}
+    # 校验失败或漏掉的单词只单独重试那几个，不整批重来
+    # 默认按最低优先级排队，配额紧张时整批放弃，把额度留给正在答题的同学
+    results = {}
+    todo = []
+    for word in dict.fromkeys(words):
+        cached = store.get(word, QUIZ_MODEL, PROMPT_VERSION) if store else None
+        if cached:
+            results[word] = cached
+        else:
+            todo.append(word)
+
+    model = get_model(key, router.ranking()[0])
+    for attempt in range(max_retries + 1):
+        failed = []
+        for i in range(0, len(todo), batch_size):
+            chunk = todo[i:i + batch_size]
+            try:
+                response, estimate = call_model(model, key, build_batch_prompt(chunk), priority, len(chunk))
+                settle_tokens(model, key, estimate, response)
+                record_usage(usage, response)
+                with metrics.span("json_parse", kind="batch"):
+                    items, repaired = parse_llm_json(response.text, "[")
+                if repaired:
+                    count("repaired")
+            except quota.QuotaExceeded as e:
+                print(f"Gemma Batch Skipped: {e}")
+                count("failed", len(todo) - i)
+                return results
+            except Exception as e:
+                print(f"Gemma Batch Error: {e}")
+                items = []
+            if not isinstance(items, list):
+                items = []
+
+            # 按 word 字段对齐，模型偶尔会打乱顺序
+            by_word = {}
+            for item in items:
+                if isinstance(item, dict) and isinstance(item.get('word'), str):
+                    by_word[item['word'].strip().lower()] = item
+            for word in chunk:
+                quiz = normalize_quiz(by_word.get(word.strip().lower()))
+                if is_valid_quiz(quiz, word):
+                    count("cards")
+                    results[word] = quiz
+                    if store:
+                        store.put(word, QUIZ_MODEL, PROMPT_VERSION, quiz)
+                else:
+                    # 一次调用出 len(chunk) 张卡，坏一张只算浪费了这一份
+                    count("bad_outputs", 1 / len(chunk))
+                    failed.append(word)
+        if not failed:
+            break
+        todo = failed
+    count("failed", len(todo) if failed else 0)
+    return results
+
+
+class PartialQuizParser:
+    # 流式输出时边收边解析：顶层的某个字段一完整就立刻交出来，
+    # 不用等整个 JSON 收完。每个字符只扫描一次。
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.fields = {}
+        self.depth = 0
+        self.in_str = False
+        self.escape = False
+        self.expect_key = True
+        self.key = None
+        self.value_start = None  # 当前顶层值在 buf 里的起始位置
+        self.done = False
+
+    def feed(self, text):
+        # 返回这次新完成的字段
+        self.buf += text
+        new_fields = {}
+        buf = self.buf
+        while self.pos < len(buf) and not self.done:
+            ch = buf[self.pos]
+            if self.depth == 0:
+                # 对象开始之前的内容 (比如 ```json) 直接跳过
+                if ch == "{":
+                    self.depth = 1
+            elif self.in_str:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_str = False
+                    if self.depth == 1:
+                        self._finish(self.pos, new_fields)
+            elif ch == '"':
+                self.in_str = True
+                if self.depth == 1 and self.value_start is None:
+                    self.value_start = self.pos
+            elif ch in "{[":
+                if self.depth == 1 and self.value_start is None:
+                    self.value_start = self.pos
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 1 and self.value_start is not None:
+                    self._finish(self.pos, new_fields)
+                elif self.depth == 0:
+                    self._finish(self.pos - 1, new_fields)
+                    self.done = True
+            elif self.depth == 1:
+                if ch == ":":
+                    self.expect_key = False
+                elif ch == ",":
+                    self._finish(self.pos - 1, new_fields)
+                    self.expect_key = True
+                elif not ch.isspace() and self.value_start is None:
+                    self.value_start = self.pos  # 数字 / true / false / null
+            self.pos += 1
+        return new_fields
+
+    def _finish(self, end, new_fields):
+        if self.value_start is None:
+            return
+        raw = self.buf[self.value_start:end + 1].strip()
+        self.value_start = None
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        if self.expect_key:
+            self.key = value
+        elif self.key is not None:
+            self.fields[self.key] = value
+            new_fields[self.key] = value
+            self.key = None
+
+
+def generate_quiz_stream(word, key, usage=None, priority=PRIORITY_INTERACTIVE):
+    # 流式出题：每当有字段完整时 yield 一次当前已知的所有字段，
+    # 最后一次 yield 的是完整解析后的题目 (失败时是 None)
+    # 配额和退避只管建立连接这一步，流到一半断了就换下一个模型整题重出
+    # 词典里有的单词：单词和音标马上就有，剩下的短 Prompt 一次出完，不值得流式
+    entry = lookup_word(word)
+    if entry:
+        yield {"word": word, "ipa": entry['ipa']}
+        yield generate_quiz(word, key, usage, priority=priority)
+        return
+    model_name = router.ranking()[0]
+    model = get_model(key, model_name)
+    parser = PartialQuizParser()
+    start = time.perf_counter()
+    try:
+        response, estimate = call_model(model, key, build_quiz_prompt(word), priority, stream=True)
+        for chunk in response:
+            if parser.feed(chunk.text):
+                yield dict(parser.fields)
+        settle_tokens(model, key, estimate, response)
+        record_usage(usage, response)
+    except Exception as e:
+        print(f"Gemma Stream Error ({model_name}): {e}")
+        count("failed")
+        if not isinstance(e, quota.QuotaExceeded):
+            router.record(model_name, time.perf_counter() - start, False)
+        yield generate_quiz(word, key, usage, priority=priority, exclude={model_name})
+        return
+    quiz, errors = check_output(word, parser.buf)
+    if errors:
+        quiz = fix_quiz(model, key, word, parser.buf, errors, usage, priority=priority)
+    if quiz:
+        count("cards")
+    router.record(model_name, time.perf_counter() - start, quiz is not None)
+    yield quiz
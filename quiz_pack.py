@@ -0,0 +1,130 @@
+# quiz_pack.py - 离线题包：一个文件装下整份词表的题目、插图和发音
+# build_pack.py 把 CET-4、雅思这类固定词表提前生成好写进题包，app 打开题包后出题不再访问任何网络。
+# 读取用 mmap：打开时只读文件头，查词在有序索引上二分查找，只有真正用到的那几段会被读进内存，
+# 所以不管题包多大，启动和每张卡的耗时基本都是常数，多个进程打开同一个题包也共用一份页缓存。
+#
+# 文件布局 (小端)：
+#   文件头  HEADER: magic "QPK1", 版本, 单词数, 索引起始位置
+#   数据区  每个单词的题目 JSON / 图片 / 发音，依次首尾相接
+#   键区    所有规范化后的单词 (UTF-8)，按字节序排好
+#   索引    ENTRY x 单词数，与键区同序，每条记录键和三段数据的 (偏移, 长度)
+import json
+import mmap
+import os
+import struct
+
+from quiz_store import normalize_word
+
+MAGIC = b"QPK1"
+VERSION = 1
+HEADER = struct.Struct("<4sHIQ")
+# 键偏移, 键长度, 题目偏移, 题目长度, 图片偏移, 图片长度, 发音偏移, 发音长度, 图片类型
+ENTRY = struct.Struct("<QHQIQIQIB")
+IMAGE_NONE, IMAGE_URL, IMAGE_BYTES = 0, 1, 2
+
+
+class QuizPackWriter:
+    # 边生成边追加数据，索引留在内存里，close() 时排序写到文件末尾
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.f = open(self.tmp_path, "wb")
+        self.f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        self.entries = {}  # 规范化单词 -> (题目, 图片, 发音, 图片类型) 的 (偏移, 长度)
+
+    def _blob(self, data):
+        if not data:
+            return 0, 0
+        offset = self.f.tell()
+        self.f.write(data)
+        return offset, len(data)
+
+    def add(self, word, quiz, image=None, audio=None):
+        # image 可以是 URL 字符串 (渲染时浏览器去加载) 或图片字节 (完全离线)
+        if isinstance(image, str):
+            kind, image = IMAGE_URL, image.encode("utf-8")
+        else:
+            kind = IMAGE_BYTES if image else IMAGE_NONE
+        quiz_blob = self._blob(json.dumps(quiz, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self.entries[normalize_word(word)] = (quiz_blob, self._blob(image), self._blob(audio), kind)
+
+    def close(self):
+        keys = sorted(self.entries, key=lambda k: k.encode("utf-8"))
+        key_offsets = []
+        for key in keys:
+            key_offsets.append(self._blob(key.encode("utf-8")))
+        index_offset = self.f.tell()
+        for key, (key_off, key_len) in zip(keys, key_offsets):
+            (q_off, q_len), (i_off, i_len), (a_off, a_len), kind = self.entries[key]
+            self.f.write(ENTRY.pack(key_off, key_len, q_off, q_len, i_off, i_len, a_off, a_len, kind))
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, len(keys), index_offset))
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+
+class QuizPack:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.index_offset = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是可识别的题包 (版本 {version})")
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self.mm, self.index_offset + i * ENTRY.size)
+
+    def _key(self, entry):
+        return self.mm[entry[0]:entry[0] + entry[1]]
+
+    def _find(self, word):
+        target = normalize_word(word).encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(self._entry(mid)) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            entry = self._entry(lo)
+            if self._key(entry) == target:
+                return entry
+        return None
+
+    def __contains__(self, word):
+        return self._find(word) is not None
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, word):
+        # 返回 {"quiz", "image", "audio"}；image 是 URL 字符串、图片数据或 None
+        # 图片和发音是 mmap 上的 memoryview 切片，不复制，会话拿着它也不多占内存
+        entry = self._find(word)
+        if entry is None:
+            return None
+        _, _, q_off, q_len, i_off, i_len, a_off, a_len, kind = entry
+        view = memoryview(self.mm)
+        image = None
+        if kind == IMAGE_URL:
+            image = self.mm[i_off:i_off + i_len].decode("utf-8")
+        elif kind == IMAGE_BYTES:
+            image = view[i_off:i_off + i_len]
+        return {
+            "quiz": json.loads(self.mm[q_off:q_off + q_len]),
+            "image": image,
+            "audio": view[a_off:a_off + a_len] if a_len else None,
+        }
+
+    def words(self):
+        for i in range(self.count):
+            yield self._key(self._entry(i)).decode("utf-8")
+
+    def close(self):
+        # 还有切片没释放时 mmap 关不掉，交给垃圾回收
+        try:
+            self.mm.close()
+        except BufferError:
+            pass
@@ -0,0 +1,164 @@
+# quiz_schema.py - 从模型输出里抠出 JSON、修常见毛病、按题目格式校验
+# 模型偶尔会在 JSON 前后加说明文字、包 ```json、多一个尾逗号，或者把 correct_label 写成 "B."，
+# 这些都能在本地修好，不值得再花一次 API 调用重新生成。
+import json
+import re
+
+LABELS = ["A", "B", "C", "D"]
+CJK_RE = re.compile(r"[一-鿿]")
+
+
+def extract_json(text, opener="{", start=0):
+    # 一次扫描找到 start 之后第一个完整的 JSON 对象 (或数组)，字符串里的括号不算
+    closer = "}" if opener == "{" else "]"
+    start = text.find(opener, start)
+    if start < 0:
+        return None
+    depth = 0
+    in_str = False
+    escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1] if ch == closer else None
+    # 输出被截断了：返回剩下的全部，交给 repair_json 尝试补齐
+    return text[start:]
+
+
+def repair_json(text):
+    # 修常见毛病：尾逗号、字符串里的裸换行、Python 风格的 True/False/None、缺少的收尾括号
+    out = []
+    stack = []
+    in_str = False
+    escape = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if in_str:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_str = False
+            elif ch == "\n":
+                ch = "\\n"
+            out.append(ch)
+        elif ch == '"':
+            in_str = True
+            out.append(ch)
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            # 去掉紧挨着的尾逗号
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(ch)
+        else:
+            for py, js in (("True", "true"), ("False", "false"), ("None", "null")):
+                if text.startswith(py, i) and not text[i + len(py):i + len(py) + 1].isalnum():
+                    out.append(js)
+                    i += len(py)
+                    break
+            else:
+                out.append(ch)
+                i += 1
+            continue
+        i += 1
+    if in_str:
+        out.append('"')
+    while out and (out[-1].isspace() or out[-1] == ","):
+        out.pop()
+    out.extend(reversed(stack))
+    return "".join(out)
+
+
+def parse_llm_json(text, opener="{"):
+    # 返回 (数据, 是否经过本地修复)；实在解析不了返回 (None, False)
+    # 第一个括号可能在说明文字里 ("Here is the quiz for {word}: {...}")，解析不了就从下一个括号接着找
+    text = text or ""
+    start = text.find(opener)
+    while start >= 0:
+        raw = extract_json(text, opener, start)
+        if raw is not None:
+            try:
+                return json.loads(raw), False
+            except ValueError:
+                pass
+            try:
+                return json.loads(repair_json(raw)), True
+            except ValueError:
+                pass
+        start = text.find(opener, start + 1)
+    return None, False
+
+
+def normalize_quiz(quiz):
+    # 统一格式："b." -> "B"，correct_label 写成选项文字时换成对应的字母
+    if not isinstance(quiz, dict):
+        return quiz
+    options = quiz.get("options")
+    if isinstance(options, list):
+        for opt in options:
+            if isinstance(opt, dict) and isinstance(opt.get("label"), str):
+                opt["label"] = opt["label"].strip().rstrip(".、:：)）").upper()
+            if isinstance(opt, dict) and isinstance(opt.get("text"), str):
+                opt["text"] = opt["text"].strip()
+    correct = quiz.get("correct_label")
+    if isinstance(correct, str):
+        label = correct.strip().rstrip(".、:：)）").upper()
+        if label not in LABELS and isinstance(options, list):
+            label = next((o.get("label") for o in options
+                          if isinstance(o, dict) and o.get("text") == correct.strip()), label)
+        quiz["correct_label"] = label
+    for key in ("word", "ipa"):
+        if isinstance(quiz.get(key), str):
+            quiz[key] = quiz[key].strip().strip("/")
+    return quiz
+
+
+def validate_quiz(quiz, word=None):
+    # 返回问题列表 (中文，会原样写进修正 Prompt)；空列表表示合格
+    if not isinstance(quiz, dict):
+        return ["输出不是 JSON 对象"]
+    errors = []
+    if word is not None and str(quiz.get("word", "")).strip().lower() != word.strip().lower():
+        errors.append(f'word 字段必须是 "{word}"')
+    if not quiz.get("ipa"):
+        errors.append("缺少 ipa 音标")
+    options = quiz.get("options")
+    if not isinstance(options, list) or len(options) != 4:
+        errors.append("options 必须正好有 4 个选项")
+        return errors
+    labels = [o.get("label") if isinstance(o, dict) else None for o in options]
+    if sorted(labels, key=str) != LABELS:
+        errors.append("选项 label 必须依次是 A、B、C、D")
+    for opt in options:
+        text = opt.get("text") if isinstance(opt, dict) else None
+        if not isinstance(text, str) or not CJK_RE.search(text):
+            errors.append(f"选项 {opt.get('label') if isinstance(opt, dict) else '?'} 的 text 必须是中文释义")
+    if quiz.get("correct_label") not in labels:
+        errors.append("correct_label 必须是 A/B/C/D 中的一个")
+    return errors
+
+
+def is_valid_quiz(quiz, word=None):
+    return not validate_quiz(quiz, word)
@@ -0,0 +1,90 @@
+# quiz_store.py - 跨会话共享的题目缓存
+# 所有浏览器会话、所有标签页共用同一个 SQLite 文件，服务器重启后依然有效。
+# 键 = 规范化单词 + Prompt 版本 + 模型名，这样改了 Prompt 或换了模型不会读到旧题。
+import json
+import sqlite3
+import threading
+import time
+
+
+def normalize_word(word):
+    # 大小写、首尾空格、中间多余空格都不影响命中
+    return " ".join(word.strip().lower().split())
+
+
+class QuizStore:
+    def __init__(self, path="quiz_cache.db", max_entries=5000, ttl=30 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries  # 超过后按最近使用时间 (LRU) 淘汰
+        self.ttl = ttl                  # 秒，过期的题目视为未命中
+        self.lock = threading.Lock()
+        # Streamlit 每个会话跑在不同线程里，这里共用一个连接，由 lock 串行化
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS quiz_cache (
+                key TEXT PRIMARY KEY,
+                word TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_quiz_cache_last_used ON quiz_cache (last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(word, model, prompt_version):
+        return f"{normalize_word(word)}|{prompt_version}|{model}"
+
+    def get(self, word, model, prompt_version):
+        key = self.make_key(word, model, prompt_version)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT data, created_at FROM quiz_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            data, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self.conn.execute("DELETE FROM quiz_cache WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE quiz_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return json.loads(data)
+
+    def put(self, word, model, prompt_version, quiz_data):
+        key = self.make_key(word, model, prompt_version)
+        now = time.time()
+        data = json.dumps(quiz_data, ensure_ascii=False)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO quiz_cache "
+                "(key, word, model, prompt_version, data, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, normalize_word(word), model, prompt_version, data, now, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # 先清掉过期的，再把超出容量的最久未使用条目删掉
+        if self.ttl:
+            self.conn.execute("DELETE FROM quiz_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM quiz_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM quiz_cache WHERE key IN "
+                "(SELECT key FROM quiz_cache ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def __len__(self):
+        with self.lock:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM quiz_cache").fetchone()
+        return count
@@ -0,0 +1,189 @@
+# quota.py - 按 API Key 的配额调度 (RPM / TPM / RPD)
+# 每个 Key 一个调度器：令牌桶管每分钟请求数和 token 数，计数器管每日请求数。
+# 排队时按优先级放行 (答题中的卡片 > 预加载 > 批量生成)，配额紧张时直接丢掉低优先级的请求。
+# 遇到 429 / 5xx 按带抖动的指数退避重试，并让同一个 Key 的其他请求也先缓一缓。
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+import metrics
+from rate_limit import TokenBucket
+
+PRIORITY_INTERACTIVE = 0  # 用户正在等的这张卡
+PRIORITY_PREFETCH = 1     # 后台预加载
+PRIORITY_BULK = 2         # 批量生成整个词库
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "答题", PRIORITY_PREFETCH: "预加载", PRIORITY_BULK: "批量"}
+
+# 免费档的大致限额；可以用环境变量 QUOTA_RPM / QUOTA_TPM / QUOTA_RPD 覆盖
+MODEL_LIMITS = {
+    'models/gemma-3-27b-it': {"rpm": 30, "tpm": 15000, "rpd": 14400},
+    'models/gemma-3-12b-it': {"rpm": 30, "tpm": 15000, "rpd": 14400},
+    'models/gemini-2.0-flash': {"rpm": 15, "tpm": 1000000, "rpd": 200},
+}
+DEFAULT_LIMITS = {"rpm": 10, "tpm": 250000, "rpd": 250}
+
+# 今日剩余配额低于这个比例时，对应优先级的请求直接放弃
+SHED_BELOW = {PRIORITY_INTERACTIVE: 0.0, PRIORITY_PREFETCH: 0.1, PRIORITY_BULK: 0.3}
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def today():
+    # Gemini 的每日配额按太平洋时间零点重置，这里近似用 UTC-8
+    return time.strftime("%Y-%m-%d", time.gmtime(time.time() - 8 * 3600))
+
+
+def error_status(e):
+    # google.api_core 的异常带 .code (HTTP 状态码)，requests 的异常带 .response.status_code
+    code = getattr(e, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(e):
+    status = error_status(e)
+    return status == 429 or (status is not None and 500 <= status < 600)
+
+
+class QuotaScheduler:
+    def __init__(self, rpm, tpm, rpd):
+        self.rpm = TokenBucket(rpm / 60, rpm)
+        self.tpm = TokenBucket(tpm / 60, tpm)
+        self.rpd = rpd
+        self.day = today()
+        self.day_count = 0
+        self.cond = threading.Condition()
+        self.waiters = []              # (priority, seq) 小顶堆
+        self.seq = itertools.count()
+        self.shed = 0                  # 被丢掉的请求数
+        self.throttled = 0             # 收到 429 的次数
+
+    def _day_left(self):
+        if self.day != today():
+            self.day = today()
+            self.day_count = 0
+        return self.rpd - self.day_count
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, tokens=1000, timeout=None):
+        # 拿到一次调用的许可；被丢弃或超时返回 False
+        tokens = min(tokens, self.tpm.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            if self._day_left() <= self.rpd * SHED_BELOW.get(priority, 0.0):
+                self.shed += 1
+                return False
+            entry = (priority, next(self.seq))
+            heapq.heappush(self.waiters, entry)
+            try:
+                while True:
+                    wait = None
+                    if self.waiters[0] == entry:
+                        if self._day_left() <= 0:
+                            self.shed += 1
+                            return False
+                        # 只有队头能拿令牌，所以两个桶的检查和扣减不会被别人插队
+                        wait = max(self.rpm.wait_time(1), self.tpm.wait_time(tokens))
+                        if wait == 0 and self.rpm.try_acquire(1) and self.tpm.try_acquire(tokens):
+                            self.day_count += 1
+                            return True
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self.cond.wait(wait if wait is None else max(wait, 0.001))
+            finally:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+                self.cond.notify_all()
+
+    def adjust_tokens(self, delta):
+        # 调用结束后按实际 token 数多退少补
+        with self.cond:
+            self.tpm._refill()
+            self.tpm.tokens = min(self.tpm.capacity, self.tpm.tokens - delta)
+
+    def penalize(self):
+        # 收到 429：清空本分钟的请求令牌，让同一个 Key 的其他请求也等一等
+        with self.cond:
+            self.throttled += 1
+            self.rpm._refill()
+            self.rpm.tokens = min(self.rpm.tokens, 0)
+
+    def budget(self):
+        with self.cond:
+            self.rpm._refill()
+            self.tpm._refill()
+            return {
+                "rpm_left": int(self.rpm.tokens),
+                "rpm": int(self.rpm.capacity),
+                "tpm_left": int(self.tpm.tokens),
+                "tpm": int(self.tpm.capacity),
+                "rpd_left": self._day_left(),
+                "rpd": self.rpd,
+                "queued": len(self.waiters),
+                "shed": self.shed,
+                "throttled": self.throttled,
+            }
+
+
+schedulers = {}
+schedulers_lock = threading.Lock()
+
+
+def get_scheduler(api_key, model_name):
+    with schedulers_lock:
+        key = (api_key, model_name)
+        if key not in schedulers:
+            limits = dict(MODEL_LIMITS.get(model_name, DEFAULT_LIMITS))
+            for name in limits:
+                env = os.environ.get(f"QUOTA_{name.upper()}")
+                if env:
+                    limits[name] = int(env)
+            schedulers[key] = QuotaScheduler(**limits)
+        return schedulers[key]
+
+
+def budgets():
+    # 按模型汇总所有 Key 的配额 (导出指标时不带 Key)
+    with schedulers_lock:
+        items = list(schedulers.items())
+    totals = {}
+    for (_, model_name), scheduler in items:
+        model_total = totals.setdefault(model_name.split("/")[-1], {})
+        for name, value in scheduler.budget().items():
+            model_total[name] = model_total.get(name, 0) + value
+    return totals
+
+
+metrics.register("quota", budgets, label="model")
+
+
+def call_with_quota(scheduler, fn, priority=PRIORITY_INTERACTIVE, tokens=1000,
+                    retries=4, base_delay=1.0, max_delay=30.0, timeout=None):
+    # 先排队拿配额，再调用；429 / 5xx 时按 full jitter 指数退避重试
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        acquired = scheduler.acquire(priority, tokens, timeout)
+        metrics.observe("quota_wait", time.perf_counter() - start, priority=PRIORITY_NAMES.get(priority, priority))
+        if not acquired:
+            raise QuotaExceeded(f"配额不足，已放弃{PRIORITY_NAMES.get(priority, '')}请求")
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            metrics.inc("api_retries", status=error_status(e))
+            if error_status(e) == 429:
+                scheduler.penalize()
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            print(f"API {error_status(e)}，{delay:.1f}s 后重试 ({attempt + 1}/{retries})")
+            time.sleep(delay)
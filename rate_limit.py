@@ -0,0 +1,47 @@
+# rate_limit.py - 令牌桶限流
+# 每秒往桶里补 rate 个令牌，最多攒 capacity 个；请求拿到令牌才能发出去，
+# 这样既允许短时间的小突发，又保证长期速率不超过上限。
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens=1):
+        # 还要等多久才能攒够 tokens 个令牌
+        with self.lock:
+            self._refill()
+            missing = tokens - self.tokens
+        return max(0.0, missing / self.rate) if self.rate else float('inf')
+
+    def acquire(self, tokens=1, timeout=None):
+        # 阻塞直到拿到令牌；超时返回 False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            wait = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            time.sleep(min(wait, 1.0) or 0.001)
@@ -0,0 +1,141 @@
+# srs.py - 间隔重复调度 (SM-2)
+# 每次答题后按 SM-2 算出下次复习时间，所有单词按到期时间放进小顶堆，
+# 取下一张卡就是看堆顶，O(log n)。没到期的单词不会被抽到，也就不会浪费 AI 配额。
+import heapq
+import time
+
+DAY = 24 * 3600
+RELEARN_DELAY = 10 * 60  # 答错后 10 分钟再考一次
+MIN_EASE = 1.3
+
+
+class SRSScheduler:
+    def __init__(self):
+        self.cards = {}   # 小写单词 -> {"word", "ease", "interval", "reps", "lapses", "due"}
+        self.heap = []    # (due, 小写单词)；过期条目不删除，取的时候跳过 (惰性删除)
+        # 到期计数：due_keys 是已经数过的到期单词，upcoming 是还没到期的 (同样惰性删除)。
+        # 每次查询只把新到期的那几个从 upcoming 挪进 due_keys，不用每次重跑都扫一遍所有卡片
+        self.due_keys = set()
+        self.upcoming = []
+        self.counted_at = float("-inf")
+
+    @staticmethod
+    def _key(word):
+        return word.strip().lower()
+
+    def add(self, word, now=None):
+        # 新词立即到期
+        key = self._key(word)
+        if key in self.cards:
+            return False
+        due = time.time() if now is None else now
+        self.cards[key] = {"word": word.strip(), "ease": 2.5, "interval": 0,
+                           "reps": 0, "lapses": 0, "due": due}
+        heapq.heappush(self.heap, (due, key))
+        heapq.heappush(self.upcoming, (due, key))
+        return True
+
+    def add_many(self, words, now=None):
+        return [w for w in words if self.add(w, now)]
+
+    def record(self, word, correct, now=None):
+        # 记录一次作答，返回新的到期时间
+        now = time.time() if now is None else now
+        key = self._key(word)
+        if key not in self.cards:
+            self.add(word, now)
+        card = self.cards[key]
+
+        # 只有对 / 错两种结果，分别当作 SM-2 里的 4 分和 1 分
+        quality = 4 if correct else 1
+        if correct:
+            card["reps"] += 1
+            if card["reps"] == 1:
+                card["interval"] = 1
+            elif card["reps"] == 2:
+                card["interval"] = 6
+            else:
+                card["interval"] = round(card["interval"] * card["ease"])
+            delay = card["interval"] * DAY
+        else:
+            card["reps"] = 0
+            card["interval"] = 0
+            card["lapses"] += 1
+            delay = RELEARN_DELAY
+        card["ease"] = max(MIN_EASE, card["ease"] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        card["due"] = now + delay
+        heapq.heappush(self.heap, (card["due"], key))
+        self.due_keys.discard(key)
+        heapq.heappush(self.upcoming, (card["due"], key))
+        if len(self.heap) > 2 * len(self.cards) + 64:
+            # 作废条目太多时重建一次堆，避免越积越大
+            self.heap = [(c["due"], k) for k, c in self.cards.items()]
+            heapq.heapify(self.heap)
+        if len(self.upcoming) > 2 * len(self.cards) + 64:
+            self._recount(self.counted_at)
+        return card["due"]
+
+    def _clean_top(self):
+        # 把堆顶已经作废的旧条目弹掉
+        while self.heap:
+            due, key = self.heap[0]
+            card = self.cards.get(key)
+            if card is not None and card["due"] == due:
+                return
+            heapq.heappop(self.heap)
+
+    def next_due(self, now=None):
+        # 最早到期且已经到期的单词；都没到期返回 None
+        now = time.time() if now is None else now
+        self._clean_top()
+        if self.heap and self.heap[0][0] <= now:
+            return self.cards[self.heap[0][1]]["word"]
+        return None
+
+    def next_due_time(self):
+        self._clean_top()
+        return self.heap[0][0] if self.heap else None
+
+    def peek_due(self, n, now=None):
+        # 按到期顺序取最多 n 个已经到期的单词 (不移除)，给预加载用
+        # 从堆顶一个个弹出来看，作废条目顺手丢掉，有效的看完再放回去：O((n + 作废条目数) log N)
+        now = time.time() if now is None else now
+        valid = []
+        while self.heap and len(valid) < n:
+            due, key = self.heap[0]
+            if due > now:
+                break
+            heapq.heappop(self.heap)
+            card = self.cards.get(key)
+            if card is not None and card["due"] == due:
+                valid.append((due, key))
+        for entry in valid:
+            heapq.heappush(self.heap, entry)
+        return [self.cards[key]["word"] for _, key in valid]
+
+    def is_due(self, word, now=None):
+        now = time.time() if now is None else now
+        card = self.cards.get(self._key(word))
+        return card is not None and card["due"] <= now
+
+    def _recount(self, now):
+        # 全量重算一次；只在时间倒退 (传了更早的 now) 或 upcoming 作废条目太多时用
+        self.due_keys = {k for k, c in self.cards.items() if c["due"] <= now}
+        self.upcoming = [(c["due"], k) for k, c in self.cards.items() if c["due"] > now]
+        heapq.heapify(self.upcoming)
+        self.counted_at = now
+
+    def due_count(self, now=None):
+        now = time.time() if now is None else now
+        if now < self.counted_at:
+            self._recount(now)
+        while self.upcoming and self.upcoming[0][0] <= now:
+            due, key = heapq.heappop(self.upcoming)
+            card = self.cards.get(key)
+            if card is not None and card["due"] == due:
+                self.due_keys.add(key)
+        self.counted_at = now
+        return len(self.due_keys)
+
+    def __len__(self):
+        return len(self.cards)
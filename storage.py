@@ -0,0 +1,187 @@
+# storage.py - 多用户共享的持久化存储 (词库、题目、媒体、答题记录)
+# 以前词库和进度都放在 st.session_state 里，刷新页面就没了，同一台服务器上的同学之间也不共享。
+# 现在所有会话共用一个存储：每个会话只在需要时加载自己的词库，写操作先攒着再批量提交。
+# 默认用 SQLite (WAL 模式，读写不互相阻塞)；换后端只要实现同样的方法，再在 BACKENDS 里注册。
+#
+# 后端需要实现的方法：
+#   add_words(user_id, words)           -> None
+#   load_words(user_id)                 -> [单词, ...] (按添加顺序)
+#   record_answer(user_id, word, correct, answered_at=None)
+#   load_answers(user_id)               -> [(单词, 是否答对, 时间戳), ...] (按时间顺序)
+#   put_media(word, kind, ref) / get_media(word, kind)
+#   put_gloss(word, gloss, pos, fields) -> None (每个单词一张释义卡，见 distractors.py)
+#   load_glosses()                      -> [(单词, 释义, 词性, {音标等字段}), ...]
+#   cards                               -> QuizStore 接口的题目缓存 (get / put)
+#   flush()
+import atexit
+import json
+import sqlite3
+import threading
+import time
+
+from quiz_store import QuizStore, normalize_word
+
+
+class SQLiteStorage:
+    def __init__(self, path="quiz_cache.db", batch_size=50, flush_interval=2.0, max_flush_failures=5):
+        self.path = path
+        self.batch_size = batch_size          # 攒够这么多条写操作就提交一次
+        self.flush_interval = flush_interval  # 秒，攒不够也最多等这么久
+        # 提交失败 (最常见的是 word_import.py / build_pack.py 同时在写，"database is locked") 时留着下次重试，
+        # 连续失败这么多次就丢掉这一批，免得一条坏数据让之后每次读写都卡在同一个错误上
+        self.max_flush_failures = max_flush_failures
+        self.flush_failures = 0
+        self.lock = threading.Lock()
+        self.pending = []                     # 还没提交的 (sql, 参数)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 已经能保证不损坏，只是断电时可能丢最后几条
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS words (
+                word TEXT PRIMARY KEY,
+                display TEXT NOT NULL,
+                added_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS user_words (
+                user_id TEXT NOT NULL,
+                word TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                PRIMARY KEY (user_id, word)
+            );
+            CREATE INDEX IF NOT EXISTS idx_user_words_added ON user_words (user_id, added_at);
+            CREATE TABLE IF NOT EXISTS media (
+                word TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                ref TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (word, kind)
+            );
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                word TEXT NOT NULL,
+                correct INTEGER NOT NULL,
+                answered_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_answers_user ON answers (user_id, answered_at);
+            CREATE TABLE IF NOT EXISTS glosses (
+                word TEXT PRIMARY KEY,
+                display TEXT NOT NULL,
+                gloss TEXT NOT NULL,
+                pos TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+        # 题目缓存沿用 QuizStore (同一个文件里的 quiz_cache 表)
+        self.cards = QuizStore(path)
+        # 后台定时提交攒着的写操作，进程退出前再提交一次
+        threading.Thread(target=self._flush_loop, daemon=True, name="storage-flush").start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                # 后台线程不能死：死了之后攒着的写操作就只能等下一次读的时候顺带提交
+                print(f"Storage Error (flush): {e!r}")
+
+    def _write(self, sql, params):
+        with self.lock:
+            self.pending.append((sql, params))
+            if len(self.pending) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        # 失败只记日志不往外抛：调用方是用户的读写请求，不该因为别的进程占着锁就报错
+        if not self.pending:
+            return
+        try:
+            with self.conn:
+                for sql, params in self.pending:
+                    self.conn.execute(sql, params)
+        except sqlite3.Error as e:
+            # 整个事务已经回滚，这一批原样留着下次重试
+            self.flush_failures += 1
+            if self.flush_failures < self.max_flush_failures:
+                print(f"Storage Error (retry {self.flush_failures}): {e!r}")
+                return
+            print(f"Storage Error: 连续 {self.flush_failures} 次提交失败，丢弃 {len(self.pending)} 条写操作: {e!r}")
+        self.flush_failures = 0
+        self.pending = []
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _read(self, sql, params):
+        # 读之前先把自己攒着的写操作提交掉，保证读得到
+        with self.lock:
+            self._flush()
+            return self.conn.execute(sql, params).fetchall()
+
+    def add_words(self, user_id, words):
+        now = time.time()
+        with self.lock:
+            for word in words:
+                key = normalize_word(word)
+                self.pending.append((
+                    "INSERT OR IGNORE INTO words (word, display, added_at) VALUES (?, ?, ?)",
+                    (key, word.strip(), now)))
+                self.pending.append((
+                    "INSERT OR IGNORE INTO user_words (user_id, word, added_at) VALUES (?, ?, ?)",
+                    (user_id, key, now)))
+            # 导入一批单词算一次写，直接提交
+            self._flush()
+
+    def load_words(self, user_id):
+        rows = self._read(
+            "SELECT w.display FROM user_words u JOIN words w ON w.word = u.word "
+            "WHERE u.user_id = ? ORDER BY u.added_at, u.rowid", (user_id,))
+        return [display for (display,) in rows]
+
+    def record_answer(self, user_id, word, correct, answered_at=None):
+        self._write(
+            "INSERT INTO answers (user_id, word, correct, answered_at) VALUES (?, ?, ?, ?)",
+            (user_id, normalize_word(word), int(correct), answered_at or time.time()))
+
+    def load_answers(self, user_id):
+        rows = self._read(
+            "SELECT word, correct, answered_at FROM answers WHERE user_id = ? ORDER BY answered_at, id",
+            (user_id,))
+        return [(word, bool(correct), answered_at) for word, correct, answered_at in rows]
+
+    def put_media(self, word, kind, ref):
+        self._write(
+            "INSERT OR REPLACE INTO media (word, kind, ref, created_at) VALUES (?, ?, ?, ?)",
+            (normalize_word(word), kind, ref, time.time()))
+
+    def get_media(self, word, kind):
+        rows = self._read("SELECT ref FROM media WHERE word = ? AND kind = ?", (normalize_word(word), kind))
+        return rows[0][0] if rows else None
+
+    def put_gloss(self, word, gloss, pos, fields):
+        self._write(
+            "INSERT OR REPLACE INTO glosses (word, display, gloss, pos, data, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (normalize_word(word), word.strip(), gloss, pos, json.dumps(fields, ensure_ascii=False), time.time()))
+
+    def load_glosses(self):
+        rows = self._read("SELECT display, gloss, pos, data FROM glosses ORDER BY created_at", ())
+        return [(display, gloss, pos, json.loads(data)) for display, gloss, pos, data in rows]
+
+
+BACKENDS = {"sqlite": SQLiteStorage}
+
+
+def open_storage(url="sqlite://quiz_cache.db"):
+    # url 形如 "sqlite://路径"；没写协议时当作 SQLite 文件路径
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        scheme, rest = "sqlite", url
+    if scheme not in BACKENDS:
+        raise ValueError(f"未知的存储后端: {scheme}")
+    return BACKENDS[scheme](rest)
@@ -0,0 +1,66 @@
+# deck 的单元测试：python -m pytest tests/
+import random
+
+from deck import Deck
+
+
+def check_index(deck):
+    # index 必须和 words 里的位置一一对应
+    assert len(deck.index) == len(deck.words)
+    for i, word in enumerate(deck.words):
+        assert deck.index[word.lower()] == i
+
+
+def test_dedup_keeps_first_spelling():
+    deck = Deck(["Apple", " apple ", "banana", "APPLE", "", "  "])
+    assert list(deck) == ["Apple", "banana"]
+    assert deck.add("Banana") is False
+    assert deck.add_many(["cherry", "Cherry", "durian"]) == ["cherry", "durian"]
+    assert len(deck) == 4
+    assert "CHERRY" in deck
+    check_index(deck)
+
+
+def test_draw_every_word_once_per_round():
+    words = [f"w{i}" for i in range(20)]
+    deck = Deck(words)
+    rng = random.Random(7)
+    for _ in range(2):
+        drawn = [deck.draw(rng) for _ in range(len(words))]
+        assert sorted(drawn) == sorted(words)
+        assert deck.draw(rng) is None
+        assert deck.remaining == 0
+        check_index(deck)
+        deck.new_round()
+    assert deck.round == 2
+
+
+def test_discard_swap_remove():
+    deck = Deck(["a", "b", "c", "d"])
+    assert deck.discard("b")
+    assert deck.remaining == 3
+    assert not deck.is_remaining("b")
+    assert deck.words[3] == "b"
+    assert deck.discard("B") is False
+    assert deck.discard("missing") is False
+    assert sorted(deck.words[:deck.remaining]) == ["a", "c", "d"]
+    check_index(deck)
+
+
+def test_add_after_discard_is_remaining():
+    deck = Deck(["a", "b"])
+    deck.draw(random.Random(1))
+    deck.draw(random.Random(1))
+    assert deck.add("c")
+    assert deck.remaining == 1
+    assert deck.pick() == "c"
+    assert all(not deck.is_remaining(w) for w in ["a", "b"])
+    check_index(deck)
+
+
+def test_peek_does_not_remove():
+    deck = Deck(["a", "b", "c"])
+    deck.discard("a")
+    peeked = deck.peek(5, random.Random(3))
+    assert sorted(peeked) == ["b", "c"]
+    assert deck.remaining == 2
@@ -0,0 +1,40 @@
+# dictionary 的单元测试：python -m pytest tests/
+from dictionary import Dictionary, compile_entries, short_gloss, write_dictionary
+
+ENTRIES = [
+    ("apple", "ˈæpl", "n. 苹果；苹果树"),
+    ("Run", "rʌn", "v. 跑"),
+    ("banana", "bəˈnɑːnə", "n. 香蕉"),
+    ("apple", "ˈæpəl", "n. 苹果"),  # 同一个单词后出现的覆盖前面的
+    ("café", "ˈkæfeɪ", "咖啡馆"),
+]
+
+
+def check(dictionary):
+    assert len(dictionary) == 4
+    assert dictionary.lookup(" Apple ") == {"word": "Apple", "ipa": "ˈæpəl", "pos": "n", "gloss": "苹果"}
+    assert dictionary.lookup("run")["pos"] == "v"
+    assert dictionary.lookup("café") == {"word": "café", "ipa": "ˈkæfeɪ", "pos": None, "gloss": "咖啡馆"}
+    assert "banana" in dictionary
+    assert "cherry" not in dictionary
+    assert dictionary.lookup("cherry") is None
+
+
+def test_compile_in_memory():
+    check(Dictionary(data=compile_entries(ENTRIES)))
+
+
+def test_write_and_mmap(tmp_path):
+    path = str(tmp_path / "words.dic")
+    write_dictionary(ENTRIES, path)
+    check(Dictionary(path))
+
+
+def test_empty_dictionary():
+    dictionary = Dictionary(data=compile_entries([]))
+    assert len(dictionary) == 0
+    assert dictionary.lookup("apple") is None
+
+
+def test_short_gloss_keeps_two_senses():
+    assert short_gloss("n. 苹果, 苹果树, 苹果公司") == "n. 苹果；苹果树"
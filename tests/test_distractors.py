@@ -0,0 +1,56 @@
+# distractors 的单元测试：python -m pytest tests/
+import random
+from collections import Counter
+
+from distractors import GlossIndex, overlaps, sense_ngrams
+
+ADJECTIVES = [("brave", "勇敢的"), ("cheap", "便宜的"), ("famous", "著名的"),
+              ("honest", "诚实的"), ("polite", "有礼貌的"), ("nervous", "紧张的")]
+
+
+def make_index():
+    index = GlossIndex()
+    index.add("happy", "adj. 快乐的")
+    index.add("joyful", "adj. 欢乐的")
+    for word, gloss in ADJECTIVES:
+        index.add(word, "adj. " + gloss)
+    return index
+
+
+def test_shared_suffix_is_not_overlap():
+    assert not overlaps(sense_ngrams("勇敢的"), sense_ngrams("诚实的"))
+    assert not overlaps(sense_ngrams("研究者"), sense_ngrams("旅行者"))
+
+
+def test_content_overlap():
+    assert overlaps(sense_ngrams("快乐的"), sense_ngrams("欢乐的"))
+    assert overlaps(sense_ngrams("谈判；协商"), sense_ngrams("谈判"))
+    assert overlaps(sense_ngrams("雄心勃勃的"), sense_ngrams("野心勃勃的"))
+
+
+def test_near_synonym_never_picked():
+    index = make_index()
+    picked = Counter()
+    for seed in range(1000):
+        wrong = index.distractors("happy", rng=random.Random(seed))
+        assert len(wrong) == 3
+        picked.update(wrong)
+    assert "adj. 欢乐的" not in picked
+    # 同一档里随机挑，每个无关的形容词都会轮到
+    assert set(picked) == {"adj. " + gloss for _, gloss in ADJECTIVES}
+
+
+def test_make_quiz_has_one_correct_answer():
+    index = make_index()
+    quiz = index.make_quiz("happy", rng=random.Random(1))
+    texts = [o["text"] for o in quiz["options"]]
+    assert len(set(texts)) == 4
+    assert dict((o["label"], o["text"]) for o in quiz["options"])[quiz["correct_label"]] == "adj. 快乐的"
+
+
+def test_not_enough_distractors():
+    index = GlossIndex()
+    index.add("happy", "adj. 快乐的")
+    index.add("brave", "adj. 勇敢的")
+    assert index.make_quiz("happy") is None
+    assert index.make_quiz("unknown") is None
@@ -0,0 +1,92 @@
+# media_store 的单元测试：python -m pytest tests/
+import hashlib
+import multiprocessing
+import threading
+import time
+
+from media_store import MediaStore, media_key
+
+
+def payload(key, i):
+    return hashlib.sha256(key.encode("utf-8")).digest() * (1 + i % 7)
+
+
+def test_put_get_and_reopen(tmp_path):
+    path = str(tmp_path / "media")
+    store = MediaStore(path, grow_bytes=4096)
+    assert store.get("missing") is None
+    assert bytes(store.put("a", b"hello")) == b"hello"
+    assert bytes(store.put("a", b"ignored")) == b"hello"  # 已有的键不会重写
+    assert bytes(store.put("empty", b"")) == b""
+    assert "a" in store and len(store) == 2
+    reopened = MediaStore(path)
+    assert bytes(reopened.get("a")) == b"hello"
+    assert reopened.end == store.end
+
+
+def test_concurrent_threads_put_get(tmp_path, monkeypatch):
+    # 一边写一边不加锁地读刚写进去的键：映射扩容的时候读者不能看到超出映射的条目
+    # 重新映射故意放慢一点，把扩容的窗口拉长
+    remap = MediaStore._remap
+
+    def slow_remap(self):
+        time.sleep(0.002)
+        remap(self)
+
+    monkeypatch.setattr(MediaStore, "_remap", slow_remap)
+    store = MediaStore(str(tmp_path / "media"), grow_bytes=4096)
+    done = threading.Event()
+    current = [None]
+    errors = []
+
+    def reader():
+        while not done.is_set():
+            key = current[0]
+            try:
+                if key is not None and media_key(key) in store.index:
+                    view = store.get(key)
+                    if view is None or len(view) != 3000:
+                        errors.append((key, view))
+            except Exception as e:
+                errors.append(repr(e))
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        for i in range(200):
+            current[0] = f"k{i}"
+            store.put(f"k{i}", b"x" * 3000)
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+    assert errors == []
+    assert all(len(store.get(f"k{i}")) == 3000 for i in range(200))
+
+
+def writer(path, wid, n):
+    store = MediaStore(path, grow_bytes=4096)
+    for i in range(n):
+        key = f"{wid}-{i}"
+        store.put(key, payload(key, i))
+
+
+def test_concurrent_processes_put(tmp_path):
+    # 几个进程同时往同一个缓存里写，先打开的那个也要能读到全部
+    path = str(tmp_path / "media")
+    live = MediaStore(path, grow_bytes=4096)
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=writer, args=(path, w, 100)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+    for w in range(4):
+        for i in range(100):
+            key = f"{w}-{i}"
+            assert bytes(live.get(key)) == payload(key, i)
+    fresh = MediaStore(path)
+    assert len(fresh) == len(live) == 400
+    assert fresh.end == live.end
@@ -0,0 +1,53 @@
+# quiz_pack 的单元测试：python -m pytest tests/
+import pytest
+
+from quiz_pack import QuizPack, QuizPackWriter
+
+
+def make_quiz(word):
+    return {"word": word, "ipa": "ˈtest", "correct_label": "A",
+            "options": [{"label": l, "text": f"{word} 释义{l}"} for l in "ABCD"]}
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "pack.qpk")
+    writer = QuizPackWriter(path)
+    writer.add("Apple", make_quiz("apple"), image="https://example.com/apple.png", audio=b"ID3 apple")
+    writer.add("banana", make_quiz("banana"), image=b"\x89PNG banana")
+    writer.add("香蕉", make_quiz("香蕉"))
+    writer.add("cherry", make_quiz("old"))
+    writer.add("cherry", make_quiz("cherry"))  # 后加的覆盖前面的
+    writer.close()
+
+    pack = QuizPack(path)
+    assert len(pack) == 4
+    assert sorted(pack.words()) == ["apple", "banana", "cherry", "香蕉"]
+    apple = pack.lookup(" APPLE ")
+    assert apple["quiz"] == make_quiz("apple")
+    assert apple["image"] == "https://example.com/apple.png"
+    assert bytes(apple["audio"]) == b"ID3 apple"
+    banana = pack.lookup("banana")
+    assert bytes(banana["image"]) == b"\x89PNG banana"
+    assert banana["audio"] is None
+    plain = pack.lookup("香蕉")
+    assert plain["image"] is None and plain["audio"] is None
+    assert pack.lookup("cherry")["quiz"]["word"] == "cherry"
+    assert "durian" not in pack
+    assert pack.lookup("durian") is None
+    del apple, banana
+    pack.close()
+
+
+def test_empty_pack(tmp_path):
+    path = str(tmp_path / "empty.qpk")
+    QuizPackWriter(path).close()
+    pack = QuizPack(path)
+    assert len(pack) == 0
+    assert pack.lookup("apple") is None
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "bad.qpk"
+    path.write_bytes(b"NOPE" + b"\0" * 32)
+    with pytest.raises(ValueError):
+        QuizPack(str(path))
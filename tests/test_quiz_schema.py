@@ -0,0 +1,151 @@
+# quiz_schema 的单元测试：python -m pytest tests/
+import json
+
+from quiz_schema import extract_json, normalize_quiz, parse_llm_json, repair_json, validate_quiz
+
+
+def make_quiz(**overrides):
+    quiz = {
+        "word": "apple",
+        "ipa": "ˈæpl",
+        "options": [
+            {"label": "A", "text": "苹果"},
+            {"label": "B", "text": "香蕉"},
+            {"label": "C", "text": "橙子"},
+            {"label": "D", "text": "草莓"},
+        ],
+        "correct_label": "A",
+    }
+    quiz.update(overrides)
+    return quiz
+
+
+# ---- extract_json ----
+
+def test_extract_plain_object():
+    assert extract_json('{"a": 1}') == '{"a": 1}'
+
+
+def test_extract_strips_prose_and_code_fence():
+    assert extract_json('Sure!\n```json\n{"a": {"b": [1, 2]}}\n```\nDone.') == '{"a": {"b": [1, 2]}}'
+
+
+def test_extract_ignores_brackets_in_strings():
+    assert extract_json('{"a": "x}y{", "b": "\\"}"}') == '{"a": "x}y{", "b": "\\"}"}'
+
+
+def test_extract_array():
+    assert extract_json('items: [{"a": 1}, {"a": 2}] end', "[") == '[{"a": 1}, {"a": 2}]'
+
+
+def test_extract_truncated_returns_rest():
+    assert extract_json('{"a": [1, 2') == '{"a": [1, 2'
+
+
+def test_extract_none_without_opener():
+    assert extract_json("no json here") is None
+
+
+def test_extract_from_start():
+    text = '{word} then {"a": 1}'
+    assert extract_json(text, "{", text.index('{"')) == '{"a": 1}'
+
+
+# ---- repair_json ----
+
+def test_repair_trailing_commas():
+    assert json.loads(repair_json('{"a": [1, 2,], "b": 3,}')) == {"a": [1, 2], "b": 3}
+
+
+def test_repair_python_literals():
+    assert json.loads(repair_json('{"a": True, "b": False, "c": None}')) == {"a": True, "b": False, "c": None}
+
+
+def test_repair_keeps_literal_words_in_strings():
+    assert json.loads(repair_json('{"a": "True story", "b": True}')) == {"a": "True story", "b": True}
+
+
+def test_repair_newline_in_string():
+    assert json.loads(repair_json('{"a": "line1\nline2"}')) == {"a": "line1\nline2"}
+
+
+def test_repair_closes_truncated_output():
+    assert json.loads(repair_json('{"a": [1, 2, {"b": "x')) == {"a": [1, 2, {"b": "x"}]}
+
+
+# ---- parse_llm_json ----
+
+def test_parse_clean():
+    assert parse_llm_json('{"a": 1}') == ({"a": 1}, False)
+
+
+def test_parse_reports_repair():
+    assert parse_llm_json('{"a": 1,}') == ({"a": 1}, True)
+
+
+def test_parse_skips_braces_in_prose():
+    assert parse_llm_json('Here is the quiz for {word}: {"a": 1}') == ({"a": 1}, False)
+
+
+def test_parse_skips_mismatched_candidate():
+    assert parse_llm_json('options [A) or B} are below: [1, 2]', "[") == ([1, 2], False)
+
+
+def test_parse_gives_up():
+    assert parse_llm_json("sorry, I cannot help with {that}") == (None, False)
+    assert parse_llm_json(None) == (None, False)
+
+
+# ---- normalize_quiz ----
+
+def test_normalize_labels():
+    quiz = make_quiz(options=[{"label": " a. ", "text": " 苹果 "}, {"label": "B、", "text": "香蕉"},
+                              {"label": "c)", "text": "橙子"}, {"label": "D：", "text": "草莓"}],
+                     correct_label="a.")
+    normalize_quiz(quiz)
+    assert [o["label"] for o in quiz["options"]] == ["A", "B", "C", "D"]
+    assert quiz["options"][0]["text"] == "苹果"
+    assert quiz["correct_label"] == "A"
+
+
+def test_normalize_correct_label_given_as_text():
+    assert normalize_quiz(make_quiz(correct_label="橙子"))["correct_label"] == "C"
+
+
+def test_normalize_strips_ipa_slashes():
+    quiz = normalize_quiz(make_quiz(word=" apple ", ipa="/ˈæpl/"))
+    assert quiz["word"] == "apple"
+    assert quiz["ipa"] == "ˈæpl"
+
+
+def test_normalize_passes_non_dict_through():
+    assert normalize_quiz([1, 2]) == [1, 2]
+
+
+# ---- validate_quiz ----
+
+def test_validate_ok():
+    assert validate_quiz(make_quiz(), "Apple") == []
+
+
+def test_validate_not_a_dict():
+    assert validate_quiz("quiz") == ["输出不是 JSON 对象"]
+
+
+def test_validate_wrong_word_and_missing_ipa():
+    errors = validate_quiz(make_quiz(ipa=""), "banana")
+    assert any("word" in e for e in errors)
+    assert any("ipa" in e for e in errors)
+
+
+def test_validate_option_count():
+    assert validate_quiz(make_quiz(options=make_quiz()["options"][:3])) == ["options 必须正好有 4 个选项"]
+
+
+def test_validate_labels_text_and_answer():
+    options = make_quiz()["options"]
+    options[1] = {"label": "E", "text": "banana"}
+    errors = validate_quiz(make_quiz(options=options, correct_label="F"))
+    assert "选项 label 必须依次是 A、B、C、D" in errors
+    assert any("选项 E" in e for e in errors)
+    assert "correct_label 必须是 A/B/C/D 中的一个" in errors
@@ -0,0 +1,72 @@
+# srs 的单元测试：python -m pytest tests/
+from srs import DAY, RELEARN_DELAY, SRSScheduler
+
+NOW = 1_000_000.0
+
+
+def make_scheduler(words=("apple", "banana", "cherry", "durian")):
+    srs = SRSScheduler()
+    srs.add_many(words, now=NOW)
+    return srs
+
+
+def test_peek_due_skips_stale_entries():
+    srs = make_scheduler()
+    # 每个单词答两次，堆里留下两条作废的旧条目
+    srs.record("apple", True, now=NOW)
+    srs.record("apple", False, now=NOW)
+    srs.record("banana", False, now=NOW)
+    assert srs.peek_due(10, now=NOW) == ["cherry", "durian"]
+    later = NOW + RELEARN_DELAY
+    assert sorted(srs.peek_due(10, now=later)) == ["apple", "banana", "cherry", "durian"]
+    # 不移除：再看一次结果一样；已经到期的作废条目顺手丢掉了 (apple 答对那条还没到期，留在堆里)
+    assert sorted(srs.peek_due(10, now=later)) == ["apple", "banana", "cherry", "durian"]
+    assert sorted(srs.heap) == [(NOW, "cherry"), (NOW, "durian"), (later, "apple"), (later, "banana"),
+                                (NOW + DAY, "apple")]
+
+
+def test_peek_due_limit_and_order():
+    srs = SRSScheduler()
+    for i, word in enumerate(["c", "a", "b"]):
+        srs.add(word, now=NOW + i)
+    assert srs.peek_due(2, now=NOW + 10) == ["c", "a"]
+    assert srs.peek_due(10, now=NOW + 1) == ["c", "a"]
+    assert srs.peek_due(0, now=NOW + 10) == []
+
+
+def test_due_count_follows_record():
+    srs = make_scheduler()
+    assert srs.due_count(now=NOW) == 4
+    srs.record("apple", True, now=NOW)
+    assert srs.due_count(now=NOW) == 3
+    srs.record("banana", False, now=NOW)
+    assert srs.due_count(now=NOW) == 2
+    assert srs.due_count(now=NOW + RELEARN_DELAY) == 3
+    # 同一个单词答多次，只算一次
+    srs.record("banana", True, now=NOW + RELEARN_DELAY)
+    srs.record("banana", False, now=NOW + RELEARN_DELAY)
+    assert srs.due_count(now=NOW + 2 * RELEARN_DELAY) == 3
+    assert srs.due_count(now=NOW + DAY) == 4
+    # 时间倒退时全量重算
+    assert srs.due_count(now=NOW) == 2
+
+
+def test_due_count_matches_full_scan():
+    srs = make_scheduler([f"w{i}" for i in range(50)])
+    for step in range(300):
+        now = NOW + step * 60
+        srs.record(f"w{step * 7 % 50}", step % 3 != 0, now=now)
+        expected = sum(1 for c in srs.cards.values() if c["due"] <= now)
+        assert srs.due_count(now=now) == expected
+    assert len(srs.upcoming) <= 2 * len(srs.cards) + 64
+    assert len(srs.heap) <= 2 * len(srs.cards) + 64
+
+
+def test_record_unknown_word_adds_it():
+    srs = SRSScheduler()
+    due = srs.record("Apple ", True, now=NOW)
+    assert due == NOW + DAY
+    assert len(srs) == 1
+    assert srs.cards["apple"]["word"] == "Apple"
+    assert srs.next_due(now=NOW) is None
+    assert srs.next_due(now=due) == "Apple"
@@ -0,0 +1,66 @@
+# tts_cache.py - 单词发音缓存
+# 同一个单词 + 语言 + 口音 + 语速只合成一次，存进磁盘上的内存映射文件 (media_store)，
+# 重启后也不用再请求 gTTS，读的时候由操作系统页缓存负责热数据。
+import hashlib
+import io
+import os
+
+import requests
+from gtts import gTTS
+
+import metrics
+from media_store import MediaStore
+
+# 设置后不再走 gTTS，改成 GET {TTS_ENDPOINT}/tts?text=...，离线压测时指向本地假服务 (fake_backends.py)
+TTS_ENDPOINT = os.environ.get("TTS_ENDPOINT")
+
+
+def audio_key(word, lang='en', tld='com', slow=False):
+    raw = f"{word.strip().lower()}|{lang}|{tld}|{int(slow)}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def synthesize(word, lang='en', tld='com', slow=False):
+    if TTS_ENDPOINT:
+        params = {"text": word, "lang": lang, "tld": tld, "slow": int(slow)}
+        response = requests.get(f"{TTS_ENDPOINT.rstrip('/')}/tts", params=params, timeout=30)
+        response.raise_for_status()
+        return response.content
+    tts = gTTS(text=word, lang=lang, tld=tld, slow=slow)
+    sound_file = io.BytesIO()
+    tts.write_to_fp(sound_file)
+    return sound_file.getvalue()
+
+
+class AudioCache:
+    def __init__(self, cache_dir="audio_cache"):
+        self.cache_dir = cache_dir
+        # 所有 MP3 放在同一个内存映射文件里，读出来的是零拷贝切片，不再在每个进程里留一份 bytes
+        self.store = MediaStore(os.path.join(cache_dir, "audio"))
+
+    def path_for(self, key):
+        # 旧版本一条 MP3 一个文件 (按前两位分子目录)，读到时搬进 MediaStore
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def get(self, word, lang='en', tld='com', slow=False):
+        # 只查缓存，不合成；返回 memoryview
+        key = audio_key(word, lang, tld, slow)
+        data = self.store.get(key)
+        if data is None and os.path.exists(self.path_for(key)):
+            with open(self.path_for(key), 'rb') as f:
+                data = self.store.put(key, f.read())
+        return data
+
+    def get_or_synthesize(self, word, lang='en', tld='com', slow=False):
+        data = self.get(word, lang, tld, slow)
+        metrics.cache_hit("audio", data is not None)
+        if data is not None:
+            return data
+        with metrics.span("tts"):
+            audio = synthesize(word, lang, tld, slow)
+        # 并发合成同一个单词时只会存一份，后到的直接拿先写进去的那段
+        return self.store.put(audio_key(word, lang, tld, slow), audio)
+
+    def contains(self, word, lang='en', tld='com', slow=False):
+        key = audio_key(word, lang, tld, slow)
+        return key in self.store or os.path.exists(self.path_for(key))
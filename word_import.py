@@ -0,0 +1,179 @@
+# word_import.py - 批量导入单词表 (TXT / CSV / Anki 导出)
+# 以前只能在文本框里一行一行粘贴，整段字符串 split 之后一次性塞进词库。
+# 这里边读边解析，不把整个文件读进内存；单词先规范化 (大小写、空白) 再用集合去重，
+# 每攒够一批就交给调用方提交一次 (写数据库、刷新进度条)，十万行的考试词表也不会卡住页面。
+#
+# 用法: python word_import.py cet4.txt ielts.csv --user 小明
+import argparse
+import csv
+import io
+import os
+import re
+import time
+
+from quiz_store import normalize_word
+
+WORD_RE = re.compile(r"^[a-z][a-z '\-]*$")
+HTML_RE = re.compile(r"<[^>]+>|&nbsp;")
+MAX_WORD_LEN = 64
+# 去掉 s / es / ies 之后会变成别的词或根本不是复数的常见词
+LEMMA_EXCEPTIONS = {"news", "series", "species", "physics", "mathematics", "economics", "politics",
+                    "always", "perhaps", "its", "this", "thus", "yes", "bus", "gas", "lens", "atlas"}
+
+
+def simple_lemma(word):
+    # 粗略去掉复数词尾，只用来提示 "可能是同一个词的单复数"；不能拿来去重
+    # (glass / glasses、mean / means、good / goods 都是不同的词)
+    if " " in word or word in LEMMA_EXCEPTIONS or len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "shes", "ches", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+class ImportReport:
+    def __init__(self):
+        self.lines = 0
+        self.added = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.seconds = 0.0
+        self.samples = []  # 前几个无效行，方便用户检查格式
+        self.plural_pairs = []  # 前几组可能是单复数的 (已有的词, 新词)，两个都照常导入，只提示用户检查
+        self.plural_count = 0
+
+    @property
+    def lines_per_sec(self):
+        return self.lines / self.seconds if self.seconds else 0.0
+
+
+def open_text(source):
+    # 接受路径、二进制文件对象 (比如 st.file_uploader 上传的文件) 或文本文件对象
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, encoding="utf-8-sig", errors="replace", newline="")
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def iter_candidates(lines, name=""):
+    # 每行取第一个字段当单词：
+    #   CSV 按逗号分，有 word / 单词 表头时取那一列；Anki 导出按 Tab 分，# 开头的是文件头
+    #   普通 TXT 一行一个，也可以是 "单词<Tab>释义"
+    lower = name.lower()
+    if lower.endswith(".csv"):
+        rows = csv.reader(lines)
+        column = 0
+        for i, row in enumerate(rows):
+            if not row:
+                continue
+            if i == 0:
+                header = [c.strip().lower() for c in row]
+                for title in ("word", "单词", "front", "term"):
+                    if title in header:
+                        column = header.index(title)
+                        break
+                else:
+                    yield row[0]
+                continue
+            yield row[column] if column < len(row) else ""
+        return
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        yield line.split("\t", 1)[0]
+
+
+def clean(text):
+    return HTML_RE.sub(" ", text).strip().strip('"')
+
+
+def import_words(source, existing=(), commit=None, chunk_size=1000, name=None, progress=None):
+    # existing: 词库里已有的单词；commit(words): 每批新单词调用一次；progress(report): 每批之后调用一次
+    start = time.perf_counter()
+    report = ImportReport()
+    seen = {normalize_word(w) for w in existing}
+    lemmas = {simple_lemma(k): k for k in seen}
+    chunk = []
+    if name is None:
+        name = str(source) if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    f = open_text(source)
+    try:
+        for raw in iter_candidates(f, name):
+            report.lines += 1
+            word = " ".join(clean(raw).split())
+            key = normalize_word(word)
+            if not WORD_RE.match(key) or len(key) > MAX_WORD_LEN:
+                if word:
+                    report.invalid += 1
+                    if len(report.samples) < 5:
+                        report.samples.append(raw.strip()[:40])
+                continue
+            if key in seen:
+                report.duplicates += 1
+                continue
+            seen.add(key)
+            lemma = simple_lemma(key)
+            other = lemmas.setdefault(lemma, key)
+            if other != key:
+                report.plural_count += 1
+                if len(report.plural_pairs) < 5:
+                    report.plural_pairs.append((other, word))
+            chunk.append(word)
+            if len(chunk) >= chunk_size:
+                _commit(chunk, commit, report, start, progress)
+                chunk = []
+    finally:
+        # 自己打开的文件关掉；调用方传进来的文件对象 (比如上传的文件) 不替它关
+        if isinstance(source, (str, os.PathLike)):
+            f.close()
+        elif f is not source:
+            f.detach()
+    _commit(chunk, commit, report, start, progress)
+    return report
+
+
+def _commit(chunk, commit, report, start, progress):
+    if chunk and commit:
+        commit(chunk)
+    report.added += len(chunk)
+    report.seconds = time.perf_counter() - start
+    if progress:
+        progress(report)
+
+
+def main():
+    from storage import open_storage
+
+    parser = argparse.ArgumentParser(description="批量导入单词表到共享存储")
+    parser.add_argument("files", nargs="+", help="TXT / CSV / Anki 导出的单词表")
+    parser.add_argument("--user", required=True, help="导入到哪个学习者 ID 的词库 (和网页侧边栏里填的一致)")
+    parser.add_argument("--storage", default=os.environ.get("STORAGE_URL", "sqlite://quiz_cache.db"))
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    storage = open_storage(args.storage)
+    existing = storage.load_words(args.user)
+
+    def commit(words):
+        storage.add_words(args.user, words)
+        existing.extend(words)  # 后面的文件也要和前面导入的去重
+
+    for path in args.files:
+        report = import_words(path, existing, commit, args.chunk_size)
+        print(f"📥 {path}: {report.lines} 行，新增 {report.added}，重复 {report.duplicates}，"
+              f"无效 {report.invalid}，{report.seconds:.1f}s ({report.lines_per_sec:,.0f} 行/s)")
+        if report.samples:
+            print(f"   无效行示例: {report.samples}")
+        if report.plural_pairs:
+            pairs = "，".join(f"{a} / {b}" for a, b in report.plural_pairs)
+            print(f"   {report.plural_count} 个可能和已有单词是单复数关系 (都已导入，请确认): {pairs}")
+    storage.flush()
+
+
+if __name__ == "__main__":
+    main()